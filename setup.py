@@ -19,6 +19,9 @@ setup(name='tap-hubspot',
           'dev': [
               'pylint',
               'nose',
+          ],
+          'orjson': [
+              'orjson==3.8.3',
           ]
       },
       entry_points='''
@@ -1,15 +1,26 @@
 #!/usr/bin/env python3
+import collections
+import concurrent.futures
+import contextlib
+import copy
 import datetime
+import decimal
+import hashlib
 import pytz
 import itertools
 import os
+import queue
 import re
 import sys
 import json
+import threading
+import time
+import urllib.parse
 # pylint: disable=import-error,too-many-statements
 import attr
 import backoff
 import requests
+import simplejson
 import singer
 import singer.messages
 from singer import metrics
@@ -18,11 +29,26 @@ from singer import utils
 from singer import (transform,
                     UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING,
                     Transformer, _transform_datetime)
+from singer.transform import breadcrumb_path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 LOGGER = singer.get_logger()
-SESSION = requests.Session()
 
 REQUEST_TIMEOUT = 300
+DEFAULT_HTTP_POOL_SIZE = 10
+DEFAULT_DETAIL_WORKERS = 5
+DEFAULT_READ_AHEAD_DEPTH = 1
+DEFAULT_READ_AHEAD_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_DISCOVERY_CACHE_TTL = 24 * 60 * 60
+DEFAULT_OUTPUT_BUFFER_BYTES = 64 * 1024
+DEFAULT_OUTPUT_BUFFER_SECONDS = 1
+
+TOKEN_REFRESH_LOCK = threading.Lock()
+PORTAL_ID_LOCK = threading.Lock()
 class InvalidAuthException(Exception):
     pass
 
@@ -47,8 +73,13 @@ BASE_URL = "https://api.hubapi.com"
 CONTACTS_BY_COMPANY = "contacts_by_company"
 
 DEFAULT_CHUNK_SIZE = 1000 * 60 * 60 * 24
+DEFAULT_MIN_CHUNK_SIZE = 1000 * 60 * 60
+DEFAULT_MAX_CHUNK_SIZE = 30 * DEFAULT_CHUNK_SIZE
+DEFAULT_CHUNK_TARGET_RECORDS = 5000
 
 V3_PREFIXES = {'hs_v2_date_entered', 'hs_v2_date_exited', 'hs_v2_latest_time_in'}
+# Matches any field name that contains one of the V3_PREFIXES
+V3_PREFIXES_PATTERN = re.compile('|'.join(re.escape(prefix) for prefix in sorted(V3_PREFIXES)))
 
 CONFIG = {
     "access_token": None,
@@ -77,6 +108,8 @@ ENDPOINTS = {
     "companies_recent":     "/companies/v2/companies/recent/modified",
     "companies_detail":     "/companies/v2/companies/{company_id}",
     "contacts_by_company_v3": "/crm/v3/associations/company/contact/batch/read",
+    "companies_v3_batch_read": "/crm/v3/objects/companies/batch/read",
+    "companies_search":     "/crm/v3/objects/companies/search",
 
     "deals_properties":     "/properties/v1/deals/properties",
     "deals_all":            "/deals/v1/deal/paged",
@@ -84,6 +117,8 @@ ENDPOINTS = {
     "deals_detail":         "/deals/v1/deal/{deal_id}",
 
     "deals_v3_batch_read":  "/crm/v3/objects/deals/batch/read",
+    "deals_search":         "/crm/v3/objects/deals/search",
+    "deals_v3_associations": "/crm/v3/associations/deals/{object_type}/batch/read",
     "deals_v3_properties":  "/crm/v3/properties/deals",
 
     "deal_pipelines":       "/deals/v1/pipelines",
@@ -106,6 +141,8 @@ ENDPOINTS = {
     "form_submissions":   "/form-integrations/v1/submissions/forms/{form_id}",
     "list_memberships":   "/crm/v3/lists/{list_id}/memberships",
 
+    "account_details":    "/account-info/v3/details",
+
     "custom_objects_schema":        "/crm/v3/schemas",
     "custom_objects": "/crm/v3/objects/p_{object_name}"
 }
@@ -167,6 +204,18 @@ def get_url(endpoint, **kwargs):
 
     return BASE_URL + ENDPOINTS[endpoint].format(**kwargs)
 
+def get_endpoint_name(url):
+    """
+    Return the `ENDPOINTS` key a request url was built from, or the url path
+    for urls that are not in `ENDPOINTS` (e.g. the OAuth token url).
+    """
+    path = urllib.parse.urlparse(str(url)).path
+    for endpoint, path_template in ENDPOINTS.items():
+        pattern = re.sub(r'\\{\w+\\}', '[^/]+', re.escape(path_template))
+        if re.fullmatch(pattern, path):
+            return endpoint
+    return path
+
 
 def get_field_type_schema(field_type):
     if field_type == "bool":
@@ -217,12 +266,13 @@ def parse_custom_schema(entity_name, data, is_custom_object=False):
 
 
 def get_custom_schema(entity_name):
-    res = request(get_url(entity_name + "_properties")).json()
+    endpoint = entity_name + "_properties"
+    res = DISCOVERY_CACHE.get(endpoint, lambda: request(get_url(endpoint)).json())
     return parse_custom_schema(entity_name, res if entity_name != "contacts" else res["results"])
 
 def get_v3_schema(entity_name):
-    url = get_url("deals_v3_properties")
-    return parse_custom_schema(entity_name, request(url).json()['results'])
+    res = DISCOVERY_CACHE.get("deals_v3_properties", lambda: request(get_url("deals_v3_properties")).json())
+    return parse_custom_schema(entity_name, res['results'])
 
 def get_abs_path(path):
     return os.path.join(os.path.dirname(os.path.realpath(__file__)), path)
@@ -263,6 +313,305 @@ def load_schema(entity_name):
 
     return schema
 
+def load_sync_schema(catalog, entity_name):
+    """
+    Return the schema a stream is synced with. Discovery already built it from
+    the properties API, so the schema in the catalog is used as is. With
+    `refresh_schema` enabled, or when the catalog has no schema, it is loaded
+    again to pick up properties added since discovery.
+    """
+    schema = catalog.get('schema')
+    if not schema or get_config_bool('refresh_schema', False):
+        return load_schema(entity_name)
+    return schema
+
+class DiscoveryCache:
+    """
+    On-disk cache of the raw properties responses fetched during discovery,
+    stored as `<directory>/<portal>/<endpoint>.json` together with the time
+    they were fetched and their TTL. Entries younger than their TTL are reused
+    instead of calling the API again. Without a directory nothing is cached.
+    """
+    def __init__(self):
+        self.directory = None
+        self.ttl = DEFAULT_DISCOVERY_CACHE_TTL
+        self.portal_key = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def configure(self, directory=None, ttl=DEFAULT_DISCOVERY_CACHE_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self.portal_key = get_portal_key()
+
+    def get_path(self, endpoint):
+        return os.path.join(self.directory, self.portal_key, endpoint + '.json')
+
+    def read(self, path):
+        try:
+            with open(path) as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('fetched_at', 0) >= entry.get('ttl', 0):
+            return None
+        return entry
+
+    def write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {'fetched_at': time.time(), 'ttl': self.ttl, 'response': data}
+        # Write to a temporary file first so a failed write never leaves a partial entry
+        tmp_path = '{}.{}.tmp'.format(path, threading.get_ident())
+        with open(tmp_path, 'w') as cache_file:
+            json.dump(entry, cache_file)
+        os.replace(tmp_path, path)
+
+    def get(self, endpoint, fetch):
+        """ Return the cached response of `endpoint`, calling `fetch` if it is missing or stale. """
+        if not self.directory:
+            return fetch()
+
+        path = self.get_path(endpoint)
+        entry = self.read(path)
+        with self._lock:
+            if entry is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            return entry['response']
+
+        data = fetch()
+        try:
+            self.write(path, data)
+        except OSError as ex:
+            LOGGER.warning("Unable to write the discovery cache entry %s: %s", path, ex)
+        return data
+
+    def log_stats(self):
+        if self.directory:
+            LOGGER.info("Discovery cache: %s hits, %s misses", self.hits, self.misses)
+
+def get_portal_key():
+    """
+    Identify the portal for the discovery cache by `portal_id` or, without one,
+    by a hash of the credentials so that no secret ends up in a path.
+    """
+    if CONFIG.get('portal_id'):
+        return str(CONFIG['portal_id'])
+    credential = CONFIG.get('api_key') or CONFIG.get('hapikey') or \
+        '{}:{}'.format(CONFIG.get('client_id'), CONFIG.get('refresh_token'))
+    return hashlib.sha256(credential.encode('utf-8')).hexdigest()[:16]
+
+DISCOVERY_CACHE = DiscoveryCache()
+
+class HttpTransport:
+    """
+    Pooled keep-alive HTTP transport shared by every call the tap makes, so
+    GET requests, POST search/batch-read requests and OAuth token refreshes
+    all reuse the same connections instead of opening a new TLS connection
+    per call.
+    """
+    def __init__(self):
+        self.session = requests.Session()
+        self.requests_sent = 0
+        self._lock = threading.Lock()
+        self.configure()
+
+    def configure(self, pool_size=DEFAULT_HTTP_POOL_SIZE, keep_alive=True):
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                                pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+
+    def send(self, method, url, timeout, **kwargs):
+        # Through the session, so that its headers and the proxy and CA bundle
+        # settings of the environment apply to every request
+        resp = self.session.request(method, url, timeout=timeout, **kwargs)
+        with self._lock:
+            self.requests_sent += 1
+        return resp
+
+    def get_stats(self):
+        """
+        Return the request and connection counters of the underlying urllib3
+        connection pools. Every request that did not open a new connection
+        reused a pooled one.
+        """
+        connections_opened = 0
+        pool_requests = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    connections_opened += pool.num_connections
+                    pool_requests += pool.num_requests
+        return {'requests': self.requests_sent,
+                'connections_opened': connections_opened,
+                'connections_reused': max(pool_requests - connections_opened, 0)}
+
+    def log_stats(self):
+        stats = self.get_stats()
+        LOGGER.info("HTTP transport: %s requests, %s connections opened, %s connections reused",
+                    stats['requests'], stats['connections_opened'], stats['connections_reused'])
+
+TRANSPORT = HttpTransport()
+
+def configure_transport():
+    TRANSPORT.configure(pool_size=get_config_int('http_pool_size', DEFAULT_HTTP_POOL_SIZE),
+                        keep_alive=get_config_bool('http_keep_alive', True))
+    GOVERNOR.configure(enabled=get_config_bool('rate_limit_governor', True),
+                       reserve=get_config_int('rate_limit_reserve', 0))
+
+class TokenBucket:
+    """
+    Token bucket sized from one of HubSpot's rate-limit windows. `tokens` is
+    reset from the `*-Remaining` header on every response and refills at
+    `capacity / interval` tokens per second in between.
+    """
+    def __init__(self, capacity, interval_seconds):
+        self.capacity = capacity
+        self.rate = capacity / interval_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now, reserve=0):
+        """ Take a token and return how long the caller has to wait for it. """
+        self.refill(now)
+        self.tokens -= 1
+        if self.tokens >= reserve:
+            return 0
+        return (reserve - self.tokens) / self.rate
+
+class RateLimitGovernor:
+    """
+    Paces outgoing requests using HubSpot's rate-limit response headers so the
+    tap runs close to the portal's burst limit without hitting 429s, and
+    honors `Retry-After` when a 429 is returned anyway.
+    """
+    # (bucket name, max header, remaining header, fixed interval in seconds)
+    BUCKET_HEADERS = [
+        ('interval', 'X-HubSpot-RateLimit-Max', 'X-HubSpot-RateLimit-Remaining', None),
+        ('secondly', 'X-HubSpot-RateLimit-Secondly', 'X-HubSpot-RateLimit-Secondly-Remaining', 1),
+    ]
+    INTERVAL_HEADER = 'X-HubSpot-RateLimit-Interval-Milliseconds'
+    DAILY_HEADER = 'X-HubSpot-RateLimit-Daily'
+    DAILY_REMAINING_HEADER = 'X-HubSpot-RateLimit-Daily-Remaining'
+    METRICS_LOG_INTERVAL = 60
+
+    def __init__(self):
+        self.enabled = True
+        self.reserve = 0
+        self.buckets = {}
+        self.blocked_until = 0
+        self.daily_limit = None
+        self.daily_remaining = None
+        self.throttled_seconds = 0.0
+        self._last_metrics_log = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=True, reserve=0):
+        self.enabled = enabled
+        self.reserve = reserve
+
+    def acquire(self):
+        """ Block until the next request fits within the known rate limits. """
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.blocked_until - now, 0)
+            for bucket in self.buckets.values():
+                wait = max(wait, bucket.take(now, self.reserve))
+            self.throttled_seconds += wait
+        if wait > 0:
+            LOGGER.debug("Rate limit governor: waiting %.2f seconds", wait)
+            time.sleep(wait)
+
+    def observe(self, resp):
+        """ Update the token buckets from the rate-limit headers of a response. """
+        if not self.enabled:
+            return
+        headers = resp.headers
+        with self._lock:
+            now = time.monotonic()
+            for name, max_header, remaining_header, interval in self.BUCKET_HEADERS:
+                capacity = _int_header(headers, max_header)
+                remaining = _int_header(headers, remaining_header)
+                if interval is None:
+                    interval_millis = _int_header(headers, self.INTERVAL_HEADER)
+                    interval = interval_millis / 1000.0 if interval_millis else None
+                if not capacity or remaining is None or not interval:
+                    continue
+                bucket = self.buckets.get(name)
+                if bucket is None or bucket.capacity != capacity:
+                    bucket = self.buckets[name] = TokenBucket(capacity, interval)
+                bucket.tokens = float(remaining)
+                bucket.updated = now
+
+            daily_remaining = _int_header(headers, self.DAILY_REMAINING_HEADER)
+            if daily_remaining is not None:
+                self.daily_limit = _int_header(headers, self.DAILY_HEADER)
+                if daily_remaining == 0 and self.daily_remaining != 0:
+                    LOGGER.warning("The daily HubSpot API limit of %s requests has been reached.",
+                                   self.daily_limit)
+                self.daily_remaining = daily_remaining
+
+            if resp.status_code == 429:
+                retry_after = _int_header(resp.headers, 'Retry-After')
+                if retry_after is not None:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+                for bucket in self.buckets.values():
+                    bucket.tokens = min(bucket.tokens, 0)
+
+            log_metrics = now - self._last_metrics_log >= self.METRICS_LOG_INTERVAL
+            if log_metrics:
+                self._last_metrics_log = now
+        if log_metrics:
+            self.log_metrics()
+
+    def get_state(self):
+        with self._lock:
+            now = time.monotonic()
+            state = {'buckets': {},
+                     'daily_limit': self.daily_limit,
+                     'daily_remaining': self.daily_remaining,
+                     'throttled_seconds': round(self.throttled_seconds, 3)}
+            for name, bucket in self.buckets.items():
+                bucket.refill(now)
+                state['buckets'][name] = {'capacity': bucket.capacity,
+                                          'tokens': round(bucket.tokens, 2),
+                                          'refill_per_second': round(bucket.rate, 2)}
+        return state
+
+    def log_metrics(self):
+        state = self.get_state()
+        for name, bucket in state['buckets'].items():
+            metrics.log(LOGGER, metrics.Point('gauge', 'rate_limit_tokens', bucket['tokens'],
+                                              {'bucket': name, 'capacity': bucket['capacity']}))
+        if state['daily_remaining'] is not None:
+            metrics.log(LOGGER, metrics.Point('gauge', 'rate_limit_daily_remaining',
+                                              state['daily_remaining'],
+                                              {'daily_limit': state['daily_limit']}))
+        metrics.log(LOGGER, metrics.Point('counter', 'rate_limit_throttled_seconds',
+                                          state['throttled_seconds'], {}))
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+GOVERNOR = RateLimitGovernor()
+
 #pylint: disable=invalid-name
 def acquire_access_token_from_refresh_token():
     payload = {
@@ -274,7 +623,7 @@ def acquire_access_token_from_refresh_token():
     }
 
 
-    resp = requests.post(BASE_URL + "/oauth/2026-03/token", data=payload, timeout=get_request_timeout())
+    resp = TRANSPORT.send('POST', BASE_URL + "/oauth/2026-03/token", data=payload, timeout=get_request_timeout())
     if resp.status_code == 403:
         raise InvalidAuthException(resp.content)
 
@@ -297,6 +646,95 @@ def on_giveup(details):
     raise Exception("Giving up on request after {} tries with url {} and params {}" \
                     .format(details['tries'], url, params))
 
+class RetryPolicy:
+    """
+    Decides which failed requests are retried and how long to wait between
+    tries. Connection errors, timeouts, 429s and 5xx responses are retried with
+    exponential backoff and full jitter; any other HTTP error (400, 404, ...)
+    is deterministic and fails on the first try. An optional per-run budget
+    caps the total number of retries, and retries are counted per endpoint.
+
+    Subclass it and assign an instance to `RETRY_POLICY` to change the policy.
+    """
+    RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, max_tries=5, base_delay=2, max_delay=60, budget=None):
+        self.max_tries = max_tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.retries_used = 0
+        self.retries_by_endpoint = {}
+        self._lock = threading.Lock()
+
+    def configure(self, max_tries=5, base_delay=2, max_delay=60, budget=None):
+        self.max_tries = max_tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def is_retryable(self, exc):
+        response = getattr(exc, 'response', None)
+        if response is None:
+            # Connection errors and timeouts never got a response
+            return True
+        return response.status_code in self.RETRYABLE_STATUS_CODES
+
+    def giveup(self, exc):
+        if not self.is_retryable(exc):
+            return True
+        with self._lock:
+            if self.budget is not None and self.retries_used >= self.budget:
+                LOGGER.warning("Retry budget of %s retries for this run is exhausted.", self.budget)
+                return True
+        return False
+
+    def wait_gen(self):
+        return backoff.expo(factor=self.base_delay, max_value=self.max_delay)
+
+    @staticmethod
+    def jitter(value):
+        return backoff.full_jitter(value)
+
+    def on_backoff(self, details):
+        endpoint = get_endpoint_name(details['args'][0])
+        with self._lock:
+            self.retries_used += 1
+            self.retries_by_endpoint[endpoint] = self.retries_by_endpoint.get(endpoint, 0) + 1
+        LOGGER.info("Retrying %s in %.2f seconds (try %s)", endpoint, details['wait'], details['tries'])
+
+    def log_metrics(self):
+        with self._lock:
+            retries_by_endpoint = dict(self.retries_by_endpoint)
+        for endpoint, retries in sorted(retries_by_endpoint.items()):
+            metrics.log(LOGGER, metrics.Point('counter', 'http_retries', retries,
+                                              {metrics.Tag.endpoint: endpoint}))
+
+RETRY_POLICY = RetryPolicy()
+
+def configure_retry_policy():
+    budget = get_config_int('retry_budget', None)
+    RETRY_POLICY.configure(max_tries=get_config_int('retry_max_tries', 5),
+                           base_delay=float(CONFIG.get('retry_base_delay') or 2),
+                           max_delay=float(CONFIG.get('retry_max_delay') or 60),
+                           budget=budget)
+
+def retry_with_policy(func):
+    """
+    Retry `func` according to the current `RETRY_POLICY`. The policy is looked
+    up on every call so that it can be configured or replaced at runtime.
+    """
+    # backoff for Timeout error is already included in "requests.exceptions.RequestException"
+    # as it is a parent class of "Timeout" error
+    return backoff.on_exception(lambda: RETRY_POLICY.wait_gen(),
+                                (requests.exceptions.RequestException,
+                                 requests.exceptions.HTTPError),
+                                max_tries=lambda: RETRY_POLICY.max_tries,
+                                jitter=lambda value: RETRY_POLICY.jitter(value),
+                                giveup=lambda exc: RETRY_POLICY.giveup(exc),
+                                on_backoff=lambda details: RETRY_POLICY.on_backoff(details),
+                                on_giveup=on_giveup)(func)
+
 def get_params_and_headers(params):
     """
     This function makes a params object and headers object based on the
@@ -310,8 +748,10 @@ def get_params_and_headers(params):
     if api_key is not None:
         headers = {'Authorization': 'Bearer {}'.format(CONFIG['api_key'])}
     elif hapikey is None:
-        if CONFIG['token_expires'] is None or CONFIG['token_expires'] < datetime.datetime.utcnow():
-            acquire_access_token_from_refresh_token()
+        # Worker threads share the token, so only one of them refreshes it
+        with TOKEN_REFRESH_LOCK:
+            if CONFIG['token_expires'] is None or CONFIG['token_expires'] < datetime.datetime.utcnow():
+                acquire_access_token_from_refresh_token()
         headers = {'Authorization': 'Bearer {}'.format(CONFIG['access_token'])}
     else:
         params['hapikey'] = hapikey
@@ -323,22 +763,15 @@ def get_params_and_headers(params):
     return params, headers
 
 
-# backoff for Timeout error is already included in "requests.exceptions.RequestException"
-# as it is a parent class of "Timeout" error
-@backoff.on_exception(backoff.constant,
-                      (requests.exceptions.RequestException,
-                       requests.exceptions.HTTPError),
-                      max_tries=5,
-                      jitter=None,
-                      on_giveup=on_giveup,
-                      interval=10)
+@retry_with_policy
 def request(url, params=None):
 
     params, headers = get_params_and_headers(params)
 
-    req = requests.Request('GET', url, params=params, headers=headers).prepare()
+    GOVERNOR.acquire()
     with metrics.http_request_timer(url) as timer:
-        resp = SESSION.send(req, timeout=get_request_timeout())
+        resp = TRANSPORT.send('GET', url, params=params, headers=headers, timeout=get_request_timeout())
+        GOVERNOR.observe(resp)
         timer.tags[metrics.Tag.http_status_code] = resp.status_code
         if resp.status_code == 403:
             raise SourceUnavailableException(resp.content)
@@ -355,11 +788,54 @@ def request(url, params=None):
 # }
 # }
 
-def lift_properties_and_versions(record):
+def is_field_filtered(mdata, breadcrumb):
+    """
+    Return True if the Transformer drops the field at `breadcrumb` because it is
+    not selected or unsupported.
+    """
+    inclusion = metadata.get(mdata, breadcrumb, 'inclusion')
+    if inclusion == 'automatic':
+        return False
+    return metadata.get(mdata, breadcrumb, 'selected') is False or inclusion == 'unsupported'
+
+def get_selected_fields(schema, mdata):
+    """
+    Return the top-level fields of the schema the Transformer keeps for the
+    selection in the metadata.
+    """
+    return {field for field in schema.get('properties', {})
+            if not mdata or not is_field_filtered(mdata, ('properties', field))}
+
+def get_property_keys(selected_fields):
+    """
+    Map the names in a record's `properties` to the selected `property_<name>`
+    fields they are lifted to.
+    """
+    return {field[len('property_'):]: field for field in selected_fields if field.startswith('property_')}
+
+def lift_properties_and_versions(record, selected_fields=None, property_keys=None):
+    """
+    Copy the entries of `record['properties']` to top-level `property_<name>`
+    fields and collect their versions in `properties_versions`.
+
+    Given the fields selected for the stream, only the selected properties are
+    lifted and the versions are only collected if `properties_versions` is
+    selected, as the Transformer drops everything else anyway.
+    """
+    if selected_fields is None:
+        get_property_key = "property_{}".format
+        collect_versions = True
+    else:
+        if property_keys is None:
+            property_keys = get_property_keys(selected_fields)
+        get_property_key = property_keys.get
+        collect_versions = 'properties_versions' in selected_fields
+
     for key, value in record.get('properties', {}).items():
-        computed_key = "property_{}".format(key)
-        record[computed_key] = value
-        if isinstance(value, dict):
+        computed_key = get_property_key(key)
+        if computed_key is not None:
+            record[computed_key] = value
+        if collect_versions and isinstance(value, dict):
             versions = value.get('versions')
             if versions:
                 if not record.get('properties_versions'):
@@ -367,41 +843,648 @@ def lift_properties_and_versions(record):
                 record['properties_versions'] += versions
     return record
 
-# backoff for Timeout error is already included in "requests.exceptions.RequestException"
-# as it is a parent class of "Timeout" error
-@backoff.on_exception(backoff.constant,
-                      (requests.exceptions.RequestException,
-                       requests.exceptions.HTTPError),
-                      max_tries=5,
-                      jitter=None,
-                      on_giveup=on_giveup,
-                      interval=10)
+# Returned by the coercers of a TransformPlan for values that don't match their schema
+TRANSFORM_FAILED = object()
+
+class UnsupportedSchemaException(Exception):
+    pass
+
+def join_transform_path(path):
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(str(key))
+    return ".".join(reversed(keys))
+
+class TransformPlan:
+    """
+    Applies a stream's schema and selection metadata to its records exactly like
+    `Transformer.transform`, except that the schema and metadata are evaluated once
+    into a coercer per selected field instead of on every record.
+
+    `apply` returns TRANSFORM_FAILED when a record doesn't match the schema, so
+    that the Transformer can raise the same SchemaMismatch it always has.
+    Schemas with constructs the plan doesn't cover raise
+    UnsupportedSchemaException when the plan is built.
+    """
+    def __init__(self, schema, mdata, transformer):
+        self.transformer = transformer
+        types = self.get_types(schema)
+        if 'anyOf' in schema or not types or types[0] != 'object':
+            raise UnsupportedSchemaException("The root of the schema is not an object")
+        if not schema.get('properties') or schema.get('patternProperties'):
+            raise UnsupportedSchemaException("The root of the schema has no properties")
+        if any(len(breadcrumb) > 2 for breadcrumb in mdata or {}):
+            raise UnsupportedSchemaException("The metadata selects nested fields")
+
+        # Fields the metadata deselects are dropped before the schema is applied
+        self.filtered_paths = {}
+        for breadcrumb in (mdata or {}):
+            if len(breadcrumb) == 2 and is_field_filtered(mdata, breadcrumb):
+                self.filtered_paths[breadcrumb[1]] = breadcrumb_path(breadcrumb)
+
+        self.fields = {name: self.compile(field_schema)
+                       for name, field_schema in schema['properties'].items()
+                       if name not in self.filtered_paths}
+
+    @staticmethod
+    def get_types(schema):
+        types = schema.get('type', [])
+        if not isinstance(types, list):
+            types = [types]
+        # The Transformer always tries "null" last
+        if "null" in types:
+            types = [typ for typ in types if typ != "null"] + ["null"]
+        return types
+
+    def apply(self, record):
+        fields = self.fields
+        result = {}
+        for key, value in record.items():
+            coerce = fields.get(key)
+            if coerce is None:
+                if key in self.filtered_paths:
+                    self.transformer.filtered.add(self.filtered_paths[key])
+                else:
+                    self.transformer.removed.add(str(key))
+                continue
+            value = coerce(value, (None, key))
+            if value is TRANSFORM_FAILED:
+                return TRANSFORM_FAILED
+            result[key] = value
+        return result
+
+    def compile(self, schema):
+        if 'anyOf' in schema:
+            return self.compile_first_of([self.compile(subschema) for subschema in schema['anyOf']])
+
+        if 'type' not in schema:
+            return lambda value, path: value
+
+        coercers = [self.compile_type(typ, schema) for typ in self.get_types(schema)]
+        if len(coercers) == 1:
+            return coercers[0]
+        return self.compile_first_of(coercers)
+
+    @staticmethod
+    def compile_first_of(coercers):
+        def coerce(value, path):
+            for coercer in coercers:
+                result = coercer(value, path)
+                if result is not TRANSFORM_FAILED:
+                    return result
+            return TRANSFORM_FAILED
+        return coerce
+
+    def compile_type(self, typ, schema): # pylint: disable=too-many-return-statements
+        if typ == "null":
+            return coerce_null
+        if typ == "string" and schema.get("format") == "date-time":
+            return self.compile_datetime()
+        if typ == "string" and schema.get("format") == "singer.decimal":
+            return coerce_decimal
+        if typ == "object":
+            return self.compile_object(schema)
+        if typ == "array":
+            if "items" not in schema:
+                raise UnsupportedSchemaException("Array without items")
+            return self.compile_array(self.compile(schema["items"]))
+        return SIMPLE_COERCERS.get(typ, lambda value, _path: TRANSFORM_FAILED)
+
+    def compile_datetime(self):
+        transform_datetime = self.transformer._transform_datetime # pylint: disable=protected-access
+        def coerce(value, _path):
+            value = transform_datetime(value)
+            return TRANSFORM_FAILED if value is None else value
+        return coerce
+
+    def compile_object(self, schema):
+        if schema.get('patternProperties'):
+            raise UnsupportedSchemaException("patternProperties are not supported")
+
+        properties = schema.get('properties', {})
+        if properties == {}:
+            return lambda value, _path: value if isinstance(value, dict) else TRANSFORM_FAILED
+
+        fields = {name: self.compile(field_schema) for name, field_schema in properties.items()}
+        removed = self.transformer.removed
+        def coerce(value, path):
+            if not isinstance(value, dict):
+                return TRANSFORM_FAILED
+            result = {}
+            for key, field_value in value.items():
+                coercer = fields.get(key)
+                if coercer is None:
+                    removed.add(join_transform_path((path, key)))
+                    continue
+                field_value = coercer(field_value, (path, key))
+                if field_value is TRANSFORM_FAILED:
+                    return TRANSFORM_FAILED
+                result[key] = field_value
+            return result
+        return coerce
+
+    @staticmethod
+    def compile_array(coercer):
+        def coerce(value, path):
+            if not isinstance(value, list):
+                return TRANSFORM_FAILED
+            result = []
+            for index, row in enumerate(value):
+                row = coercer(row, (path, index))
+                if row is TRANSFORM_FAILED:
+                    return TRANSFORM_FAILED
+                result.append(row)
+            return result
+        return coerce
+
+# What coercing a JSON value can raise, with a value that doesn't match its type
+COERCION_ERRORS = (ValueError, TypeError, OverflowError, decimal.InvalidOperation)
+
+def coerce_null(value, _path):
+    return None if value is None or value == "" else TRANSFORM_FAILED
+
+def coerce_decimal(value, _path):
+    if isinstance(value, (str, float, int)):
+        try:
+            return str(decimal.Decimal(str(value)))
+        except COERCION_ERRORS:
+            return TRANSFORM_FAILED
+    if isinstance(value, decimal.Decimal):
+        try:
+            return 'NaN' if value.is_snan() else str(value)
+        except COERCION_ERRORS:
+            return TRANSFORM_FAILED
+    return TRANSFORM_FAILED
+
+def coerce_string(value, _path):
+    if value is None:
+        return TRANSFORM_FAILED
+    try:
+        return str(value)
+    except COERCION_ERRORS:
+        return TRANSFORM_FAILED
+
+def coerce_integer(value, _path):
+    if isinstance(value, str):
+        value = value.replace(",", "")
+    try:
+        return int(value)
+    except COERCION_ERRORS:
+        return TRANSFORM_FAILED
+
+def coerce_number(value, _path):
+    if isinstance(value, str):
+        value = value.replace(",", "")
+    try:
+        return float(value)
+    except COERCION_ERRORS:
+        return TRANSFORM_FAILED
+
+def coerce_boolean(value, _path):
+    if isinstance(value, str) and value.lower() == "false":
+        return False
+    try:
+        return bool(value)
+    except COERCION_ERRORS:
+        return TRANSFORM_FAILED
+
+SIMPLE_COERCERS = {
+    "string": coerce_string,
+    "integer": coerce_integer,
+    "number": coerce_number,
+    "boolean": coerce_boolean,
+}
+
+class CompiledTransformer(Transformer):
+    """
+    Transformer that builds a TransformPlan the first time it sees a schema and
+    its metadata and transforms the records with it. Schemas the plan doesn't
+    support and records it can't coerce go through the Transformer instead.
+    """
+    def __init__(self, integer_datetime_fmt=UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING):
+        super().__init__(integer_datetime_fmt)
+        self.plans = {}
+
+    def get_plan(self, schema, mdata):
+        key = (id(schema), id(mdata))
+        if key not in self.plans:
+            try:
+                plan = TransformPlan(schema, mdata, self)
+            except UnsupportedSchemaException as ex:
+                LOGGER.debug("Transforming records without a plan: %s", ex)
+                plan = None
+            # The schema and metadata are kept so that their ids can't be reused
+            self.plans[key] = (schema, mdata, plan)
+        return self.plans[key][2]
+
+    def transform(self, data, schema, metadata=None): # pylint: disable=redefined-outer-name
+        if isinstance(data, dict):
+            plan = self.get_plan(schema, metadata)
+            if plan is not None:
+                record = plan.apply(data)
+                if record is not TRANSFORM_FAILED:
+                    return record
+        return super().transform(data, schema, metadata)
+
+@retry_with_policy
 def post_search_endpoint(url, data, params=None):
 
     params, headers = get_params_and_headers(params)
     headers['content-type'] = "application/json"
 
+    GOVERNOR.acquire()
     with metrics.http_request_timer(url) as _:
-        resp = requests.post(
-            url=url,
-            json=data,
-            params=params,
-            timeout=get_request_timeout(),
-            headers=headers
-        )
+        resp = TRANSPORT.send('POST', url, json=data, params=params, headers=headers,
+                              timeout=get_request_timeout())
+        GOVERNOR.observe(resp)
 
         resp.raise_for_status()
 
     return resp
 
+PORTAL_ID = None
+
+def get_portal_id():
+    """
+    Return the id of the portal the credentials belong to. The v3 endpoints
+    don't include it in their records, so it is read once from the account
+    details.
+    """
+    global PORTAL_ID
+    with PORTAL_ID_LOCK:
+        if PORTAL_ID is None:
+            portal_id = request(get_url('account_details')).json().get('portalId')
+            if portal_id is None:
+                raise RuntimeError("Unexpected API response: no portalId in the account details")
+            PORTAL_ID = portal_id
+    return PORTAL_ID
+
+class WorkerPool:
+    """
+    Bounded pool of worker threads for fetching independent API resources
+    concurrently. Results of `map` keep the order of the inputs. With a single
+    worker, calls run inline on the calling thread.
+    """
+    def __init__(self, workers):
+        self.workers = max(workers, 1)
+        self._executor = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._executor is not None:
+            # Don't start queued work if the sync is failing
+            self._executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+            self._executor = None
+
+    def map(self, func, items):
+        if self._executor is None:
+            return [func(item) for item in items]
+        return list(self._executor.map(func, items))
+
+    def submit(self, func, *args):
+        if self._executor is None:
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as ex: # pylint: disable=broad-except
+                future.set_exception(ex)
+            return future
+        return self._executor.submit(func, *args)
+
+class ReadAhead:
+    """
+    Runs a page generator on a background thread so that the next pages are
+    fetched while the consumer transforms and emits the current one.
+
+    The generator yields `(page, size)` tuples. At most `depth` pages, counting
+    the one being fetched, and `max_bytes` of response bodies are held ahead of
+    the consumer, but a single page is always let through. Only the consumer
+    advances bookmarks and offsets, so state still only moves once a page is
+    fully emitted. With a depth of 0, pages are fetched inline.
+
+    Use it as a context manager, so that the producer is stopped and joined
+    when the consumer stops before the last page.
+    """
+    def __init__(self, pages, depth=None, max_bytes=None):
+        self.pages = pages
+        self.depth = get_config_int('read_ahead_depth', DEFAULT_READ_AHEAD_DEPTH) if depth is None else depth
+        self.max_bytes = get_config_int('read_ahead_max_bytes', DEFAULT_READ_AHEAD_MAX_BYTES) if max_bytes is None else max_bytes
+        self._buffer = collections.deque()
+        self._buffered_bytes = 0
+        # The buffered pages plus the page being fetched
+        self._held = 0
+        self._condition = threading.Condition()
+        self._producer = None
+        self._done = False
+        self._stopped = False
+        self._error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _has_room(self, size):
+        if not self._buffer:
+            return True
+        return self._buffered_bytes + size <= self.max_bytes
+
+    def _produce(self):
+        try:
+            while True:
+                with self._condition:
+                    while not self._stopped and self._held >= self.depth:
+                        self._condition.wait()
+                    if self._stopped:
+                        break
+                    self._held += 1
+                try:
+                    page, size = next(self.pages)
+                except StopIteration:
+                    break
+                with self._condition:
+                    while not self._stopped and not self._has_room(size):
+                        self._condition.wait()
+                    if self._stopped:
+                        break
+                    self._buffer.append((page, size))
+                    self._buffered_bytes += size
+                    self._condition.notify_all()
+        except Exception as ex: # pylint: disable=broad-except
+            self._error = ex
+        finally:
+            self.pages.close()
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+    def __iter__(self):
+        if self.depth <= 0:
+            for page, _ in self.pages:
+                yield page
+            return
+
+        self._producer = threading.Thread(target=self._produce, name='read-ahead', daemon=True)
+        self._producer.start()
+        try:
+            while True:
+                with self._condition:
+                    while not self._buffer and not self._done:
+                        self._condition.wait()
+                    if not self._buffer:
+                        if self._error is not None:
+                            raise self._error
+                        return
+                    page, size = self._buffer.popleft()
+                    self._buffered_bytes -= size
+                    self._held -= 1
+                    self._condition.notify_all()
+                yield page
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stop fetching pages. Waits for the producer, which finishes the request
+        in flight, so that no thread is left behind.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._producer is None:
+            close = getattr(self.pages, 'close', None)
+            if close is not None:
+                close()
+        elif self._producer is not threading.current_thread():
+            self._producer.join()
+
+class BufferedOutput:
+    """
+    Stands in for stdout and buffers the Singer messages written to it, so
+    that a record costs a write to the buffer instead of a write and a flush
+    of stdout. `flush` only writes the buffer through once `max_bytes` are
+    buffered or `max_seconds` have passed since the last flush; `force_flush`
+    always does, and is called after every STATE message so a state is never
+    held back.
+    """
+    def __init__(self, stream, max_bytes=DEFAULT_OUTPUT_BUFFER_BYTES, max_seconds=DEFAULT_OUTPUT_BUFFER_SECONDS):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.last_flush = time.monotonic()
+        self.flushes = 0
+        self.flushed_bytes = 0
+        self.max_flush_bytes = 0
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            self.buffer.append(text)
+            self.buffered_bytes += len(text)
+        return len(text)
+
+    def flush(self):
+        if self.buffered_bytes >= self.max_bytes or time.monotonic() - self.last_flush >= self.max_seconds:
+            self.force_flush()
+
+    def force_flush(self):
+        with self._lock:
+            if self.buffer:
+                self.stream.write(''.join(self.buffer))
+                self.flushes += 1
+                self.flushed_bytes += self.buffered_bytes
+                self.max_flush_bytes = max(self.max_flush_bytes, self.buffered_bytes)
+                self.buffer = []
+                self.buffered_bytes = 0
+            self.stream.flush()
+            self.last_flush = time.monotonic()
+
+    def log_metrics(self):
+        metrics.log(LOGGER, metrics.Point('counter', 'output_flushes', self.flushes, {}))
+        metrics.log(LOGGER, metrics.Point('counter', 'output_flushed_bytes', self.flushed_bytes, {}))
+        metrics.log(LOGGER, metrics.Point('gauge', 'output_max_flush_bytes', self.max_flush_bytes, {}))
+
+@contextlib.contextmanager
+def buffered_stdout():
+    """
+    Buffer stdout with a `BufferedOutput` for the duration of the block. A
+    zero `output_buffer_bytes` config disables buffering.
+    """
+    max_bytes = get_config_int('output_buffer_bytes', DEFAULT_OUTPUT_BUFFER_BYTES)
+    if max_bytes <= 0:
+        yield
+        return
+
+    output = BufferedOutput(sys.stdout, max_bytes=max_bytes,
+                            max_seconds=float(CONFIG.get('output_buffer_seconds') or DEFAULT_OUTPUT_BUFFER_SECONDS))
+    sys.stdout = output
+    try:
+        yield
+    finally:
+        output.force_flush()
+        sys.stdout = output.stream
+        output.log_metrics()
+
+class RecordEmitter:
+    """
+    Writes the RECORD messages of one stream without going through the
+    generic Singer message formatter. The constant start of the message is
+    rendered once and the formatted `time_extracted` is reused for as long as
+    it doesn't change, which is usually a page, so only the record itself is
+    encoded per row.
+
+    With the default encoder the output is byte for byte what
+    `singer.write_record` writes. With `use_orjson`, records are encoded by
+    orjson, which writes compact JSON; records it can't encode fall back to
+    the default encoder.
+    """
+    def __init__(self, stream_name, use_orjson=False):
+        self.prefix = '{"type": "RECORD", "stream": ' + simplejson.dumps(stream_name) + ', "record": '
+        self.use_orjson = use_orjson and orjson is not None
+        # (time_extracted, suffix), replaced as a whole as several threads may write the same stream
+        self._cached_suffix = (None, '}\n')
+
+    def encode_record(self, record):
+        if self.use_orjson:
+            try:
+                return orjson.dumps(record).decode('utf-8')
+            except TypeError:
+                pass
+        return simplejson.dumps(record, use_decimal=True)
+
+    def get_suffix(self, time_extracted):
+        if not time_extracted:
+            return '}\n'
+        cached_time_extracted, suffix = self._cached_suffix
+        if time_extracted != cached_time_extracted:
+            formatted = utils.strftime(time_extracted.astimezone(pytz.utc))
+            suffix = ', "time_extracted": ' + simplejson.dumps(formatted) + '}\n'
+            self._cached_suffix = (time_extracted, suffix)
+        return suffix
+
+    def format_record(self, record, time_extracted=None):
+        return self.prefix + self.encode_record(record) + self.get_suffix(time_extracted)
+
+class MessageWriter:
+    """
+    Single writer for the Singer messages of every stream, so that records,
+    schemas and states written from different threads never interleave
+    within a line.
+
+    A thread syncing a stream on its own copy of the state can install a
+    `merge_state` function; the states it writes are then merged into the
+    shared state and the merged state is written instead.
+
+    With the `record_encoder` config set to `fast` or `orjson`, records are
+    written through a `RecordEmitter` per stream instead of `singer.write_record`.
+
+    A state is only written if it differs from the last state written, and
+    once `state_interval_seconds` have passed or `state_interval_records`
+    records were written since. Until then the latest state is kept as a
+    JSON snapshot and written by `flush_state`, or with `force`.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._local = threading.local()
+        self._emitters = {}
+        self._written_state = None
+        self._pending_state = None
+        self._state_written_at = time.monotonic()
+        self._records_since_state = 0
+
+    def get_emitter(self, stream_name):
+        record_encoder = CONFIG.get('record_encoder') or 'singer'
+        if record_encoder == 'singer':
+            return None
+        emitter = self._emitters.get((stream_name, record_encoder))
+        if emitter is None:
+            if record_encoder == 'orjson' and orjson is None:
+                LOGGER.warning("orjson is not installed, records are encoded with simplejson instead.")
+            emitter = RecordEmitter(stream_name, use_orjson=record_encoder == 'orjson')
+            self._emitters[(stream_name, record_encoder)] = emitter
+        return emitter
+
+    def write_schema(self, *args, **kwargs):
+        with self.lock:
+            singer.write_schema(*args, **kwargs)
+
+    def write_record(self, stream_name, record, stream_alias=None, time_extracted=None):
+        emitter = self.get_emitter(stream_alias or stream_name)
+        if emitter is None:
+            with self.lock:
+                singer.write_record(stream_name, record, stream_alias, time_extracted=time_extracted)
+                self._records_since_state += 1
+            return
+        line = emitter.format_record(record, time_extracted)
+        with self.lock:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            self._records_since_state += 1
+
+    def write_state(self, state, force=False):
+        merge_state = getattr(self._local, 'merge_state', None)
+        with self.lock:
+            if merge_state is not None:
+                state = merge_state(state)
+            # Later changes to the state dict must not leak into a pending state
+            snapshot = simplejson.dumps(state, use_decimal=True)
+            if snapshot == self._written_state:
+                self._pending_state = None
+                return
+            self._pending_state = snapshot
+            if force or self.is_state_due():
+                self.flush_state()
+
+    def is_state_due(self):
+        interval_seconds = float(CONFIG.get('state_interval_seconds') or 0)
+        interval_records = get_config_int('state_interval_records', 0)
+        if not interval_seconds and not interval_records:
+            return True
+        if interval_seconds and time.monotonic() - self._state_written_at >= interval_seconds:
+            return True
+        return bool(interval_records) and self._records_since_state >= interval_records
+
+    def flush_state(self):
+        """ Write the pending state, if there is one. """
+        with self.lock:
+            if self._pending_state is None:
+                return
+            singer.write_state(simplejson.loads(self._pending_state, use_decimal=True))
+            self._written_state = self._pending_state
+            self._pending_state = None
+            self._state_written_at = time.monotonic()
+            self._records_since_state = 0
+            if isinstance(sys.stdout, BufferedOutput):
+                sys.stdout.force_flush()
+
+    @contextlib.contextmanager
+    def merging_state(self, merge_state):
+        self._local.merge_state = merge_state
+        try:
+            yield
+        finally:
+            self._local.merge_state = None
+
+WRITER = MessageWriter()
+
 def merge_responses(v1_data, v3_data):
+    """
+    Merge the properties of the v3 deals into the v1 deals with the same id.
+    The v1 records are updated in place.
+    """
+    v3_properties_by_id = {v3_record.get('id'): v3_record['properties'] for v3_record in v3_data}
     for v1_record in v1_data:
-        v1_id = v1_record.get('dealId')
-        for v3_record in v3_data:
-            v3_id = v3_record.get('id')
-            if str(v1_id) == v3_id:
-                v1_record['properties'] = {**v1_record['properties'],
-                                           **v3_record['properties']}
+        v3_properties = v3_properties_by_id.get(str(v1_record.get('dealId')))
+        if v3_properties is not None:
+            v1_record['properties'].update(v3_properties)
 
 def process_v3_deals_records(v3_data):
     """
@@ -410,14 +1493,13 @@ def process_v3_deals_records(v3_data):
        'hs_v2_date_exited_*'
     2. changes a key value pair in `properties` to a key paired to an
        object with a key 'value' and the original value
+    The records are updated in place.
     """
-    transformed_v3_data = []
     for record in v3_data:
-        new_properties = {field_name : {'value': field_value}
-                          for field_name, field_value in record['properties'].items()
-                          if any(prefix in field_name for prefix in V3_PREFIXES)}
-        transformed_v3_data.append({**record, 'properties' : new_properties})
-    return transformed_v3_data
+        record['properties'] = {field_name : {'value': field_value}
+                                for field_name, field_value in record['properties'].items()
+                                if V3_PREFIXES_PATTERN.search(field_name)}
+    return v3_data
 
 def get_v3_deals(v3_fields, v1_data):
     v1_ids = [{'id': str(record['dealId'])} for record in v1_data]
@@ -430,6 +1512,16 @@ def get_v3_deals(v3_fields, v1_data):
 
 #pylint: disable=line-too-long
 def gen_request(STATE, tap_stream_id, url, params, path, more_key, offset_keys, offset_targets, v3_fields=None):
+    for page in gen_request_pages(STATE, tap_stream_id, url, params, path, more_key, offset_keys, offset_targets, v3_fields=v3_fields):
+        for row in page:
+            yield row
+
+def gen_request_pages(STATE, tap_stream_id, url, params, path, more_key, offset_keys, offset_targets, v3_fields=None):
+    """
+    Offset-based API pagination that yields the rows of one page at a time.
+    The offset of the next page is only written to the state once the
+    consumer asks for the next page, i.e. after the current page is emitted.
+    """
     if len(offset_keys) != len(offset_targets):
         raise ValueError("Number of offset_keys must match number of offset_targets")
 
@@ -437,37 +1529,76 @@ def gen_request(STATE, tap_stream_id, url, params, path, more_key, offset_keys,
         params.update(singer.get_offset(STATE, tap_stream_id))
 
     with metrics.record_counter(tap_stream_id) as counter:
-        while True:
-            data = request(url, params).json()
+        with ReadAhead(gen_offset_pages(url, params, path, more_key, offset_keys, offset_targets, v3_fields=v3_fields)) as pages:
+            for data in pages:
+                counter.increment(len(data[path]))
+                yield data[path]
 
-            if data.get(path) is None:
-                raise RuntimeError("Unexpected API response: {} not in {}".format(path, data.keys()))
+                if not data.get(more_key, False):
+                    break
 
-            if v3_fields:
-                v3_data = get_v3_deals(v3_fields, data[path])
+                STATE = singer.clear_offset(STATE, tap_stream_id)
+                for key, target in zip(offset_keys, offset_targets):
+                    if key in data:
+                        params[target] = data[key]
+                        STATE = singer.set_offset(STATE, tap_stream_id, target, data[key])
 
-                # The shape of v3_data is different than the V1 response,
-                # so we transform v3 to look like v1
-                transformed_v3_data = process_v3_deals_records(v3_data)
-                merge_responses(data[path], transformed_v3_data)
+                WRITER.write_state(STATE)
 
-            for row in data[path]:
-                counter.increment()
-                yield row
+    STATE = singer.clear_offset(STATE, tap_stream_id)
+    WRITER.write_state(STATE)
 
-            if not data.get(more_key, False):
-                break
+def fetch_page(url, params, path):
+    """ Fetch one page and return it along with the size of the response body. """
+    resp = request(url, params)
+    data = resp.json()
+
+    if data.get(path) is None:
+        raise RuntimeError("Unexpected API response: {} not in {}".format(path, data.keys()))
+
+    return data, len(resp.content)
+
+def merge_v3_deals(rows, v3_data):
+    # The shape of v3_data is different than the V1 response,
+    # so we transform v3 to look like v1
+    transformed_v3_data = process_v3_deals_records(v3_data)
+    merge_responses(rows, transformed_v3_data)
+
+def gen_offset_pages(url, params, path, more_key, offset_keys, offset_targets, v3_fields=None):
+    """
+    Fetch the pages of an offset-paginated endpoint without touching the state,
+    yielding each page along with its size.
+
+    With `v3_fields`, each page of v1 deals is merged with the stage-history
+    fields from the v3 batch read endpoint. In pipelined mode (the default,
+    `deals_v3_pipelining`), the v3 batch read of page N runs on a background
+    thread while the v1 request for page N+1 is in flight.
+    """
+    params = dict(params)
+    pipelined = bool(v3_fields) and get_config_bool('deals_v3_pipelining', True)
 
-            STATE = singer.clear_offset(STATE, tap_stream_id)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        data, size = fetch_page(url, params, path)
+        while True:
+            has_more = data.get(more_key, False)
             for key, target in zip(offset_keys, offset_targets):
                 if key in data:
                     params[target] = data[key]
-                    STATE = singer.set_offset(STATE, tap_stream_id, target, data[key])
 
-            singer.write_state(STATE)
+            next_page = None
+            if pipelined and has_more:
+                v3_future = executor.submit(get_v3_deals, v3_fields, data[path])
+                next_page = fetch_page(url, dict(params), path)
+                merge_v3_deals(data[path], v3_future.result())
+            elif v3_fields:
+                merge_v3_deals(data[path], get_v3_deals(v3_fields, data[path]))
 
-    STATE = singer.clear_offset(STATE, tap_stream_id)
-    singer.write_state(STATE)
+            yield data, size
+
+            if not has_more:
+                break
+
+            data, size = next_page if next_page is not None else fetch_page(url, dict(params), path)
 
 
 default_contact_params = {
@@ -491,54 +1622,285 @@ def sync_contacts(STATE, ctx):
 class ValidationPredFailed(Exception):
     pass
 
-# companies_recent only supports 10,000 results. If there are more than this,
-# we'll need to use the companies_all endpoint
+# companies_recent and the companies search only support 10,000 results. If
+# there are more than this, we'll need to use the companies_all endpoint
 def use_recent_companies_endpoint(response):
     return response["total"] < 10000
 
 default_contacts_by_company_params = {'count' : 100}
 
 # NB> to do: support stream aliasing and field selection
-def _sync_contacts_by_company_batch_read(STATE, ctx, company_ids):
+def _sync_contacts_by_company_batch_read(STATE, ctx, company_ids, schema=None, save_offset=True):
     # Return state as it is if company ids list is empty
     if len(company_ids) == 0:
         return STATE
 
-    schema = load_schema(CONTACTS_BY_COMPANY)
+    if schema is None:
+        schema = load_sync_schema(ctx.get_catalog_from_id(CONTACTS_BY_COMPANY), CONTACTS_BY_COMPANY)
     catalog = ctx.get_catalog_from_id(singer.get_currently_syncing(STATE))
     mdata = metadata.to_map(catalog.get('metadata'))
     url = get_url("contacts_by_company_v3")
 
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
+    with CompiledTransformer() as bumble_bee:
         with metrics.record_counter(CONTACTS_BY_COMPANY) as counter:
             body = {'inputs': [{'id': company_id} for company_id in company_ids]}
             contacts_to_company_rows = post_search_endpoint(url, body).json()
+            time_extracted = utils.now()
             for row in contacts_to_company_rows['results']:
                 for contact in row['to']:
                     counter.increment()
                     record = {'company-id' : row['from']['id'],
                               'contact-id' : contact['id']}
                     record = bumble_bee.transform(lift_properties_and_versions(record), schema, mdata)
-                    singer.write_record("contacts_by_company", record, time_extracted=utils.now())
-    STATE = singer.set_offset(STATE, "contacts_by_company", 'offset', company_ids[-1])
-    singer.write_state(STATE)
+                    WRITER.write_record("contacts_by_company", record, time_extracted=time_extracted)
+    # The last company id is only where to resume `companies_all`, which is
+    # paged by company id, not the search, which is ordered by modification time
+    if save_offset:
+        STATE = singer.set_offset(STATE, "contacts_by_company", 'offset', company_ids[-1])
+    WRITER.write_state(STATE)
     return STATE
 
 default_company_params = {
     'limit': 250, 'properties': ["createdate", "hs_lastmodifieddate"]
 }
 
+def get_company_modified_time(row, bookmark_field_in_record):
+    row_properties = row['properties']
+    modified_time = None
+    if bookmark_field_in_record in row_properties:
+        # Hubspot returns timestamps in millis
+        timestamp_millis = row_properties[bookmark_field_in_record]['timestamp'] / 1000.0
+        modified_time = datetime.datetime.fromtimestamp(timestamp_millis, datetime.timezone.utc)
+    elif 'createdate' in row_properties:
+        # Hubspot returns timestamps in millis
+        timestamp_millis = row_properties['createdate']['timestamp'] / 1000.0
+        modified_time = datetime.datetime.fromtimestamp(timestamp_millis, datetime.timezone.utc)
+    return modified_time
+
+# The CRM search endpoints return at most 200 results per page
+CRM_SEARCH_LIMIT = 200
+
+def search_modified_objects(url, since, properties, after=None):
+    """
+    Search the CRM objects modified since `since`, in milliseconds, oldest first.
+    """
+    body = {'filterGroups': [{'filters': [{'propertyName': 'hs_lastmodifieddate',
+                                           'operator': 'GTE',
+                                           'value': str(since)}]}],
+            'sorts': [{'propertyName': 'hs_lastmodifieddate', 'direction': 'ASCENDING'}],
+            'properties': properties,
+            'limit': CRM_SEARCH_LIMIT}
+    if after:
+        body['after'] = after
+    return post_search_endpoint(url, body)
+
+def gen_modified_search_pages(url, since, properties, data, size=0):
+    """
+    Yield the pages of the CRM objects modified since `since`, in milliseconds,
+    along with their size, starting from the first page of the search `data`.
+
+    Following `after` through one search skips objects: an object modified
+    during the sync moves to the end of the results and shifts the ones after
+    it back by one. Instead every page searches again from the last
+    modification time seen and drops the objects already yielded at that
+    time. `after` is only followed when a whole page has already been yielded,
+    which takes more objects modified in the same millisecond than fit in a
+    page.
+    """
+    yielded_at_since = set()
+    while True:
+        results = [result for result in data['results'] if result['id'] not in yielded_at_since]
+        for result in results:
+            modified = (result.get('properties') or {}).get('hs_lastmodifieddate')
+            modified = int(round(utils.strptime_to_utc(modified).timestamp() * 1000)) if modified else since
+            if modified > since:
+                since = modified
+                yielded_at_since = set()
+            yielded_at_since.add(result['id'])
+        if results:
+            yield results, size
+
+        after = (data.get('paging') or {}).get('next', {}).get('after')
+        if not after:
+            break
+        resp = search_modified_objects(url, since, properties, None if results else after)
+        data, size = resp.json(), len(resp.content)
+
+COMPANIES_SEARCH_PROPERTIES = ['createdate', 'hs_lastmodifieddate']
+
+def search_modified_companies(since, after=None):
+    """
+    Search the companies modified since `since`, in milliseconds, oldest first.
+    """
+    return search_modified_objects(get_url('companies_search'), since, COMPANIES_SEARCH_PROPERTIES, after).json()
+
+def search_result_to_company_row(result):
+    """
+    Reshape a company found by the search into the `companies_all` layout.
+    """
+    properties = {}
+    for name in COMPANIES_SEARCH_PROPERTIES:
+        value = (result.get('properties') or {}).get(name)
+        if value:
+            timestamp = int(round(utils.strptime_to_utc(value).timestamp() * 1000))
+            properties[name] = {'value': str(timestamp), 'timestamp': timestamp}
+    return {'portalId': get_portal_id(),
+            'companyId': int(result['id']),
+            'isDeleted': result.get('archived', False),
+            'properties': properties}
+
+def gen_modified_company_pages(since, data):
+    """
+    Yield the pages of the companies modified since `since`, in milliseconds,
+    in the `companies_all` layout.
+    """
+    with metrics.record_counter('companies') as counter:
+        for results, _ in gen_modified_search_pages(get_url('companies_search'), since,
+                                                    COMPANIES_SEARCH_PROPERTIES, data):
+            rows = [search_result_to_company_row(result) for result in results]
+            counter.increment(len(rows))
+            yield rows
+
+def get_modified_company_pages(start):
+    """
+    Return the pages of the companies modified since `start`, or None if so
+    many were modified that every company is synced instead.
+    """
+    since = int(round(start.timestamp() * 1000))
+    data = search_modified_companies(since)
+    if not use_recent_companies_endpoint(data):
+        LOGGER.info("%s companies were modified since %s, syncing all companies", data['total'], start)
+        return None
+    LOGGER.info("Syncing the %s companies modified since %s", data['total'], start)
+    return gen_modified_company_pages(since, data)
+
+def get_company_detail(company_id):
+    return request(get_url("companies_detail", company_id=company_id)).json()
+
+# Batch reads that include `propertiesWithHistory` accept at most 50 inputs
+COMPANIES_BATCH_READ_SIZE = 50
+
+def get_companies_batch_read_properties(schema, mdata):
+    """
+    Return the company properties to request from the batch read endpoint.
+    The `properties` and `properties_versions` fields contain every property,
+    otherwise only the selected `property_*` fields are needed.
+    """
+    all_properties = list(schema['properties']['properties']['properties'].keys())
+    for field in ['properties', 'properties_versions']:
+        field_metadata = mdata.get(('properties', field), {})
+        if utils.should_sync_field(field_metadata.get('inclusion'), field_metadata.get('selected')):
+            return all_properties
+    return [name for name in all_properties
+            if utils.should_sync_field(mdata.get(('properties', 'property_' + name), {}).get('inclusion'),
+                                       mdata.get(('properties', 'property_' + name), {}).get('selected'))]
+
+def v3_history_to_v2_versions(name, history):
+    return [{'name': name,
+             'value': version.get('value'),
+             'timestamp': int(round(utils.strptime_to_utc(version['timestamp']).timestamp() * 1000)),
+             'source': version.get('sourceType'),
+             'sourceId': version.get('sourceId'),
+             'sourceVid': []}
+            for version in history]
+
+def v3_history_to_v2_properties(properties_with_history, latest_version_only=False):
+    """
+    Reshape the `propertiesWithHistory` of a CRM v3 object into v2 properties:
+    every property is an object with the latest `value`, `timestamp`, `source`
+    and `sourceId`, plus its `versions`, newest first.
+    """
+    properties = {}
+    for name, history in (properties_with_history or {}).items():
+        if not history:
+            continue
+        versions = v3_history_to_v2_versions(name, history)
+        latest = versions[0]
+        properties[name] = {'value': latest['value'],
+                            'timestamp': latest['timestamp'],
+                            'source': latest['source'],
+                            'sourceId': latest['sourceId'],
+                            'versions': versions[:1] if latest_version_only else versions}
+    return properties
+
+def get_v3_datetime_properties(schema):
+    """
+    Return the names of the CRM object properties whose value is a date-time.
+    """
+    properties = schema['properties'].get('properties', {}).get('properties', {})
+    return {name for name, property_schema in properties.items()
+            if property_schema.get('properties', {}).get('value', {}).get('format') == 'date-time'}
+
+def v3_datetime_to_v1(value):
+    if not value:
+        return value
+    return str(int(round(utils.strptime_to_utc(value).timestamp() * 1000)))
+
+def v3_property_datetimes_to_v1(prop):
+    """
+    Convert the ISO date-time values of a v2 property and its versions to
+    milliseconds, like the v1 and v2 endpoints return them.
+    """
+    prop['value'] = v3_datetime_to_v1(prop['value'])
+    for version in prop.get('versions', []):
+        version['value'] = v3_datetime_to_v1(version['value'])
+
+def v3_company_to_v2(row, v3_record, datetime_properties=()):
+    """
+    Reshape a CRM v3 company into the `companies_detail` layout, with
+    date-times in milliseconds like v2 values.
+    """
+    properties = v3_history_to_v2_properties(v3_record.get('propertiesWithHistory'))
+    for name, prop in properties.items():
+        if name in datetime_properties:
+            v3_property_datetimes_to_v1(prop)
+    return {'portalId': row.get('portalId'),
+            'companyId': row['companyId'],
+            'isDeleted': row.get('isDeleted', v3_record.get('archived', False)),
+            'properties': properties}
+
+def get_company_details_batch(rows, property_names, datetime_properties=()):
+    body = {'inputs': [{'id': str(row['companyId'])} for row in rows],
+            'properties': property_names,
+            'propertiesWithHistory': property_names}
+    results = post_search_endpoint(get_url('companies_v3_batch_read'), body).json()['results']
+    v3_records = {v3_record['id']: v3_record for v3_record in results}
+    return {row['companyId']: v3_company_to_v2(row, v3_records[str(row['companyId'])], datetime_properties)
+            for row in rows if str(row['companyId']) in v3_records}
+
+def get_company_details(pool, rows, batch_read_properties=None, datetime_properties=()):
+    """
+    Fetch the details of a page of companies concurrently and return them by
+    company id. With `batch_read_properties`, the details are read 50 at a time
+    through the CRM v3 batch read endpoint instead of one request per company.
+    """
+    if batch_read_properties is None:
+        company_ids = [row['companyId'] for row in rows]
+        return dict(zip(company_ids, pool.map(get_company_detail, company_ids)))
+
+    batches = [rows[i:i + COMPANIES_BATCH_READ_SIZE] for i in range(0, len(rows), COMPANIES_BATCH_READ_SIZE)]
+    details = {}
+
+    def read_batch(batch):
+        return get_company_details_batch(batch, batch_read_properties, datetime_properties)
+
+    for batch_details in pool.map(read_batch, batches):
+        details.update(batch_details)
+    return details
+
 def sync_companies(STATE, ctx):
     catalog = ctx.get_catalog_from_id(singer.get_currently_syncing(STATE))
     mdata = metadata.to_map(catalog.get('metadata'))
-    bumble_bee = Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING)
+    bumble_bee = CompiledTransformer()
     bookmark_key = 'property_hs_lastmodifieddate'
     bookmark_field_in_record = 'hs_lastmodifieddate'
 
     start = utils.strptime_to_utc(get_start(STATE, "companies", bookmark_key, older_bookmark_key=bookmark_field_in_record))
     LOGGER.info("sync_companies from %s", start)
-    schema = load_schema('companies')
-    singer.write_schema("companies", schema, ["companyId"], [bookmark_key], catalog.get('stream_alias'))
+    schema = load_sync_schema(catalog, 'companies')
+    selected_fields = get_selected_fields(schema, mdata)
+    property_keys = get_property_keys(selected_fields)
+    WRITER.write_schema("companies", schema, ["companyId"], [bookmark_key], catalog.get('stream_alias'))
 
     # Because this stream doesn't query by `lastUpdated`, it cycles
     # through the data set every time. The issue with this is that there
@@ -548,13 +1910,20 @@ def sync_companies(STATE, ctx):
     # sync's start in the state and not move the bookmark past this value.
     current_sync_start = get_current_sync_start(STATE, "companies") or utils.now()
     STATE = write_current_sync_start(STATE, "companies", current_sync_start)
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
 
     url = get_url("companies_all")
     max_bk_value = start
+
+    # Optionally read the company details in batches through the CRM v3 API
+    batch_read_properties = None
+    datetime_properties = ()
+    if get_config_bool('companies_batch_read', False):
+        batch_read_properties = get_companies_batch_read_properties(schema, mdata)
+        datetime_properties = get_v3_datetime_properties(schema)
     if CONTACTS_BY_COMPANY in ctx.selected_stream_ids:
-        contacts_by_company_schema = load_schema(CONTACTS_BY_COMPANY)
-        singer.write_schema('contacts_by_company', contacts_by_company_schema, ["company-id", "contact-id"])
+        contacts_by_company_schema = load_sync_schema(ctx.get_catalog_from_id(CONTACTS_BY_COMPANY), CONTACTS_BY_COMPANY)
+        WRITER.write_schema('contacts_by_company', contacts_by_company_schema, ["company-id", "contact-id"])
 
         # This code handles the interrutped sync. When sync is interrupted,
         # last batch of `contacts_by_company` extraction may get interrupted.
@@ -570,51 +1939,69 @@ def sync_companies(STATE, ctx):
                 offset = contacts_by_company_offset
 
             STATE = singer.set_offset(STATE, 'companies', 'offset', offset)
-            singer.write_state(STATE)
+            WRITER.write_state(STATE)
+
+    # Once the companies were synced, only the companies modified since the
+    # bookmark are searched for, unless the full scan has to be resumed or
+    # more companies were modified than the search can return. An interrupted
+    # search is resumed by searching again from the bookmark.
+    pages = None
+    if get_config_bool('companies_incremental_search', True) \
+       and singer.get_bookmark(STATE, 'companies', bookmark_key) \
+       and not singer.get_offset(STATE, 'companies', {}).get('offset'):
+        pages = get_modified_company_pages(start)
+    searching = pages is not None
+    if pages is None:
+        pages = gen_request_pages(STATE, 'companies', url, default_company_params, 'companies', 'has-more', ['offset'], ['offset'])
 
     # This list collects the recently modified company ids to extract `contacts_by_company` records in batch
     company_ids = []
-    with bumble_bee:
-        for row in gen_request(STATE, 'companies', url, default_company_params, 'companies', 'has-more', ['offset'], ['offset']):
-            row_properties = row['properties']
-            modified_time = None
-            if bookmark_field_in_record in row_properties:
-                # Hubspot returns timestamps in millis
-                timestamp_millis = row_properties[bookmark_field_in_record]['timestamp'] / 1000.0
-                modified_time = datetime.datetime.fromtimestamp(timestamp_millis, datetime.timezone.utc)
-            elif 'createdate' in row_properties:
-                # Hubspot returns timestamps in millis
-                timestamp_millis = row_properties['createdate']['timestamp'] / 1000.0
-                modified_time = datetime.datetime.fromtimestamp(timestamp_millis, datetime.timezone.utc)
-
-            if modified_time and modified_time >= max_bk_value:
-                max_bk_value = modified_time
-
-            if not modified_time or modified_time >= start:
-                record = request(get_url("companies_detail", company_id=row['companyId'])).json()
-                record = bumble_bee.transform(lift_properties_and_versions(record), schema, mdata)
-                singer.write_record("companies", record, catalog.get('stream_alias'), time_extracted=utils.now())
+    with bumble_bee, WorkerPool(get_config_int('companies_detail_workers', DEFAULT_DETAIL_WORKERS)) as pool:
+        for page in pages:
+            modified_times = [get_company_modified_time(row, bookmark_field_in_record) for row in page]
+
+            # Fetch the details of the modified companies of this page concurrently,
+            # the records are still written in the order of the page.
+            modified_rows = [row for row, modified_time in zip(page, modified_times)
+                             if not modified_time or modified_time >= start]
+            details = get_company_details(pool, modified_rows, batch_read_properties, datetime_properties)
+            time_extracted = utils.now()
+
+            for row, modified_time in zip(page, modified_times):
+                if modified_time and modified_time >= max_bk_value:
+                    max_bk_value = modified_time
 
-            if CONTACTS_BY_COMPANY in ctx.selected_stream_ids:
-                # Collect the recently modified company id
                 if not modified_time or modified_time >= start:
-                    company_ids.append(row['companyId'])
+                    record = details.get(row['companyId'])
+                    if record is None:
+                        LOGGER.warning("Company %s was not returned by the batch read endpoint, skipping it.", row['companyId'])
+                    else:
+                        record = bumble_bee.transform(lift_properties_and_versions(record, selected_fields, property_keys),
+                                                      schema, mdata)
+                        WRITER.write_record("companies", record, catalog.get('stream_alias'), time_extracted=time_extracted)
+
+                if CONTACTS_BY_COMPANY in ctx.selected_stream_ids:
+                    # Collect the recently modified company id
+                    if not modified_time or modified_time >= start:
+                        company_ids.append(row['companyId'])
 
-                # Once batch size reaches set limit, extract the `contacts_by_company` for company ids collected
-                if len(company_ids) >= default_company_params['limit']:
-                    STATE = _sync_contacts_by_company_batch_read(STATE, ctx, company_ids)
-                    company_ids = []    # reset the list
+                    # Once batch size reaches set limit, extract the `contacts_by_company` for company ids collected
+                    if len(company_ids) >= default_company_params['limit']:
+                        STATE = _sync_contacts_by_company_batch_read(STATE, ctx, company_ids, contacts_by_company_schema,
+                                                                     save_offset=not searching)
+                        company_ids = []    # reset the list
 
     # Extract the records for last remaining company ids
     if CONTACTS_BY_COMPANY in ctx.selected_stream_ids:
-        STATE = _sync_contacts_by_company_batch_read(STATE, ctx, company_ids)
+        STATE = _sync_contacts_by_company_batch_read(STATE, ctx, company_ids, contacts_by_company_schema,
+                                                     save_offset=not searching)
         STATE = singer.clear_offset(STATE, "contacts_by_company")
 
     # Don't bookmark past the start of this sync to account for updated records during the sync.
     new_bookmark = min(max_bk_value, current_sync_start)
     STATE = singer.write_bookmark(STATE, 'companies', bookmark_key, utils.strftime(new_bookmark))
     STATE = write_current_sync_start(STATE, 'companies', None)
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
     return STATE
 
 def has_selected_custom_field(mdata):
@@ -625,6 +2012,143 @@ def has_selected_custom_field(mdata):
             return True
     return False
 
+# The v1 association fields of the objects associated to a v3 deal
+DEALS_V3_ASSOCIATIONS = {
+    'contacts': 'associatedVids',
+    'companies': 'associatedCompanyIds',
+    'deals': 'associatedDealIds',
+}
+
+def get_deals_v3_properties(schema, selected_fields, property_keys):
+    """
+    Return the deal properties to request from the v3 deals search. The
+    `properties` and `properties_versions` fields contain every property,
+    otherwise only the selected `property_*` fields are needed.
+    """
+    if 'properties' in selected_fields or 'properties_versions' in selected_fields:
+        return list(schema['properties']['properties']['properties'].keys())
+    return list(property_keys)
+
+def v3_deal_to_v1(v3_record, include_associations, datetime_properties=()):
+    """
+    Reshape a CRM v3 deal into the `deals_all` layout, with date-times in
+    milliseconds like v1 values. With history, every property is an object
+    like `allPropertiesFetchMode=latest_version` returns, rebuilt from the
+    latest version of its history, otherwise the objects only have the
+    `value`. The `hs_v2_date_entered/exited` fields only have the `value`,
+    like the ones merged into v1 deals.
+    """
+    if 'propertiesWithHistory' in v3_record:
+        properties = v3_history_to_v2_properties(v3_record['propertiesWithHistory'], latest_version_only=True)
+    else:
+        properties = {name: {'value': value}
+                      for name, value in (v3_record.get('properties') or {}).items()
+                      if value is not None}
+    for name, prop in properties.items():
+        if V3_PREFIXES_PATTERN.search(name):
+            properties[name] = {'value': prop['value']}
+        elif name in datetime_properties:
+            v3_property_datetimes_to_v1(prop)
+    record = {'portalId': get_portal_id(),
+              'dealId': int(v3_record['id']),
+              'isDeleted': v3_record.get('archived', False),
+              'properties': properties}
+
+    if include_associations:
+        associations = v3_record.get('associations') or {}
+        record['associations'] = {}
+        for object_type, field in DEALS_V3_ASSOCIATIONS.items():
+            ids = [int(result['id']) for result in associations.get(object_type, {}).get('results', [])]
+            # An object is listed once per type of association
+            record['associations'][field] = list(dict.fromkeys(ids))
+    return record
+
+# Batch reads that include `propertiesWithHistory` accept at most 50 inputs
+DEALS_V3_BATCH_READ_SIZE = 50
+
+def get_v3_deals_history(ids, property_names):
+    """
+    Read the history of the properties of the deals with the given ids and
+    return it by deal id, along with the size of the response body.
+    """
+    body = {'inputs': [{'id': deal_id} for deal_id in ids],
+            'properties': property_names,
+            'propertiesWithHistory': property_names}
+    resp = post_search_endpoint(get_url('deals_v3_batch_read'), body)
+    return ({v3_record['id']: v3_record.get('propertiesWithHistory') or {} for v3_record in resp.json()['results']},
+            len(resp.content))
+
+def get_v3_deals_associations(ids):
+    """
+    Read the objects associated to the deals with the given ids and return them
+    by deal id in the layout of the objects endpoint, along with the size of
+    the response bodies.
+    """
+    associations = {deal_id: {} for deal_id in ids}
+    size = 0
+    for object_type in DEALS_V3_ASSOCIATIONS:
+        resp = post_search_endpoint(get_url('deals_v3_associations', object_type=object_type),
+                                    {'inputs': [{'id': deal_id} for deal_id in ids]})
+        size += len(resp.content)
+        for result in resp.json()['results']:
+            associations[str(result['from']['id'])][object_type] = {'results': result['to']}
+    return associations, size
+
+def gen_v3_deal_pages(start, property_names, include_associations, with_history):
+    """
+    Yield the pages of the deals modified since `start` along with their size.
+    The deals search takes the property names in the body of a POST, so they
+    don't hit the URL length limit (414), and returns the values of up to 200
+    deals per request. The associations, which the search doesn't return, and
+    the history of the properties, which only `properties_versions` needs,
+    take more requests per page, but only when they are selected.
+    """
+    url = get_url('deals_search')
+    since = int(round(start.timestamp() * 1000))
+    # The last modification time is needed to search from the last deal seen
+    search_properties = sorted(set(property_names) | {'hs_lastmodifieddate'})
+    resp = search_modified_objects(url, since, search_properties)
+
+    for v3_records, size in gen_modified_search_pages(url, since, search_properties, resp.json(), len(resp.content)):
+        ids = [v3_record['id'] for v3_record in v3_records]
+        if include_associations:
+            associations, associations_size = get_v3_deals_associations(ids)
+            size += associations_size
+            for v3_record in v3_records:
+                v3_record['associations'] = associations[v3_record['id']]
+        if with_history:
+            for i in range(0, len(ids), DEALS_V3_BATCH_READ_SIZE):
+                history, history_size = get_v3_deals_history(ids[i:i + DEALS_V3_BATCH_READ_SIZE], property_names)
+                size += history_size
+                for v3_record in v3_records:
+                    if v3_record['id'] in history:
+                        v3_record['propertiesWithHistory'] = history[v3_record['id']]
+        yield v3_records, size
+
+def gen_v3_deals(start, property_names, include_associations, with_history, datetime_properties):
+    """
+    Yield the deals modified since `start` in the `deals_all` layout, along
+    with the time they were last modified at, one page at a time.
+    """
+    with ReadAhead(gen_v3_deal_pages(start, property_names, include_associations, with_history)) as pages:
+        for v3_records in pages:
+            yield [(v3_deal_to_v1(v3_record, include_associations, datetime_properties),
+                    utils.strptime_to_utc(v3_record['updatedAt']))
+                   for v3_record in v3_records]
+
+def get_deal_modified_time(row, last_modified_date):
+    row_properties = row['properties']
+    modified_time = None
+    if last_modified_date in row_properties:
+        # Hubspot returns timestamps in millis
+        timestamp_millis = row_properties[last_modified_date]['timestamp'] / 1000.0
+        modified_time = datetime.datetime.fromtimestamp(timestamp_millis, datetime.timezone.utc)
+    elif 'createdate' in row_properties:
+        # Hubspot returns timestamps in millis
+        timestamp_millis = row_properties['createdate']['timestamp'] / 1000.0
+        modified_time = datetime.datetime.fromtimestamp(timestamp_millis, datetime.timezone.utc)
+    return modified_time
+
 def sync_deals(STATE, ctx):
     catalog = ctx.get_catalog_from_id(singer.get_currently_syncing(STATE))
     mdata = metadata.to_map(catalog.get('metadata'))
@@ -652,8 +2176,10 @@ def sync_deals(STATE, ctx):
               'includeAssociations': False,
               'properties' : []}
 
-    schema = load_schema("deals")
-    singer.write_schema("deals", schema, ["dealId"], [bookmark_key], catalog.get('stream_alias'))
+    schema = load_sync_schema(catalog, "deals")
+    selected_fields = get_selected_fields(schema, mdata)
+    property_keys = get_property_keys(selected_fields)
+    WRITER.write_schema("deals", schema, ["dealId"], [bookmark_key], catalog.get('stream_alias'))
 
     # Check if we should  include associations
     for key in mdata.keys():
@@ -664,68 +2190,78 @@ def sync_deals(STATE, ctx):
 
     v3_fields = None
     has_selected_properties = mdata.get(('properties', 'properties'), {}).get('selected')
-    if has_selected_properties or has_selected_custom_field(mdata):
-        # On 2/12/20, hubspot added a lot of additional properties for
-        # deals, and appending all of them to requests ended up leading to
-        # 414 (url-too-long) errors. Hubspot recommended we use the
-        # `includeAllProperties` and `allpropertiesFetchMode` params
-        # instead.
-        params['includeAllProperties'] = True
-        params['allPropertiesFetchMode'] = 'latest_version'
-
-        # Grab selected `hs_v2_date_entered/exited` fields to call the v3 endpoint with
-        v3_fields = [breadcrumb[1].replace('property_', '')
-                     for breadcrumb, mdata_map in mdata.items()
-                     if breadcrumb
-                     and (mdata_map.get('selected') is True or has_selected_properties)
-                     and any(prefix in breadcrumb[1] for prefix in V3_PREFIXES)]
-
-    url = get_url('deals_all')
-
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
+    if get_config_bool('deals_v3_objects', False):
+        # The v3 deals search returns the selected properties, including the
+        # `hs_v2_date_entered/exited` fields, so no v1 request is needed.
+        # The property versions are requested only if they are selected.
+        deals = gen_v3_deals(start,
+                             get_deals_v3_properties(schema, selected_fields, property_keys),
+                             params['includeAssociations'],
+                             'properties_versions' in selected_fields,
+                             get_v3_datetime_properties(schema))
+    else:
+        if has_selected_properties or has_selected_custom_field(mdata):
+            # On 2/12/20, hubspot added a lot of additional properties for
+            # deals, and appending all of them to requests ended up leading to
+            # 414 (url-too-long) errors. Hubspot recommended we use the
+            # `includeAllProperties` and `allpropertiesFetchMode` params
+            # instead.
+            params['includeAllProperties'] = True
+            params['allPropertiesFetchMode'] = 'latest_version'
+
+            # Grab selected `hs_v2_date_entered/exited` fields to call the v3 endpoint with
+            v3_fields = [breadcrumb[1].replace('property_', '')
+                         for breadcrumb, mdata_map in mdata.items()
+                         if breadcrumb
+                         and (mdata_map.get('selected') is True or has_selected_properties)
+                         and any(prefix in breadcrumb[1] for prefix in V3_PREFIXES)]
+
+        url = get_url('deals_all')
+        deals = ([(row, get_deal_modified_time(row, last_modified_date)) for row in page]
+                 for page in gen_request_pages(STATE, 'deals', url, params, 'deals', "hasMore", ["offset"], ["offset"], v3_fields=v3_fields))
+
+    with CompiledTransformer() as bumble_bee:
         # To handle records updated between start of the table sync and the end,
         # store the current sync start in the state and not move the bookmark past this value.
         sync_start_time = utils.now()
-        for row in gen_request(STATE, 'deals', url, params, 'deals', "hasMore", ["offset"], ["offset"], v3_fields=v3_fields):
-            row_properties = row['properties']
-            modified_time = None
-            if last_modified_date in row_properties:
-                # Hubspot returns timestamps in millis
-                timestamp_millis = row_properties[last_modified_date]['timestamp'] / 1000.0
-                modified_time = datetime.datetime.fromtimestamp(timestamp_millis, datetime.timezone.utc)
-            elif 'createdate' in row_properties:
-                # Hubspot returns timestamps in millis
-                timestamp_millis = row_properties['createdate']['timestamp'] / 1000.0
-                modified_time = datetime.datetime.fromtimestamp(timestamp_millis, datetime.timezone.utc)
-            if modified_time and modified_time >= max_bk_value:
-                max_bk_value = modified_time
-
-            if not modified_time or modified_time >= start:
-                record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
-                singer.write_record("deals", record, catalog.get('stream_alias'), time_extracted=utils.now())
+        for page in deals:
+            time_extracted = utils.now()
+            for row, modified_time in page:
+                if modified_time and modified_time >= max_bk_value:
+                    max_bk_value = modified_time
+
+                if not modified_time or modified_time >= start:
+                    record = bumble_bee.transform(lift_properties_and_versions(row, selected_fields, property_keys),
+                                                  schema, mdata)
+                    WRITER.write_record("deals", record, catalog.get('stream_alias'), time_extracted=time_extracted)
 
     # Don't bookmark past the start of this sync to account for updated records during the sync.
     new_bookmark = min(max_bk_value, sync_start_time)
     STATE = singer.write_bookmark(STATE, 'deals', bookmark_key, utils.strftime(new_bookmark))
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
     return STATE
 
 
-def get_v3_records(url, params, path, more_key):
+def get_v3_record_pages(url, params, path, more_key):
     """
-    Cursor-based API Pagination for v3 API endpoints.
-    Used for multiple streams, such as tickets and contacts.
+    Cursor-based API Pagination for v3 API endpoints that yields the rows of
+    one page at a time. Used for multiple streams, such as tickets and contacts.
     """
-    while True:
-        data = request(url, params).json()
+    with ReadAhead(gen_v3_pages(url, params, path, more_key)) as pages:
+        for data in pages:
+            yield data[path]
 
-        if data.get(path) is None:
-            raise RuntimeError(
-                "Unexpected API response: {} not in {}".format(path, data.keys()))
-
-        for row in data[path]:
+def get_v3_records(url, params, path, more_key):
+    for page in get_v3_record_pages(url, params, path, more_key):
+        for row in page:
             yield row
 
+def gen_v3_pages(url, params, path, more_key):
+    params = dict(params)
+    while True:
+        data, size = fetch_page(url, params, path)
+        yield data, size
+
         if not data.get(more_key) or not data[more_key].get('next'):
             break
         params['after'] = data.get(more_key).get('next').get('after')
@@ -742,32 +2278,37 @@ def sync_v3_stream(STATE, ctx, stream_id, params, primary_key="id", bookmark_key
     max_bk_value = bookmark_value
     LOGGER.info(f"Sync {stream_id} from %s", bookmark_value)
 
-    schema = load_schema(stream_id)
-    singer.write_schema(stream_id, schema, [primary_key],
+    schema = load_sync_schema(catalog, stream_id)
+    selected_fields = get_selected_fields(schema, mdata)
+    property_keys = get_property_keys(selected_fields)
+    WRITER.write_schema(stream_id, schema, [primary_key],
                         [bookmark_key], catalog.get('stream_alias'))
 
     url = get_url(stream_id)
 
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as transformer:
+    with CompiledTransformer() as transformer:
         # To handle records updated between start of the table sync and the end,
         # store the current sync start in the state and not move the bookmark past this value.
         sync_start_time = utils.now()
         with metrics.record_counter(stream_id) as counter:
-            for row in get_v3_records(url, params, 'results', "paging"):
-                modified_time = utils.strptime_to_utc(row[bookmark_key])
-
-                if modified_time and modified_time >= bookmark_value:
-                    record = transformer.transform(lift_properties_and_versions(row), schema, mdata)
-                    singer.write_record(stream_id, record, catalog.get(
-                        'stream_alias'), time_extracted=utils.now())
-                    if modified_time >= max_bk_value:
-                        max_bk_value = modified_time
-                    counter.increment()
+            for page in get_v3_record_pages(url, params, 'results', "paging"):
+                time_extracted = utils.now()
+                for row in page:
+                    modified_time = utils.strptime_to_utc(row[bookmark_key])
+
+                    if modified_time and modified_time >= bookmark_value:
+                        record = transformer.transform(lift_properties_and_versions(row, selected_fields, property_keys),
+                                                       schema, mdata)
+                        WRITER.write_record(stream_id, record, catalog.get(
+                            'stream_alias'), time_extracted=time_extracted)
+                        if modified_time >= max_bk_value:
+                            max_bk_value = modified_time
+                        counter.increment()
 
     # Don't bookmark past the start of this sync to account for updated records during the sync.
     new_bookmark = min(max_bk_value, sync_start_time)
     STATE = singer.write_bookmark(STATE, stream_id, bookmark_key, utils.strftime(new_bookmark))
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
     return STATE
 
 def sync_tickets(STATE, ctx):
@@ -784,30 +2325,177 @@ def sync_tickets(STATE, ctx):
               }
     return sync_v3_stream(STATE, ctx, stream_id, params)
 
+def get_campaign_detail(campaign_id):
+    return request(get_url("campaigns_detail", campaign_id=campaign_id)).json()
+
 # NB> no suitable bookmark is available: https://developers.hubspot.com/docs/methods/email/get_campaigns_by_id
 def sync_campaigns(STATE, ctx):
     catalog = ctx.get_catalog_from_id(singer.get_currently_syncing(STATE))
     mdata = metadata.to_map(catalog.get('metadata'))
-    schema = load_schema("campaigns")
-    singer.write_schema("campaigns", schema, ["id"], catalog.get('stream_alias'))
+    schema = load_sync_schema(catalog, "campaigns")
+    WRITER.write_schema("campaigns", schema, ["id"], catalog.get('stream_alias'))
     LOGGER.info("sync_campaigns(NO bookmarks)")
     url = get_url("campaigns_all")
     params = {'limit': 500}
 
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
-        for row in gen_request(STATE, 'campaigns', url, params, "campaigns", "hasMore", ["offset"], ["offset"]):
-            record = request(get_url("campaigns_detail", campaign_id=row['id'])).json()
-            record = bumble_bee.transform(lift_properties_and_versions(record), schema, mdata)
-            singer.write_record("campaigns", record, catalog.get('stream_alias'), time_extracted=utils.now())
+    with CompiledTransformer() as bumble_bee, \
+         WorkerPool(get_config_int('campaigns_detail_workers', DEFAULT_DETAIL_WORKERS)) as pool:
+        for page in gen_request_pages(STATE, 'campaigns', url, params, "campaigns", "hasMore", ["offset"], ["offset"]):
+            # Fetch the details of the page concurrently but write them in the order of the page
+            with metrics.Timer('page_fetch_duration', {metrics.Tag.endpoint: 'campaigns_detail',
+                                                       'page_size': len(page)}):
+                details = pool.map(get_campaign_detail, [row['id'] for row in page])
+            time_extracted = utils.now()
+            for record in details:
+                record = bumble_bee.transform(lift_properties_and_versions(record), schema, mdata)
+                WRITER.write_record("campaigns", record, catalog.get('stream_alias'), time_extracted=time_extracted)
+
+    return STATE
+
+
+def plan_chunk_windows(STATE, entity_name, start_ts, now_ts, window_size):
+    """
+    Yield the windows of `window_size` from `start_ts` to `now_ts`. Windows
+    recorded in the state by an interrupted run are reused as they were, so
+    they resume from their own offset or are skipped if they already completed.
+    """
+    # Read before the sync replaces the recorded windows with its own
+    saved_windows = dict(singer.get_bookmark(STATE, entity_name, 'windows') or {})
+
+    def gen_windows():
+        window_start = start_ts
+        while window_start < now_ts:
+            saved_window = saved_windows.get(str(window_start))
+            if saved_window:
+                window = dict(saved_window, start=window_start)
+            else:
+                window = {'start': window_start, 'end': min(window_start + window_size, now_ts)}
+            yield window
+            window_start = window['end']
+
+    return gen_windows()
+
+def put_until_stopped(pages, item, stop):
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=1)
+            return
+        except queue.Full:
+            continue
+
+def fetch_chunk_window(url, path, window, pages, stop):
+    """ Fetch every page of one window onto the `pages` queue. """
+    params = {
+        'startTimestamp': window['start'],
+        'endTimestamp': window['end'],
+        'limit': 1000,
+    }
+    if window.get('offset') is not None:
+        params[StateFields.offset] = window['offset']
+    try:
+        while not stop.is_set():
+            data = request(url, params).json()
+            if data.get(path) is None:
+                raise RuntimeError("Unexpected API response: {} not in {}".format(path, data.keys()))
+            put_until_stopped(pages, (window, data, utils.now(), None), stop)
+            if not data.get('hasMore'):
+                return
+            params[StateFields.offset] = data['offset']
+    except Exception as ex: # pylint: disable=broad-except
+        put_until_stopped(pages, (window, None, None, ex), stop)
+
+def sync_windows_concurrently(STATE, catalog, entity_name, schema, url, path, windows, workers):
+    """
+    Fetch several windows at once while the calling thread transforms and
+    writes the records. The `startTimestamp` bookmark is the low-water mark:
+    every window before it has completed. Windows are started a few at a time,
+    at most twice as many as there are workers ahead of the bookmark, and only
+    those are kept in the state under `windows`, keyed by their start, with
+    their end and either their offset or their completion.
+    """
+    mdata = metadata.to_map(catalog.get('metadata'))
+    windows = iter(windows)
+    # The windows after the bookmark, in order
+    active_windows = collections.deque()
+    max_active_windows = workers * 2
+    saved_windows = {}
+    STATE = singer.write_bookmark(STATE, entity_name, 'windows', saved_windows)
+
+    pages = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        remaining = 0
+        with metrics.record_counter(entity_name) as counter, \
+             CompiledTransformer() as bumble_bee:
+            while True:
+                # Advance the bookmark over the completed windows at the front
+                while active_windows and saved_windows[str(active_windows[0]['start'])].get('done'):
+                    window = active_windows.popleft()
+                    del saved_windows[str(window['start'])]
+                    STATE = singer.write_bookmark(STATE, entity_name, 'startTimestamp', utils.strftime(
+                        datetime.datetime.fromtimestamp((window['end'] / 1000), datetime.timezone.utc)))
+
+                for window in itertools.islice(windows, max_active_windows - len(active_windows)):
+                    active_windows.append(window)
+                    saved_windows[str(window['start'])] = {key: value for key, value in window.items()
+                                                           if key != 'start'}
+                    if not window.get('done'):
+                        executor.submit(fetch_chunk_window, url, path, window, pages, stop)
+                        remaining += 1
+                WRITER.write_state(STATE)
+                if not active_windows:
+                    break
+                if remaining == 0:
+                    # Only windows completed by an earlier run are left at the front
+                    continue
 
+                window, data, time_extracted, error = pages.get()
+                if error is not None:
+                    raise error
+
+                for row in data[path]:
+                    counter.increment()
+                    record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
+                    WRITER.write_record(entity_name,
+                                        record,
+                                        catalog.get('stream_alias'),
+                                        time_extracted=time_extracted)
+                saved_window = saved_windows[str(window['start'])]
+                if data.get('hasMore'):
+                    saved_window['offset'] = data['offset']
+                else:
+                    saved_window.pop('offset', None)
+                    saved_window['done'] = True
+                    remaining -= 1
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    STATE['bookmarks'][entity_name].pop('windows', None)
+    STATE = singer.clear_offset(STATE, entity_name)
+    WRITER.write_state(STATE)
     return STATE
 
+def get_next_window_size(window_size, window_records):
+    """
+    Double the window after a sparse window and halve it after a dense one,
+    staying within `min_chunk_size` and `max_chunk_size`.
+    """
+    target_records = get_config_int('chunk_target_records', DEFAULT_CHUNK_TARGET_RECORDS)
+    if window_records < target_records / 2:
+        window_size *= 2
+    elif window_records > target_records * 2:
+        window_size //= 2
+    min_size = get_config_int('min_chunk_size', DEFAULT_MIN_CHUNK_SIZE)
+    max_size = get_config_int('max_chunk_size', DEFAULT_MAX_CHUNK_SIZE)
+    return min(max(window_size, min_size), max_size)
 
 def sync_entity_chunked(STATE, catalog, entity_name, key_properties, path):
-    schema = load_schema(entity_name)
+    schema = load_sync_schema(catalog, entity_name)
     bookmark_key = 'startTimestamp'
 
-    singer.write_schema(entity_name, schema, key_properties, [bookmark_key], catalog.get('stream_alias'))
+    WRITER.write_schema(entity_name, schema, key_properties, [bookmark_key], catalog.get('stream_alias'))
 
     start = get_start(STATE, entity_name, bookmark_key)
     LOGGER.info("sync_%s from %s", entity_name, start)
@@ -825,15 +2513,40 @@ def sync_entity_chunked(STATE, catalog, entity_name, key_properties, path):
     elif entity_name == 'subscription_changes':
         window_size = int(CONFIG['subscription_chunk_size'])
 
+    window_workers = get_config_int('window_workers', 1)
+    adaptive = get_config_bool('adaptive_chunk_size', False)
+    if window_workers > 1:
+        # The windows synced concurrently are planned upfront, so their size
+        # can't follow the number of records of the windows before them
+        if adaptive:
+            raise ValueError("adaptive_chunk_size is not supported with window_workers greater than 1, "
+                             "disable one of them.")
+        windows = plan_chunk_windows(STATE, entity_name, start_ts, now_ts, window_size)
+        return sync_windows_concurrently(STATE, catalog, entity_name, schema, url, path, windows, window_workers)
+
+    if adaptive:
+        window_size = singer.get_bookmark(STATE, entity_name, 'window_size') or window_size
+
+    # The window that was in progress when the last sync stopped, so that its
+    # offset is resumed with the same boundaries
+    window = singer.get_bookmark(STATE, entity_name, 'window')
+    if window:
+        start_ts = window['start']
+
     with metrics.record_counter(entity_name) as counter:
         while start_ts < now_ts:
-            end_ts = start_ts + window_size
+            if window and window['start'] == start_ts:
+                end_ts = window['end']
+            else:
+                end_ts = start_ts + window_size
+                STATE = singer.write_bookmark(STATE, entity_name, 'window', {'start': start_ts, 'end': end_ts})
+            window_records = 0
             params = {
                 'startTimestamp': start_ts,
                 'endTimestamp': end_ts,
                 'limit': 1000,
             }
-            with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
+            with CompiledTransformer() as bumble_bee:
                 while True:
                     our_offset = singer.get_offset(STATE, entity_name)
                     if bool(our_offset) and our_offset.get('offset') is not None:
@@ -847,24 +2560,29 @@ def sync_entity_chunked(STATE, catalog, entity_name, key_properties, path):
 
                     for row in data[path]:
                         counter.increment()
+                        window_records += 1
                         record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
-                        singer.write_record(entity_name,
+                        WRITER.write_record(entity_name,
                                             record,
                                             catalog.get('stream_alias'),
                                             time_extracted=time_extracted)
                     if data.get('hasMore'):
                         STATE = singer.set_offset(STATE, entity_name, 'offset', data['offset'])
-                        singer.write_state(STATE)
+                        WRITER.write_state(STATE)
                     else:
                         STATE = singer.clear_offset(STATE, entity_name)
-                        singer.write_state(STATE)
+                        WRITER.write_state(STATE)
                         break
             STATE = singer.write_bookmark(STATE, entity_name, 'startTimestamp', utils.strftime(datetime.datetime.fromtimestamp((start_ts / 1000), datetime.timezone.utc)))  # pylint: disable=line-too-long
-            singer.write_state(STATE)
+            if adaptive:
+                window_size = get_next_window_size(window_size, window_records)
+                STATE = singer.write_bookmark(STATE, entity_name, 'window_size', window_size)
+            WRITER.write_state(STATE)
             start_ts = end_ts
 
+    STATE.get('bookmarks', {}).get(entity_name, {}).pop('window', None)
     STATE = singer.clear_offset(STATE, entity_name)
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
     return STATE
 
 def sync_subscription_changes(STATE, ctx):
@@ -878,56 +2596,132 @@ def sync_email_events(STATE, ctx):
     STATE = sync_entity_chunked(STATE, catalog, "email_events", ["id"], "events")
     return STATE
 
-def sync_list_memberships(list_id, STATE, schema, catalog, bookmark_key, start, max_bk_value):
-
-    mdata = metadata.to_map(catalog.get('metadata'))
+class ChildStream:
+    """
+    The setup shared by the records of a child stream over all of its parents
+    in one sync of the parent stream: the catalog entry, schema and metadata of
+    the child stream, the time its sync started at and a count of its records.
+    A transformer keeps the fields it filtered or removed, so every thread
+    writing records gets its own.
+    """
+    def __init__(self, STATE, ctx, tap_stream_id, bookmark_key):
+        self.tap_stream_id = tap_stream_id
+        self.bookmark_key = bookmark_key
+        self.catalog = ctx.get_catalog_from_id(tap_stream_id)
+        self.stream_alias = self.catalog.get('stream_alias')
+        self.schema = load_sync_schema(self.catalog, tap_stream_id)
+        self.mdata = metadata.to_map(self.catalog.get('metadata'))
+        self.start = get_start(STATE, tap_stream_id, bookmark_key)
+        self.transformers = []
+        self.local = threading.local()
+        self.counter = metrics.Counter(metrics.Metric.record_count, {metrics.Tag.endpoint: tap_stream_id})
+        self.lock = threading.Lock()
+        # To handle records updated between start of the table sync and the end,
+        # store the current sync start in the state and not move the bookmark past this value.
+        self.sync_start_time = utils.now()
+
+    def __enter__(self):
+        self.counter.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.counter.__exit__(exc_type, exc_value, traceback)
+        for transformer in self.transformers:
+            transformer.log_warning()
+
+    def get_transformer(self):
+        transformer = getattr(self.local, 'transformer', None)
+        if transformer is None:
+            transformer = CompiledTransformer()
+            self.local.transformer = transformer
+            with self.lock:
+                self.transformers.append(transformer)
+        return transformer
+
+    def increment(self, amount):
+        # The records of several parents can be written on the worker pool
+        with self.lock:
+            self.counter.increment(amount)
+
+    def write_records(self, rows, parent_key, parent_id, start, max_bk_value):
+        """
+        Write the child records of one parent. Returns the highest bookmark value seen.
+        """
+        transformer = self.get_transformer()
+        written = 0
+        for row in rows:
+            record = transformer.transform(lift_properties_and_versions(row), self.schema, self.mdata)
+            record[parent_key] = parent_id
+
+            if record[self.bookmark_key] >= start:
+                WRITER.write_record(self.tap_stream_id, record, self.stream_alias, time_extracted=self.sync_start_time)
+                written += 1
+            if record[self.bookmark_key] >= max_bk_value:
+                max_bk_value = record[self.bookmark_key]
+
+        self.increment(written)
+        return max_bk_value
+
+def write_list_memberships(list_id, memberships, start, max_bk_value):
+    """
+    Write the memberships of one list. Returns the highest bookmark value seen.
+    """
     params = {
         'limit': 250
     }
     url = get_url("list_memberships", list_id=list_id)
-    time_extracted = utils.now()
+    return memberships.write_records(get_v3_records(url, params, "results", "paging"),
+                                     'listId', list_id, start, max_bk_value)
 
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
-        # To handle records updated between start of the table sync and the end,
-        # store the current sync start in the state and not move the bookmark past this value.
-        sync_start_time = utils.now()
-        for row in get_v3_records(url, params, "results", "paging"):
-            record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
-            record['listId'] = list_id
+def write_child_bookmark(STATE, child, max_bk_value):
+    # Don't bookmark past the start of this sync to account for updated records during the sync.
+    new_bookmark = min(utils.strptime_to_utc(max_bk_value), child.sync_start_time) if max_bk_value else child.sync_start_time
+    return singer.write_bookmark(STATE, child.tap_stream_id, child.bookmark_key, utils.strftime(new_bookmark))
 
-            if record[bookmark_key] >= start:
-                singer.write_record("list_memberships", record, catalog.get('stream_alias'), time_extracted=time_extracted)
-            if record[bookmark_key] >= max_bk_value:
-                max_bk_value = record[bookmark_key]
+def merge_child_bookmarks(STATE, child, pending, max_bk_value, wait):
+    """
+    Merge the child records written on the worker pool into the bookmark of
+    the child stream, in the order their parents were submitted. With `wait`,
+    block until every pending parent is done.
+    """
+    merged = False
+    while pending and (wait or pending[0].done()):
+        parent_max_bk_value = pending.popleft().result()
+        if max_bk_value is None or parent_max_bk_value > max_bk_value:
+            max_bk_value = parent_max_bk_value
+        merged = True
+    if merged:
+        STATE = write_child_bookmark(STATE, child, max_bk_value)
+        WRITER.write_state(STATE)
+    return STATE, max_bk_value
 
-    # Don't bookmark past the start of this sync to account for updated records during the sync.
-    new_bookmark = min(utils.strptime_to_utc(max_bk_value), sync_start_time) if max_bk_value else sync_start_time
-    STATE = singer.write_bookmark(STATE, 'list_memberships', bookmark_key, utils.strftime(new_bookmark))
-    singer.write_state(STATE)
+def sync_list_memberships(list_id, STATE, memberships, start, max_bk_value):
+    max_bk_value = write_list_memberships(list_id, memberships, start, max_bk_value)
+    STATE = write_child_bookmark(STATE, memberships, max_bk_value)
 
     return STATE, max_bk_value
 
 def sync_contact_lists(STATE, ctx):
     catalog = ctx.get_catalog_from_id(singer.get_currently_syncing(STATE))
     mdata = metadata.to_map(catalog.get('metadata'))
-    schema = load_schema("contact_lists")
+    schema = load_sync_schema(catalog, "contact_lists")
     bookmark_key = 'updatedAt'
-    singer.write_schema("contact_lists", schema, ["listId"], [bookmark_key], catalog.get('stream_alias'))
+    WRITER.write_schema("contact_lists", schema, ["listId"], [bookmark_key], catalog.get('stream_alias'))
 
     start = get_start(STATE, "contact_lists", bookmark_key)
     max_bk_value = start
 
     LOGGER.info("sync_contact_lists from %s", start)
 
+    memberships = None
     fs_max_bk_value = None
+    fs_bookmark_key = 'membershipTimestamp'
     if "list_memberships" in ctx.selected_stream_ids:
-        fs_schema = load_schema("list_memberships")
-        fs_catalog = ctx.get_catalog_from_id("list_memberships")
-        fs_bookmark_key = 'membershipTimestamp'
+        memberships = ChildStream(STATE, ctx, "list_memberships", fs_bookmark_key)
 
-        singer.write_schema("list_memberships", fs_schema, ["recordId", "listId"], [fs_bookmark_key], fs_catalog.get('stream_alias'))
+        WRITER.write_schema("list_memberships", memberships.schema, ["recordId", "listId"], [fs_bookmark_key], memberships.stream_alias)
 
-        fs_start = get_start(STATE, "list_memberships", fs_bookmark_key)
+        fs_start = memberships.start
         fs_max_bk_value = fs_start
         LOGGER.info("sync list_memberships from %s", fs_start)
 
@@ -953,30 +2747,54 @@ def sync_contact_lists(STATE, ctx):
     # store the current sync start in the state and not move the bookmark past this value.
     sync_start_time = utils.now()
 
-    for _option in sort_options:
-        body = {'count': 250, 'sort': _option}
-        with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
-            has_more = True
-            while has_more:
-                data = post_search_endpoint(url, body).json()
-                for row in data["lists"]:
-                    has_synced_data = True
-                    record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
-                    if record[bookmark_key] >= start:
-                        singer.write_record("contact_lists", record, catalog.get('stream_alias'), time_extracted=utils.now())
-                    if record[bookmark_key] >= max_bk_value:
-                        max_bk_value = record[bookmark_key]
-
-                    if "list_memberships" in ctx.selected_stream_ids:
-                        STATE, fs_max_bk_value = sync_list_memberships(row['listId'], STATE, fs_schema, fs_catalog, fs_bookmark_key, fs_start, fs_max_bk_value)
-
-                has_more = data.get('hasMore')
-                body["offset"] = data["offset"]
-
-        # Update `start` so that the next pass (descending) only writes records
-        # newer than what was already emitted in the ascending pass.
-        start = max_bk_value
-        fs_start = fs_max_bk_value
+    # With more than one worker, the memberships of the lists on a page are
+    # written on the worker pool while the next page is searched. Their
+    # bookmark values are merged here, in the order the lists were found.
+    memberships_workers = get_config_int('list_memberships_workers', 1)
+    pending_memberships = collections.deque()
+    # The pool is shut down first, so every membership is written before the child stream is closed
+    memberships_context = memberships or contextlib.nullcontext()
+
+    with memberships_context, WorkerPool(memberships_workers) as pool:
+        for _option in sort_options:
+            body = {'count': 250, 'sort': _option}
+            with CompiledTransformer() as bumble_bee:
+                has_more = True
+                while has_more:
+                    data = post_search_endpoint(url, body).json()
+                    time_extracted = utils.now()
+                    for row in data["lists"]:
+                        has_synced_data = True
+                        record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
+                        if record[bookmark_key] >= start:
+                            WRITER.write_record("contact_lists", record, catalog.get('stream_alias'), time_extracted=time_extracted)
+                        if record[bookmark_key] >= max_bk_value:
+                            max_bk_value = record[bookmark_key]
+
+                        if "list_memberships" not in ctx.selected_stream_ids:
+                            continue
+                        if memberships_workers > 1:
+                            pending_memberships.append(pool.submit(write_list_memberships, row['listId'], memberships,
+                                                                   fs_start, fs_start))
+                        else:
+                            STATE, fs_max_bk_value = sync_list_memberships(row['listId'], STATE, memberships, fs_start, fs_max_bk_value)
+
+                    if memberships:
+                        STATE, fs_max_bk_value = merge_child_bookmarks(STATE, memberships, pending_memberships,
+                                                                       fs_max_bk_value, wait=False)
+                        # The bookmark of the memberships is written once per page of lists
+                        WRITER.write_state(STATE)
+                    has_more = data.get('hasMore')
+                    body["offset"] = data["offset"]
+
+            if memberships:
+                STATE, fs_max_bk_value = merge_child_bookmarks(STATE, memberships, pending_memberships,
+                                                               fs_max_bk_value, wait=True)
+
+            # Update `start` so that the next pass (descending) only writes records
+            # newer than what was already emitted in the ascending pass.
+            start = max_bk_value
+            fs_start = fs_max_bk_value
 
     # Don't bookmark past the start of this sync to account for updated records during the sync.
     new_bookmark = min(utils.strptime_to_utc(max_bk_value), sync_start_time)
@@ -984,66 +2802,64 @@ def sync_contact_lists(STATE, ctx):
     if not has_synced_data and "list_memberships" in ctx.selected_stream_ids:
         STATE = singer.write_bookmark(STATE, 'list_memberships', fs_bookmark_key, utils.strftime(new_bookmark))
     STATE = singer.write_bookmark(STATE, 'contact_lists', bookmark_key, utils.strftime(new_bookmark))
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
 
     return STATE
 
-def sync_form_submissions(form_id, STATE, schema, catalog, bookmark_key, start, max_bk_value):
-
-    mdata = metadata.to_map(catalog.get('metadata'))
+def write_form_submissions(form_id, submissions, start, max_bk_value):
+    """
+    Write the submissions of one form. Returns the highest bookmark value seen.
+    """
     url = get_url("form_submissions", form_id=form_id)
     params = {
         'limit': 50
     }
-    time_extracted = utils.now()
+    return submissions.write_records(get_v3_records(url, params, "results", "paging"),
+                                     'formId', form_id, start, max_bk_value)
 
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
-        # To handle records updated between start of the table sync and the end,
-        # store the current sync start in the state and not move the bookmark past this value.
-        sync_start_time = utils.now()
-        for row in get_v3_records(url, params, "results", "paging"):
-            record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
-            record['formId'] = form_id
-
-            if record[bookmark_key] >= start:
-                singer.write_record("form_submissions", record, catalog.get('stream_alias'), time_extracted=time_extracted)
-            if record[bookmark_key] >= max_bk_value:
-                max_bk_value = record[bookmark_key]
-
-    # Don't bookmark past the start of this sync to account for updated records during the sync.
-    new_bookmark = min(utils.strptime_to_utc(max_bk_value), sync_start_time) if max_bk_value else sync_start_time
-    STATE = singer.write_bookmark(STATE, 'form_submissions', bookmark_key, utils.strftime(new_bookmark))
-    singer.write_state(STATE)
+def sync_form_submissions(form_id, STATE, submissions, start, max_bk_value):
+    max_bk_value = write_form_submissions(form_id, submissions, start, max_bk_value)
+    STATE = write_child_bookmark(STATE, submissions, max_bk_value)
 
     return STATE, max_bk_value
 
 def sync_forms(STATE, ctx):
     catalog = ctx.get_catalog_from_id(singer.get_currently_syncing(STATE))
     mdata = metadata.to_map(catalog.get('metadata'))
-    schema = load_schema("forms")
+    schema = load_sync_schema(catalog, "forms")
     bookmark_key = 'updatedAt'
 
-    singer.write_schema("forms", schema, ["guid"], [bookmark_key], catalog.get('stream_alias'))
+    WRITER.write_schema("forms", schema, ["guid"], [bookmark_key], catalog.get('stream_alias'))
     start = get_start(STATE, "forms", bookmark_key)
     max_bk_value = start
 
     LOGGER.info("sync_forms from %s", start)
 
+    submissions = None
     if "form_submissions" in ctx.selected_stream_ids:
-        fs_schema = load_schema("form_submissions")
-        fs_catalog = ctx.get_catalog_from_id("form_submissions")
         fs_bookmark_key = 'submittedAt'
+        submissions = ChildStream(STATE, ctx, "form_submissions", fs_bookmark_key)
 
-        singer.write_schema("form_submissions", fs_schema, ["conversionId"], [fs_bookmark_key], fs_catalog.get('stream_alias'))
+        WRITER.write_schema("form_submissions", submissions.schema, ["conversionId"], [fs_bookmark_key], submissions.stream_alias)
 
-        fs_start = get_start(STATE, "form_submissions", fs_bookmark_key)
+        fs_start = submissions.start
         fs_max_bk_value = fs_start
         LOGGER.info("sync form_submissions from %s", fs_start)
 
     data = request(get_url("forms")).json()
     time_extracted = utils.now()
 
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
+    # With more than one worker, the submissions of the forms are paginated on
+    # the worker pool, which shares the rate limit governor with the rest of
+    # the tap. Their bookmark values are merged here, in the order of the forms.
+    submissions_workers = get_config_int('form_submissions_workers', 1)
+    pending_submissions = collections.deque()
+    # The pool is shut down first, so every submission is written before the child stream is closed
+    submissions_context = submissions or contextlib.nullcontext()
+
+    with submissions_context, \
+         CompiledTransformer() as bumble_bee, \
+         WorkerPool(submissions_workers) as pool:
         # To handle records updated between start of the table sync and the end,
         # store the current sync start in the state and not move the bookmark past this value.
         sync_start_time = utils.now()
@@ -1053,12 +2869,23 @@ def sync_forms(STATE, ctx):
             record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
 
             if record[bookmark_key] >= start:
-                singer.write_record("forms", record, catalog.get('stream_alias'), time_extracted=time_extracted)
+                WRITER.write_record("forms", record, catalog.get('stream_alias'), time_extracted=time_extracted)
             if record[bookmark_key] >= max_bk_value:
                 max_bk_value = record[bookmark_key]
 
-            if "form_submissions" in ctx.selected_stream_ids:
-                STATE, fs_max_bk_value = sync_form_submissions(row['guid'], STATE, fs_schema, fs_catalog, fs_bookmark_key, fs_start, fs_max_bk_value)
+            if "form_submissions" not in ctx.selected_stream_ids:
+                continue
+            if submissions_workers > 1:
+                pending_submissions.append(pool.submit(write_form_submissions, row['guid'], submissions,
+                                                       fs_start, fs_start))
+                STATE, fs_max_bk_value = merge_child_bookmarks(STATE, submissions, pending_submissions,
+                                                               fs_max_bk_value, wait=False)
+            else:
+                STATE, fs_max_bk_value = sync_form_submissions(row['guid'], STATE, submissions, fs_start, fs_max_bk_value)
+
+        if pending_submissions:
+            STATE, fs_max_bk_value = merge_child_bookmarks(STATE, submissions, pending_submissions,
+                                                           fs_max_bk_value, wait=True)
 
     # Don't bookmark past the start of this sync to account for updated records during the sync.
     new_bookmark = min(utils.strptime_to_utc(max_bk_value), sync_start_time)
@@ -1066,42 +2893,42 @@ def sync_forms(STATE, ctx):
     if not has_synced_data and "form_submissions" in ctx.selected_stream_ids:
         STATE = singer.write_bookmark(STATE, 'form_submissions', fs_bookmark_key, utils.strftime(new_bookmark))
     STATE = singer.write_bookmark(STATE, 'forms', bookmark_key, utils.strftime(new_bookmark))
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
 
     return STATE
 
 def sync_workflows(STATE, ctx):
     catalog = ctx.get_catalog_from_id(singer.get_currently_syncing(STATE))
     mdata = metadata.to_map(catalog.get('metadata'))
-    schema = load_schema("workflows")
+    schema = load_sync_schema(catalog, "workflows")
     bookmark_key = 'updatedAt'
-    singer.write_schema("workflows", schema, ["id"], [bookmark_key], catalog.get('stream_alias'))
+    WRITER.write_schema("workflows", schema, ["id"], [bookmark_key], catalog.get('stream_alias'))
     start = get_start(STATE, "workflows", bookmark_key)
     max_bk_value = start
 
     STATE = singer.write_bookmark(STATE, 'workflows', bookmark_key, max_bk_value)
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
 
     LOGGER.info("sync_workflows from %s", start)
 
     data = request(get_url("workflows")).json()
     time_extracted = utils.now()
 
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
+    with CompiledTransformer() as bumble_bee:
         # To handle records updated between start of the table sync and the end,
         # store the current sync start in the state and not move the bookmark past this value.
         sync_start_time = utils.now()
         for row in data['workflows']:
             record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
             if record[bookmark_key] >= start:
-                singer.write_record("workflows", record, catalog.get('stream_alias'), time_extracted=time_extracted)
+                WRITER.write_record("workflows", record, catalog.get('stream_alias'), time_extracted=time_extracted)
             if record[bookmark_key] >= max_bk_value:
                 max_bk_value = record[bookmark_key]
 
     # Don't bookmark past the start of this sync to account for updated records during the sync.
     new_bookmark = min(utils.strptime_to_utc(max_bk_value), sync_start_time)
     STATE = singer.write_bookmark(STATE, 'workflows', bookmark_key, utils.strftime(new_bookmark))
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
     return STATE
 
 def sync_owners(STATE, ctx):
@@ -1115,9 +2942,9 @@ def sync_owners(STATE, ctx):
 def sync_engagements(STATE, ctx):
     catalog = ctx.get_catalog_from_id(singer.get_currently_syncing(STATE))
     mdata = metadata.to_map(catalog.get('metadata'))
-    schema = load_schema("engagements")
+    schema = load_sync_schema(catalog, "engagements")
     bookmark_key = 'lastUpdated'
-    singer.write_schema("engagements", schema, ["engagement_id"], [bookmark_key], catalog.get('stream_alias'))
+    WRITER.write_schema("engagements", schema, ["engagement_id"], [bookmark_key], catalog.get('stream_alias'))
     start = get_start(STATE, "engagements", bookmark_key)
 
     # Because this stream doesn't query by `lastUpdated`, it cycles
@@ -1128,13 +2955,13 @@ def sync_engagements(STATE, ctx):
     # sync's start in the state and not move the bookmark past this value.
     current_sync_start = get_current_sync_start(STATE, "engagements") or utils.now()
     STATE = write_current_sync_start(STATE, "engagements", current_sync_start)
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
 
     max_bk_value = start
     LOGGER.info("sync_engagements from %s", start)
 
     STATE = singer.write_bookmark(STATE, 'engagements', bookmark_key, start)
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
 
     url = get_url("engagements_all")
     params = {'limit': int(CONFIG.get('engagements_page_size') or 190)}
@@ -1143,14 +2970,14 @@ def sync_engagements(STATE, ctx):
 
     time_extracted = utils.now()
 
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
+    with CompiledTransformer() as bumble_bee:
         for engagement in engagements:
             record = bumble_bee.transform(lift_properties_and_versions(engagement), schema, mdata)
             if record['engagement'][bookmark_key] >= start:
                 # hoist PK and bookmark field to top-level record
                 record['engagement_id'] = record['engagement']['id']
                 record[bookmark_key] = record['engagement'][bookmark_key]
-                singer.write_record("engagements", record, catalog.get('stream_alias'), time_extracted=time_extracted)
+                WRITER.write_record("engagements", record, catalog.get('stream_alias'), time_extracted=time_extracted)
                 if record['engagement'][bookmark_key] >= max_bk_value:
                     max_bk_value = record['engagement'][bookmark_key]
 
@@ -1158,49 +2985,65 @@ def sync_engagements(STATE, ctx):
     new_bookmark = min(utils.strptime_to_utc(max_bk_value), current_sync_start)
     STATE = singer.write_bookmark(STATE, 'engagements', bookmark_key, utils.strftime(new_bookmark))
     STATE = write_current_sync_start(STATE, 'engagements', None)
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
     return STATE
 
 def sync_deal_pipelines(STATE, ctx):
     catalog = ctx.get_catalog_from_id(singer.get_currently_syncing(STATE))
     mdata = metadata.to_map(catalog.get('metadata'))
-    schema = load_schema('deal_pipelines')
-    singer.write_schema('deal_pipelines', schema, ['pipelineId'], catalog.get('stream_alias'))
+    schema = load_sync_schema(catalog, 'deal_pipelines')
+    WRITER.write_schema('deal_pipelines', schema, ['pipelineId'], catalog.get('stream_alias'))
     LOGGER.info('sync_deal_pipelines')
     data = request(get_url('deal_pipelines')).json()
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as bumble_bee:
+    time_extracted = utils.now()
+    with CompiledTransformer() as bumble_bee:
         for row in data:
             record = bumble_bee.transform(lift_properties_and_versions(row), schema, mdata)
-            singer.write_record("deal_pipelines", record, catalog.get('stream_alias'), time_extracted=utils.now())
-    singer.write_state(STATE)
+            WRITER.write_record("deal_pipelines", record, catalog.get('stream_alias'), time_extracted=time_extracted)
+    WRITER.write_state(STATE)
     return STATE
 
-def gen_request_custom_objects(tap_stream_id, url, params, path, more_key):
+def gen_custom_object_record_pages(tap_stream_id, url, params, path, more_key):
     """
-    Cursor-based API Pagination : Used in custom_objects stream implementation
+    Cursor-based API Pagination : Used in custom_objects stream implementation,
+    yields the rows of one page at a time
     """
-    try:
-        with metrics.record_counter(tap_stream_id) as counter:
-            has_more = True
-            while has_more:
-                data = request(url, params).json()
-
-                if data.get(path) is None:
-                    raise RuntimeError(
-                        "Unexpected API response: {} not in {}".format(path, data.keys()))
+    with metrics.record_counter(tap_stream_id) as counter:
+        with ReadAhead(gen_custom_object_pages(url, params, path, more_key)) as pages:
+            for data in pages:
+                counter.increment(len(data[path]))
+                yield data[path]
 
-                for row in data[path]:
-                    counter.increment()
-                    yield row
+def gen_custom_objects(tap_stream_id, url, params, path, more_key):
+    for page in gen_custom_object_record_pages(tap_stream_id, url, params, path, more_key):
+        yield from page
 
-                has_more = data.get(more_key)
-                params['after'] = data.get(more_key, {}).get('next', {}).get('after', None)
-                if params['after'] is None:
-                    break
+def gen_request_custom_object_record_pages(tap_stream_id, url, params, path, more_key):
+    """
+    Same as `gen_custom_object_record_pages`, but without access to the custom
+    objects a warning is logged and nothing is yielded.
+    """
+    try:
+        yield from gen_custom_object_record_pages(tap_stream_id, url, params, path, more_key)
     except SourceUnavailableException as ex:
         warning_message = str(ex).replace(CONFIG['access_token'] or CONFIG['api_key'], 10 * '*')
         LOGGER.warning(warning_message)
-        return []
+
+def gen_request_custom_objects(tap_stream_id, url, params, path, more_key):
+    for page in gen_request_custom_object_record_pages(tap_stream_id, url, params, path, more_key):
+        yield from page
+
+def gen_custom_object_pages(url, params, path, more_key):
+    params = dict(params)
+    has_more = True
+    while has_more:
+        data, size = fetch_page(url, params, path)
+        yield data, size
+
+        has_more = data.get(more_key)
+        params['after'] = data.get(more_key, {}).get('next', {}).get('after', None)
+        if params['after'] is None:
+            break
 
 def sync_custom_objects(stream_id, primary_key, bookmark_key, catalog, STATE, params, is_custom_object=False):
     """
@@ -1216,31 +3059,36 @@ def sync_custom_objects(stream_id, primary_key, bookmark_key, catalog, STATE, pa
 
     LOGGER.info(f"Sync record for {stream_id} from {bookmark_value}")
     schema = catalog.get('schema')
-    singer.write_schema(stream_id, schema, [primary_key],
+    selected_fields = get_selected_fields(schema, mdata)
+    property_keys = get_property_keys(selected_fields)
+    WRITER.write_schema(stream_id, schema, [primary_key],
                         [bookmark_key], catalog.get('stream_alias'))
 
-    with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as transformer:
+    with CompiledTransformer() as transformer:
         # To handle records updated between start of the table sync and the end,
         # store the current sync start in the state and not move the bookmark past this value.
         sync_start_time = utils.now()
-        for row in gen_request_custom_objects(stream_id, url, params, 'results', "paging"):
-            # parsing the string formatted date to datetime object
-            modified_time = utils.strptime_to_utc(row[bookmark_key])
-
-            # Checking the bookmark value is present on the record and it
-            # is greater than or equal to defined previous bookmark value
-            if modified_time and modified_time >= bookmark_value:
-                # transforms the data and filters out the selected fields from the catalog
-                record = transformer.transform(lift_properties_and_versions(row), schema, mdata)
-                singer.write_record(stream_id, record, catalog.get(
-                    'stream'), time_extracted=utils.now())
-            if modified_time and modified_time >= max_bk_value:
-                max_bk_value = modified_time
+        for page in gen_request_custom_object_record_pages(stream_id, url, params, 'results', "paging"):
+            time_extracted = utils.now()
+            for row in page:
+                # parsing the string formatted date to datetime object
+                modified_time = utils.strptime_to_utc(row[bookmark_key])
+
+                # Checking the bookmark value is present on the record and it
+                # is greater than or equal to defined previous bookmark value
+                if modified_time and modified_time >= bookmark_value:
+                    # transforms the data and filters out the selected fields from the catalog
+                    record = transformer.transform(lift_properties_and_versions(row, selected_fields, property_keys),
+                                                   schema, mdata)
+                    WRITER.write_record(stream_id, record, catalog.get(
+                        'stream'), time_extracted=time_extracted)
+                if modified_time and modified_time >= max_bk_value:
+                    max_bk_value = modified_time
 
     # Don't bookmark past the start of this sync to account for updated records during the sync.
     new_bookmark = min(max_bk_value, sync_start_time)
     STATE = singer.write_bookmark(STATE, stream_id, bookmark_key, utils.strftime(new_bookmark))
-    singer.write_state(STATE)
+    WRITER.write_state(STATE)
     return STATE
 
 
@@ -1311,7 +3159,16 @@ def generate_custom_streams(mode, catalog=None):
         custom_streams = []
         # Load Hubspot's shared schemas
         refs = load_shared_schema_refs()
-        for custom_object in gen_request_custom_objects("custom_objects_schema", custom_objects_schema_url, {}, 'results', "paging"):
+        # Errors are raised inside the loader, so that an empty list is only
+        # cached when the portal has no custom objects
+        try:
+            custom_objects = DISCOVERY_CACHE.get("custom_objects_schema", lambda: list(gen_custom_objects(
+                "custom_objects_schema", custom_objects_schema_url, {}, 'results', "paging")))
+        except SourceUnavailableException as ex:
+            warning_message = str(ex).replace(CONFIG['access_token'] or CONFIG['api_key'], 10 * '*')
+            LOGGER.warning(warning_message)
+            custom_objects = []
+        for custom_object in custom_objects:
             custom_object_name = custom_object["name"]
             stream_id = f'custom_object_{custom_object_name}' if custom_object_name in standard_streams else custom_object_name
             schema = utils.load_json(get_abs_path('schemas/shared/custom_objects.json'))
@@ -1388,6 +3245,87 @@ def deselect_unselected_fields(catalog):
                     LOGGER.info("Deselecting %s", breadcrumb['breadcrumb'][1])
                     breadcrumb['metadata']['selected'] = False
 
+def sync_stream(STATE, ctx, stream, custom_objects):
+    try:
+        if stream.tap_stream_id in custom_objects:
+            STATE = stream.sync(STATE, ctx, stream.tap_stream_id)
+        else:
+            STATE = stream.sync(STATE, ctx) # pylint: disable=not-callable
+    except SourceUnavailableException as ex:
+        error_message = str(ex).replace(CONFIG['access_token'] or CONFIG['api_key'], 10 * '*')
+        LOGGER.error(error_message)
+    except UriTooLongException as ex:
+        LOGGER.fatal(f"For stream - {stream.tap_stream_id}, please select fewer fields. "
+                     f"The current selection exceeds Hubspot's maximum character allowance.")
+        raise ex
+    return STATE
+
+class StreamScheduler:
+    """
+    Syncs independent top-level streams concurrently, `parallelism` at a time.
+
+    Child streams are synced by their parent, so a parent and its children
+    always run together on one thread. Each stream syncs on its own copy of
+    the state; whenever it writes a state, its bookmarks are merged into the
+    shared state, which is what gets emitted. `currently_syncing` points at the
+    first stream, in sync order, that is still running, so every stream before
+    it has completed when a sync is resumed from the state.
+    """
+    def __init__(self, STATE, ctx, custom_objects, parallelism):
+        self.state = STATE
+        self.ctx = ctx
+        self.custom_objects = custom_objects
+        self.parallelism = parallelism
+        self.order = {}
+        self.in_flight = set()
+
+    @staticmethod
+    def get_unit_stream_ids(stream):
+        child_ids = [child.tap_stream_id for child in STREAMS
+                     if child.parent_tap_stream_id == stream.tap_stream_id]
+        return [stream.tap_stream_id] + child_ids
+
+    def set_currently_syncing(self):
+        in_flight = sorted(self.in_flight, key=self.order.get)
+        singer.set_currently_syncing(self.state, in_flight[0] if in_flight else None)
+
+    def merge_bookmarks(self, stream_ids, unit_state):
+        bookmarks = self.state.setdefault('bookmarks', {})
+        for stream_id in stream_ids:
+            unit_bookmarks = unit_state.get('bookmarks', {}).get(stream_id)
+            if unit_bookmarks is None:
+                bookmarks.pop(stream_id, None)
+            else:
+                bookmarks[stream_id] = copy.deepcopy(unit_bookmarks)
+        return self.state
+
+    def sync_unit(self, stream):
+        stream_ids = self.get_unit_stream_ids(stream)
+        with WRITER.lock:
+            LOGGER.info('Syncing %s', stream.tap_stream_id)
+            unit_state = copy.deepcopy(self.state)
+            self.in_flight.add(stream.tap_stream_id)
+            self.set_currently_syncing()
+            WRITER.write_state(self.state)
+
+        unit_state = singer.set_currently_syncing(unit_state, stream.tap_stream_id)
+        try:
+            with WRITER.merging_state(lambda state: self.merge_bookmarks(stream_ids, state)):
+                unit_state = sync_stream(unit_state, self.ctx, stream, self.custom_objects) or unit_state
+        finally:
+            with WRITER.lock:
+                self.merge_bookmarks(stream_ids, unit_state)
+                self.in_flight.discard(stream.tap_stream_id)
+                self.set_currently_syncing()
+                WRITER.flush_state()
+
+    def run(self, streams):
+        top_level_streams = [stream for stream in streams if not stream.parent_tap_stream_id]
+        self.order = {stream.tap_stream_id: index for index, stream in enumerate(top_level_streams)}
+        with WorkerPool(self.parallelism) as pool:
+            pool.map(self.sync_unit, top_level_streams)
+        return self.state
+
 def do_sync(STATE, catalog):
     # If select_fields_by_default is not provided, default to True
     if CONFIG.get('select_fields_by_default') is False:
@@ -1404,29 +3342,25 @@ def do_sync(STATE, catalog):
     selected_streams = get_selected_streams(remaining_streams, ctx)
     LOGGER.info('Starting sync. Will sync these streams: %s',
                 [stream.tap_stream_id for stream in selected_streams])
-    for stream in selected_streams:
-        if stream.parent_tap_stream_id:
-            # These streams are synced as part of their parent streams
-            continue
-
-        LOGGER.info('Syncing %s', stream.tap_stream_id)
-        STATE = singer.set_currently_syncing(STATE, stream.tap_stream_id)
-        singer.write_state(STATE)
-
-        try:
-            if stream.tap_stream_id in custom_objects:
-                STATE = stream.sync(STATE, ctx, stream.tap_stream_id)
-            else:
-                STATE = stream.sync(STATE, ctx) # pylint: disable=not-callable
-        except SourceUnavailableException as ex:
-            error_message = str(ex).replace(CONFIG['access_token'] or CONFIG['api_key'], 10 * '*')
-            LOGGER.error(error_message)
-        except UriTooLongException as ex:
-            LOGGER.fatal(f"For stream - {stream.tap_stream_id}, please select fewer fields. "
-                         f"The current selection exceeds Hubspot's maximum character allowance.")
-            raise ex
+    parallelism = get_config_int('stream_parallelism', 1)
+    if parallelism > 1:
+        STATE = StreamScheduler(STATE, ctx, custom_objects, parallelism).run(selected_streams)
+    else:
+        for stream in selected_streams:
+            if stream.parent_tap_stream_id:
+                # These streams are synced as part of their parent streams
+                continue
+
+            LOGGER.info('Syncing %s', stream.tap_stream_id)
+            STATE = singer.set_currently_syncing(STATE, stream.tap_stream_id)
+            WRITER.write_state(STATE)
+            STATE = sync_stream(STATE, ctx, stream, custom_objects)
+            WRITER.flush_state()
     STATE = singer.set_currently_syncing(STATE, None)
-    singer.write_state(STATE)
+    WRITER.write_state(STATE, force=True)
+    TRANSPORT.log_stats()
+    GOVERNOR.log_metrics()
+    RETRY_POLICY.log_metrics()
     LOGGER.info("Sync completed")
 
 class Context:
@@ -1439,9 +3373,13 @@ class Context:
                 self.selected_stream_ids.add(stream['tap_stream_id'])
 
         self.catalog = catalog
+        # Index of the catalog entries by stream name, the first entry of a name wins
+        self.streams_by_id = {}
+        for stream in catalog.get('streams'):
+            self.streams_by_id.setdefault(stream.get('stream'), stream)
 
     def get_catalog_from_id(self, tap_stream_id):
-        return [c for c in self.catalog.get('streams') if c.get('stream') == tap_stream_id][0]
+        return self.streams_by_id[tap_stream_id]
 
 def validate_dependencies(ctx):
     errs = []
@@ -1486,34 +3424,46 @@ def load_discovered_schema(stream):
 
     return schema, mdata
 
+def discover_stream(stream):
+    LOGGER.info('Loading schema for %s', stream.tap_stream_id)
+    try:
+        schema, mdata = load_discovered_schema(stream)
+    except SourceUnavailableException as ex:
+        # Skip the discovery mode on the streams were the required scopes are missing
+        warning_message = str(ex).replace(CONFIG['access_token'] or CONFIG['api_key'], 10 * '*')
+        LOGGER.warning(warning_message)
+        return None
+    return {'stream': stream.tap_stream_id,
+            'tap_stream_id': stream.tap_stream_id,
+            'schema': schema,
+            'metadata': mdata}
+
 def discover_schemas():
     result = {'streams': []}
-    for stream in STREAMS:
-        LOGGER.info('Loading schema for %s', stream.tap_stream_id)
-        try:
-            schema, mdata = load_discovered_schema(stream)
-            result['streams'].append({'stream': stream.tap_stream_id,
-                                      'tap_stream_id': stream.tap_stream_id,
-                                      'schema': schema,
-                                      'metadata': mdata})
-        except SourceUnavailableException as ex:
-            # Skip the discovery mode on the streams were the required scopes are missing
-            warning_message = str(ex).replace(CONFIG['access_token'] or CONFIG['api_key'], 10 * '*')
-            LOGGER.warning(warning_message)
-
-    for custom_stream in generate_custom_streams(mode="DISCOVER"):
-        LOGGER.info('Loading schema for Custom Object - %s', custom_stream["stream"].tap_stream_id)
-        result['streams'].append({'stream': custom_stream["stream"].tap_stream_id,
-                                  'tap_stream_id': custom_stream["stream"].tap_stream_id,
-                                  "table_name": custom_stream["custom_object_name"],
-                                  'schema': custom_stream["schema"],
-                                  'metadata': get_metadata(custom_stream["stream"], custom_stream["schema"])})
+    # The schemas are loaded concurrently, but the catalog keeps the order of STREAMS
+    with WorkerPool(get_config_int('discovery_workers', DEFAULT_DETAIL_WORKERS)) as pool:
+        custom_streams = pool.submit(generate_custom_streams, "DISCOVER")
+        for stream_entry in pool.map(discover_stream, STREAMS):
+            if stream_entry is not None:
+                result['streams'].append(stream_entry)
+
+        for custom_stream in custom_streams.result():
+            LOGGER.info('Loading schema for Custom Object - %s', custom_stream["stream"].tap_stream_id)
+            result['streams'].append({'stream': custom_stream["stream"].tap_stream_id,
+                                      'tap_stream_id': custom_stream["stream"].tap_stream_id,
+                                      "table_name": custom_stream["custom_object_name"],
+                                      'schema': custom_stream["schema"],
+                                      'metadata': get_metadata(custom_stream["stream"], custom_stream["schema"])})
 
     return result
 
 def do_discover():
     LOGGER.info('Loading schemas')
+    DISCOVERY_CACHE.configure(directory=CONFIG.get('discovery_cache_dir'),
+                              ttl=get_config_int('discovery_cache_ttl', DEFAULT_DISCOVERY_CACHE_TTL))
     json.dump(discover_schemas(), sys.stdout, indent=4)
+    TRANSPORT.log_stats()
+    DISCOVERY_CACHE.log_stats()
 
 def get_request_timeout():
     # Get `request_timeout` value from config.
@@ -1526,6 +3476,20 @@ def get_request_timeout():
         request_timeout = REQUEST_TIMEOUT
     return request_timeout
 
+def get_config_bool(key, default):
+    # Booleans may be given as JSON booleans or as "true"/"false" strings
+    value = CONFIG.get(key)
+    if value is None or value == "":
+        return default
+    return str(value).lower() != 'false'
+
+def get_config_int(key, default):
+    # Treat a missing or empty config value as "use the default".
+    value = CONFIG.get(key)
+    if value is None or value == "":
+        return default
+    return int(value)
+
 def main_impl():
     args = utils.parse_args(["start_date"])
 
@@ -1546,10 +3510,18 @@ def main_impl():
     if args.state:
         STATE.update(args.state)
 
+    configure_transport()
+    configure_retry_policy()
+
     if args.discover:
         do_discover()
     elif args.properties:
-        do_sync(STATE, args.properties)
+        with buffered_stdout():
+            try:
+                do_sync(STATE, args.properties)
+            finally:
+                # A pending state only covers records that were already written
+                WRITER.flush_state()
     else:
         LOGGER.info("No properties were selected")
 
@@ -1,4 +1,6 @@
-from tap_hubspot import sync_deals
+import threading
+import singer
+from tap_hubspot import sync_deals, gen_request, merge_responses, process_v3_deals_records, v3_deal_to_v1
 from unittest.mock import patch, ANY
 
 
@@ -8,7 +10,7 @@ from unittest.mock import patch, ANY
 @patch('singer.utils.strptime_with_tz')
 @patch('singer.utils.strftime')
 @patch('tap_hubspot.load_schema')
-@patch('tap_hubspot.gen_request', return_value=[])
+@patch('tap_hubspot.gen_request_pages', return_value=[])
 def test_associations_are_not_validated(mocked_gen_request, mocked_catalog_from_id, mocked_metadata_map, mocked_utils_strptime, mocked_utils_strftime, mocked_load_schema, mocked_min):
     # pylint: disable=unused-argument
     sync_deals({}, mocked_catalog_from_id)
@@ -24,7 +26,7 @@ def test_associations_are_not_validated(mocked_gen_request, mocked_catalog_from_
 @patch('singer.utils.strptime_with_tz')
 @patch('singer.utils.strftime')
 @patch('tap_hubspot.load_schema')
-@patch('tap_hubspot.gen_request', return_value=[])
+@patch('tap_hubspot.gen_request_pages', return_value=[])
 def test_associations_are_validated(mocked_gen_request, mocked_catalog_from_id, mocked_metadata_map, mocked_utils_strptime, mocked_utils_strftime, mocked_load_schema, mocked_min):
     # pylint: disable=unused-argument
     sync_deals({}, mocked_catalog_from_id)
@@ -32,3 +34,284 @@ def test_associations_are_validated(mocked_gen_request, mocked_catalog_from_id,
     expected_param = {'includeAssociations': True, 'properties': [], 'limit': 100}
 
     mocked_gen_request.assert_called_once_with(ANY, ANY, ANY, expected_param, ANY, ANY, ANY, ANY, v3_fields=None)
+
+
+def test_merge_responses_joins_on_deal_id():
+    v1_data = [{'dealId': 1, 'properties': {'amount': {'value': '10'}}},
+               {'dealId': 2, 'properties': {'amount': {'value': '20'}}},
+               {'dealId': 3, 'properties': {}}]
+    v3_data = process_v3_deals_records([
+        {'id': '2', 'properties': {'hs_v2_date_entered_closedwon': '2024-01-01', 'amount': '20'}},
+        {'id': '1', 'properties': {'hs_v2_date_exited_closedwon': '2024-02-01'}},
+    ])
+
+    merge_responses(v1_data, v3_data)
+
+    assert v1_data == [
+        {'dealId': 1, 'properties': {'amount': {'value': '10'},
+                                     'hs_v2_date_exited_closedwon': {'value': '2024-02-01'}}},
+        {'dealId': 2, 'properties': {'amount': {'value': '20'},
+                                     'hs_v2_date_entered_closedwon': {'value': '2024-01-01'}}},
+        {'dealId': 3, 'properties': {}},
+    ]
+
+
+class MockResponse:
+    def __init__(self, json_data):
+        self.json_data = json_data
+        self.content = b''
+
+    def json(self):
+        return self.json_data
+
+
+def test_v3_batch_read_overlaps_next_v1_page():
+    v1_pages = {
+        None: {'deals': [{'dealId': 1, 'properties': {}}], 'hasMore': True, 'offset': 1},
+        1: {'deals': [{'dealId': 2, 'properties': {}}], 'hasMore': False, 'offset': 2},
+    }
+    second_page_requested = threading.Event()
+    overlapped = []
+
+    def mock_request(url, params=None):
+        if params.get('offset') == 1:
+            second_page_requested.set()
+        return MockResponse(v1_pages[params.get('offset')])
+
+    def mock_post(url, body):
+        if body['inputs'] == [{'id': '1'}]:
+            # The v3 batch read of page 1 should run while page 2 is requested
+            overlapped.append(second_page_requested.wait(timeout=5))
+        return MockResponse({'results': [{'id': deal['id'], 'properties': {'hs_v2_date_entered_won': 'x'}}
+                                         for deal in body['inputs']]})
+
+    state = {}
+    written_offsets = []
+    with patch('tap_hubspot.request', side_effect=mock_request), \
+         patch('tap_hubspot.post_search_endpoint', side_effect=mock_post), \
+         patch('singer.write_state', side_effect=lambda s: written_offsets.append(singer.get_offset(s, 'deals'))), \
+         patch('tap_hubspot.CONFIG', {}):
+        rows = list(gen_request(state, 'deals', 'url', {}, 'deals', 'hasMore', ['offset'], ['offset'],
+                                v3_fields=['hs_v2_date_entered_won']))
+
+    assert overlapped == [True]
+    assert [row['properties'] for row in rows] == [{'hs_v2_date_entered_won': {'value': 'x'}}] * 2
+    assert written_offsets == [{'offset': 1}, None]
+
+
+DEALS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'dealId': {'type': ['null', 'integer']},
+        'associations': {'type': ['null', 'object'], 'properties': {
+            'associatedVids': {'type': ['null', 'array'], 'items': {'type': ['null', 'integer']}}}},
+        'properties': {'type': ['null', 'object'], 'properties': {}},
+        'property_dealname': {'type': ['null', 'object'], 'properties': {'value': {'type': ['null', 'string']}}},
+        'property_amount': {'type': ['null', 'object'], 'properties': {'value': {'type': ['null', 'number']}}},
+        'property_hs_v2_date_entered_won': {'type': ['null', 'object'],
+                                            'properties': {'value': {'type': ['null', 'string'], 'format': 'date-time'}}},
+        'property_hs_lastmodifieddate': {'type': ['null', 'object'],
+                                         'properties': {'value': {'type': ['null', 'string'], 'format': 'date-time'}}},
+    }
+}
+
+
+class MockContext:
+    def get_catalog_from_id(self, stream_name):
+        selected = {'properties': False, 'property_amount': False}
+        return {'stream': 'deals', 'tap_stream_id': 'deals', 'schema': DEALS_SCHEMA,
+                'metadata': [{'breadcrumb': ['properties', field],
+                              'metadata': {'inclusion': 'available', 'selected': selected.get(field, True)}}
+                             for field in DEALS_SCHEMA['properties']]}
+
+
+@patch('tap_hubspot.get_portal_id', return_value=62515)
+def test_v3_deal_to_v1_keeps_the_latest_version(mocked_portal_id):
+    v3_record = {'id': '7', 'archived': False, 'propertiesWithHistory': {'dealname': [
+        {'value': 'New', 'timestamp': '2024-02-01T00:00:00Z', 'sourceType': 'CRM_UI', 'sourceId': 'u'},
+        {'value': 'Old', 'timestamp': '2024-01-01T00:00:00Z', 'sourceType': 'API', 'sourceId': None}]}}
+
+    record = v3_deal_to_v1(v3_record, include_associations=False)
+
+    assert record['portalId'] == 62515
+    assert record['dealId'] == 7
+    assert record['properties']['dealname'] == {
+        'value': 'New', 'timestamp': 1706745600000, 'source': 'CRM_UI', 'sourceId': 'u',
+        'versions': [{'name': 'dealname', 'value': 'New', 'timestamp': 1706745600000,
+                      'source': 'CRM_UI', 'sourceId': 'u', 'sourceVid': []}]}
+
+
+@patch('tap_hubspot.utils.now', return_value=singer.utils.strptime_to_utc('2024-06-01T00:00:00Z'))
+def test_v3_objects_request_only_the_selected_properties(mocked_now):
+    search_results = [
+        {'id': '1', 'updatedAt': '2024-03-01T00:00:00Z', 'archived': False,
+         'properties': {'hs_object_id': '1', 'dealname': 'New deal', 'hs_v2_date_entered_won': '2024-02-01T00:00:00Z',
+                        'hs_lastmodifieddate': '2024-03-01T00:00:00Z', 'closedate': None}},
+    ]
+    written_records = []
+
+    def post_search_endpoint(url, body):
+        if url.endswith('/crm/v3/objects/deals/search'):
+            return MockResponse({'total': 1, 'results': search_results})
+        if url.endswith('/crm/v3/associations/deals/contacts/batch/read'):
+            return MockResponse({'results': [{'from': {'id': '1'},
+                                              'to': [{'id': '11', 'type': 'deal_to_contact'},
+                                                     {'id': '11', 'type': 'deal_to_contact_primary'}]}]})
+        return MockResponse({'results': []})
+
+    state = {'currently_syncing': 'deals',
+             'bookmarks': {'deals': {'property_hs_lastmodifieddate': '2024-01-01T00:00:00Z'}}}
+    with patch('tap_hubspot.post_search_endpoint', side_effect=post_search_endpoint) as mocked_post, \
+         patch('tap_hubspot.request') as mocked_request, \
+         patch('tap_hubspot.gen_request_pages') as mocked_gen_request, \
+         patch('singer.write_record', side_effect=lambda stream, record, *args, **kwargs: written_records.append(record)), \
+         patch('singer.write_schema'), \
+         patch('singer.write_state'), \
+         patch('tap_hubspot.get_portal_id', return_value=62515), \
+         patch('tap_hubspot.CONFIG', {'deals_v3_objects': 'true', 'start_date': '2020-01-01T00:00:00Z'}):
+        state = sync_deals(state, MockContext())
+
+    mocked_gen_request.assert_not_called()
+    mocked_request.assert_not_called()
+    urls = [call[0][0] for call in mocked_post.call_args_list]
+    # One search per page, plus one read per type of the selected associations
+    assert [url.split('/crm/v3/')[1] for url in urls] == [
+        'objects/deals/search',
+        'associations/deals/contacts/batch/read',
+        'associations/deals/companies/batch/read',
+        'associations/deals/deals/batch/read',
+    ]
+    body = mocked_post.call_args_list[0][0][1]
+    assert body['properties'] == ['dealname', 'hs_lastmodifieddate', 'hs_v2_date_entered_won']
+    assert body['filterGroups'] == [{'filters': [{'propertyName': 'hs_lastmodifieddate', 'operator': 'GTE',
+                                                  'value': '1704067200000'}]}]
+    assert 'propertiesWithHistory' not in body
+    assert written_records == [{
+        'dealId': 1,
+        'associations': {'associatedVids': [11]},
+        'property_dealname': {'value': 'New deal'},
+        'property_hs_v2_date_entered_won': {'value': '2024-02-01T00:00:00.000000Z'},
+        'property_hs_lastmodifieddate': {'value': '2024-03-01T00:00:00.000000Z'},
+    }]
+    assert singer.get_bookmark(state, 'deals', 'property_hs_lastmodifieddate') == '2024-03-01T00:00:00.000000Z'
+
+
+def property_schema(field_type):
+    return {'type': ['null', 'object'], 'properties': {
+        'value': {'type': ['null', 'string'], 'format': 'date-time'} if field_type == 'datetime'
+                 else {'type': ['null', 'string']},
+        'timestamp': {'type': ['null', 'string'], 'format': 'date-time'},
+        'source': {'type': ['null', 'string']},
+        'sourceId': {'type': ['null', 'string']}}}
+
+
+FULL_DEALS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'portalId': {'type': ['null', 'integer']},
+        'dealId': {'type': ['null', 'integer']},
+        'isDeleted': {'type': ['null', 'boolean']},
+        'associations': DEALS_SCHEMA['properties']['associations'],
+        'properties': {'type': ['null', 'object'], 'properties': {
+            'dealname': property_schema('string'), 'closedate': property_schema('datetime'),
+            'hs_lastmodifieddate': property_schema('datetime'), 'hs_v2_date_entered_won': property_schema('datetime')}},
+        'property_dealname': property_schema('string'),
+        'property_closedate': property_schema('datetime'),
+        'property_hs_lastmodifieddate': property_schema('datetime'),
+        'property_hs_v2_date_entered_won': property_schema('datetime'),
+        'properties_versions': {'type': ['null', 'array'], 'items': {'type': ['null', 'object'], 'properties': {
+            'name': {'type': ['null', 'string']},
+            'value': {'type': ['null', 'string']},
+            'timestamp': {'type': ['null', 'string'], 'format': 'date-time'},
+            'source': {'type': ['null', 'string']},
+            'sourceId': {'type': ['null', 'string']}}}},
+    }
+}
+
+
+class FullMockContext:
+    def get_catalog_from_id(self, stream_name):
+        return {'stream': 'deals', 'tap_stream_id': 'deals', 'schema': FULL_DEALS_SCHEMA,
+                'metadata': [{'breadcrumb': ['properties', field],
+                              'metadata': {'inclusion': 'available', 'selected': field != 'properties'}}
+                             for field in FULL_DEALS_SCHEMA['properties']]}
+
+
+def v1_property(name, value, timestamp, source, source_id):
+    version = {'name': name, 'value': value, 'timestamp': timestamp, 'source': source,
+               'sourceId': source_id, 'sourceVid': []}
+    return {'value': value, 'timestamp': timestamp, 'source': source, 'sourceId': source_id, 'versions': [version]}
+
+
+def v3_history(value, timestamp, source, source_id):
+    return {'value': value, 'timestamp': timestamp, 'sourceType': source, 'sourceId': source_id}
+
+
+V1_DEAL = {
+    'portalId': 62515, 'dealId': 7, 'isDeleted': False,
+    'associations': {'associatedVids': [11], 'associatedCompanyIds': [], 'associatedDealIds': []},
+    'properties': {
+        'dealname': v1_property('dealname', 'Deal', 1706745600000, 'CRM_UI', 'userId:1'),
+        'closedate': v1_property('closedate', '1709251200000', 1706745600000, 'API', None),
+        'hs_lastmodifieddate': v1_property('hs_lastmodifieddate', '1709251200000', 1709251200000, 'CALCULATED', None),
+        'hs_v2_date_entered_won': v1_property('hs_v2_date_entered_won', '1706745600000', 1706745600000,
+                                              'CALCULATED', None),
+    }
+}
+
+V3_SEARCHED_DEAL = {'id': '7', 'updatedAt': '2024-03-01T00:00:00Z', 'archived': False,
+                    'properties': {'dealname': 'Deal', 'closedate': '2024-03-01T00:00:00Z',
+                                   'hs_lastmodifieddate': '2024-03-01T00:00:00Z',
+                                   'hs_v2_date_entered_won': '2024-02-01T00:00:00Z'}}
+
+V3_DEAL_HISTORY = {
+    'dealname': [v3_history('Deal', '2024-02-01T00:00:00Z', 'CRM_UI', 'userId:1'),
+                 v3_history('Draft', '2024-01-01T00:00:00Z', 'API', None)],
+    'closedate': [v3_history('2024-03-01T00:00:00Z', '2024-02-01T00:00:00Z', 'API', None)],
+    'hs_lastmodifieddate': [v3_history('2024-03-01T00:00:00Z', '2024-03-01T00:00:00Z', 'CALCULATED', None)],
+    'hs_v2_date_entered_won': [v3_history('2024-02-01T00:00:00Z', '2024-02-01T00:00:00Z', 'CALCULATED', None)],
+}
+
+
+def mock_deal_request(url, params=None):
+    if url.endswith('/deals/v1/deal/paged'):
+        return MockResponse({'deals': [V1_DEAL], 'hasMore': False, 'offset': 7})
+    raise AssertionError(url)
+
+
+def mock_deal_post(url, body):
+    if url.endswith('/crm/v3/objects/deals/search'):
+        properties = {name: V3_SEARCHED_DEAL['properties'][name] for name in body['properties']}
+        return MockResponse({'total': 1, 'results': [dict(V3_SEARCHED_DEAL, properties=properties)]})
+    if url.endswith('/crm/v3/associations/deals/contacts/batch/read'):
+        return MockResponse({'results': [{'from': {'id': '7'}, 'to': [{'id': '11', 'type': 'deal_to_contact'}]}]})
+    if '/crm/v3/associations/deals/' in url:
+        return MockResponse({'results': []})
+    # The batch read of the v1 hs_v2 fields and of the v3 history
+    deal = {'id': '7', 'properties': {name: V3_SEARCHED_DEAL['properties'][name] for name in body['properties']}}
+    if 'propertiesWithHistory' in body:
+        deal['propertiesWithHistory'] = V3_DEAL_HISTORY
+    return MockResponse({'results': [deal]})
+
+
+@patch('tap_hubspot.utils.now', return_value=singer.utils.strptime_to_utc('2024-06-01T00:00:00Z'))
+@patch('tap_hubspot.get_portal_id', return_value=62515)
+@patch('tap_hubspot.request', side_effect=mock_deal_request)
+@patch('tap_hubspot.post_search_endpoint', side_effect=mock_deal_post)
+def test_v3_objects_write_the_same_deals_as_v1(mocked_post, mocked_request, mocked_portal_id, mocked_now):
+    written_records = {}
+    for deals_v3_objects in ['false', 'true']:
+        records = written_records[deals_v3_objects] = []
+        state = {'currently_syncing': 'deals'}
+        with patch('singer.write_record', side_effect=lambda stream, record, *args, records=records, **kwargs:
+                   records.append(record)), \
+             patch('singer.write_schema'), \
+             patch('singer.write_state'), \
+             patch('tap_hubspot.CONFIG', {'deals_v3_objects': deals_v3_objects,
+                                          'start_date': '2020-01-01T00:00:00Z'}):
+            sync_deals(state, FullMockContext())
+
+    assert len(written_records['true']) == 1
+    assert written_records['true'] == written_records['false']
+    assert written_records['true'][0]['property_dealname'] == {
+        'value': 'Deal', 'timestamp': '2024-02-01T00:00:00.000000Z', 'source': 'CRM_UI', 'sourceId': 'userId:1'}
@@ -0,0 +1,79 @@
+import io
+import sys
+import unittest
+from unittest import mock
+
+import tap_hubspot
+from tap_hubspot import BufferedOutput, buffered_stdout
+
+
+class TestBufferedOutput(unittest.TestCase):
+
+    def test_flush_waits_for_the_byte_threshold(self):
+        """
+            Verify that messages are only written through once enough bytes are buffered
+        """
+        stream = io.StringIO()
+        output = BufferedOutput(stream, max_bytes=20, max_seconds=3600)
+
+        output.write('{"a": 1}\n')
+        output.flush()
+        self.assertEqual(stream.getvalue(), '')
+
+        output.write('{"b": 2}\n{"c": 3}\n')
+        output.flush()
+        self.assertEqual(stream.getvalue(), '{"a": 1}\n{"b": 2}\n{"c": 3}\n')
+        self.assertEqual((output.flushes, output.flushed_bytes), (1, 27))
+
+    def test_flush_after_the_time_threshold(self):
+        """
+            Verify that buffered messages are written through once the time threshold has passed
+        """
+        stream = io.StringIO()
+        output = BufferedOutput(stream, max_bytes=1024, max_seconds=0)
+
+        output.write('{"a": 1}\n')
+        output.flush()
+
+        self.assertEqual(stream.getvalue(), '{"a": 1}\n')
+
+
+class TestBufferedStdout(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config)
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def test_state_flushes_the_buffer(self):
+        """
+            Verify that records are held back until a STATE message is written,
+            which is written through right away
+        """
+        stdout = io.StringIO()
+        with mock.patch('sys.stdout', stdout):
+            with buffered_stdout():
+                tap_hubspot.WRITER.write_record('contacts', {'id': 1})
+                self.assertEqual(stdout.getvalue(), '')
+
+                tap_hubspot.WRITER.write_state({'bookmarks': {}})
+                self.assertEqual(stdout.getvalue().splitlines(),
+                                 ['{"type": "RECORD", "stream": "contacts", "record": {"id": 1}}',
+                                  '{"type": "STATE", "value": {"bookmarks": {}}}'])
+
+                tap_hubspot.WRITER.write_record('contacts', {'id': 2})
+            self.assertIs(sys.stdout, stdout)
+
+        self.assertEqual(len(stdout.getvalue().splitlines()), 3)
+
+    def test_zero_bytes_disables_buffering(self):
+        """
+            Verify that stdout is left alone when output_buffer_bytes is 0
+        """
+        tap_hubspot.CONFIG['output_buffer_bytes'] = 0
+        stdout = io.StringIO()
+        with mock.patch('sys.stdout', stdout):
+            with buffered_stdout():
+                self.assertIs(sys.stdout, stdout)
@@ -0,0 +1,80 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import tap_hubspot
+from tap_hubspot import sync_campaigns
+
+CAMPAIGNS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": ["null", "integer"]},
+        "name": {"type": ["null", "string"]},
+    }
+}
+
+PAGES = {
+    None: {"campaigns": [{"id": 1}, {"id": 2}, {"id": 3}], "hasMore": True, "offset": "3"},
+    "3": {"campaigns": [{"id": 4}, {"id": 5}], "hasMore": False, "offset": "5"},
+}
+
+
+class MockResponse:
+    def __init__(self, json_data):
+        self.json_data = json_data
+        self.content = b''
+
+    def json(self):
+        return self.json_data
+
+
+class MockContext:
+    def get_catalog_from_id(self, stream_name):
+        return {"stream": "campaigns", "tap_stream_id": "campaigns", "schema": CAMPAIGNS_SCHEMA,
+                "metadata": [{"breadcrumb": [], "metadata": {"selected": True}}]}
+
+
+def mock_request(url, params=None):
+    if url == tap_hubspot.get_url("campaigns_all"):
+        return MockResponse(PAGES[params.get("offset")])
+    campaign_id = int(url.rsplit("/", 1)[1])
+    # Let the earlier campaigns of a page finish last
+    time.sleep((10 - campaign_id) / 1000.0)
+    return MockResponse({"id": campaign_id, "name": "campaign {}".format(campaign_id)})
+
+
+@patch('tap_hubspot.request', side_effect=mock_request)
+@patch('tap_hubspot.load_schema', return_value=CAMPAIGNS_SCHEMA)
+@patch('tap_hubspot.CONFIG', {'start_date': '2020-01-01T00:00:00Z', 'campaigns_detail_workers': 4})
+class TestSyncCampaigns(unittest.TestCase):
+
+    def sync(self):
+        written_records = []
+        with patch('singer.write_record',
+                   side_effect=lambda stream, record, *args, **kwargs: written_records.append(record)), \
+             patch('singer.write_schema'), \
+             patch('singer.write_state'), \
+             patch('singer.metrics.log') as mocked_log:
+            sync_campaigns({"currently_syncing": "campaigns"}, MockContext())
+        return written_records, [call[0][1] for call in mocked_log.call_args_list]
+
+    def test_details_are_written_in_page_order(self, mocked_load_schema, mocked_request):
+        """
+            Verify that campaign details fetched by several workers, which finish
+            out of order, are written in the order of the pages
+        """
+        written_records, _ = self.sync()
+
+        self.assertEqual([record["id"] for record in written_records], [1, 2, 3, 4, 5])
+        self.assertEqual(written_records[0], {"id": 1, "name": "campaign 1"})
+
+    def test_page_fetch_duration_is_timed(self, mocked_load_schema, mocked_request):
+        """
+            Verify that the detail fetches of every page emit a page_fetch_duration timer
+        """
+        _, points = self.sync()
+
+        timers = [point for point in points if point.metric == "page_fetch_duration"]
+        self.assertEqual([point.tags["page_size"] for point in timers], [3, 2])
+        self.assertTrue(all(point.metric_type == "timer" and point.tags["endpoint"] == "campaigns_detail"
+                            for point in timers))
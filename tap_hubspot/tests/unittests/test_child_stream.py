@@ -0,0 +1,96 @@
+import threading
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import tap_hubspot
+from tap_hubspot import ChildStream, Context, WorkerPool
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "listId": {"type": ["null", "string"]},
+        "recordId": {"type": ["null", "string"]},
+        "membershipTimestamp": {"type": ["null", "string"], "format": "date-time"},
+    }
+}
+
+CATALOG = {
+    "streams": [
+        {"stream": "contact_lists", "tap_stream_id": "contact_lists", "schema": SCHEMA,
+         "metadata": [{"breadcrumb": [], "metadata": {"selected": True}}]},
+        {"stream": "list_memberships", "tap_stream_id": "list_memberships", "schema": SCHEMA,
+         "metadata": [{"breadcrumb": [], "metadata": {"selected": True}}]},
+        {"stream": "list_memberships", "tap_stream_id": "duplicate", "schema": {}, "metadata": []},
+    ]
+}
+
+
+class TestContext(unittest.TestCase):
+
+    def test_catalog_entries_are_indexed_by_stream(self):
+        """
+            Verify that the catalog entry of a stream is looked up by its name
+            and the first entry of a name is returned
+        """
+        ctx = Context(CATALOG)
+
+        self.assertIs(ctx.get_catalog_from_id("list_memberships"), CATALOG["streams"][1])
+        self.assertEqual(ctx.selected_stream_ids, {"contact_lists", "list_memberships"})
+
+
+@patch("tap_hubspot.utils.now", return_value=datetime(2024, 6, 1, tzinfo=timezone.utc))
+class TestChildStream(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config, start_date="2020-01-01T00:00:00Z")
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def test_records_of_every_parent_share_the_setup(self, mock_now):
+        """
+            Verify that the records of several parents are written with the parent id,
+            filtered by the start and counted, while the setup is done once
+        """
+        state = {"bookmarks": {"list_memberships": {"membershipTimestamp": "2024-01-01T00:00:00Z"}}}
+        written_records = []
+
+        with patch("singer.write_record",
+                   side_effect=lambda stream, record, *args, **kwargs: written_records.append(record)), \
+             ChildStream(state, Context(CATALOG), "list_memberships", "membershipTimestamp") as memberships:
+            max_bk_value = memberships.start
+            for list_id, timestamps in (("1", ["2023-12-01T00:00:00Z", "2024-03-01T00:00:00Z"]),
+                                        ("2", ["2024-02-01T00:00:00Z"])):
+                rows = [{"recordId": "r", "membershipTimestamp": timestamp} for timestamp in timestamps]
+                max_bk_value = memberships.write_records(rows, "listId", list_id, memberships.start, max_bk_value)
+            self.assertEqual(memberships.counter.value, 2)
+
+        self.assertEqual([record["listId"] for record in written_records], ["1", "2"])
+        self.assertEqual(max_bk_value, "2024-03-01T00:00:00.000000Z")
+        self.assertEqual(mock_now.call_count, 1)
+
+    def test_every_thread_gets_its_own_transformer(self, mock_now):
+        """
+            Verify that the records of parents written on the worker pool are
+            transformed by one transformer per thread, all closed at the end
+        """
+        state = {"bookmarks": {}}
+        all_started = threading.Barrier(3)
+        transformers = []
+
+        def write_parent(list_id):
+            all_started.wait(5)
+            rows = [{"recordId": "r", "membershipTimestamp": "2024-03-01T00:00:00Z"}]
+            memberships.write_records(rows, "listId", list_id, memberships.start, memberships.start)
+            transformers.append(memberships.get_transformer())
+
+        with patch("singer.write_record"), \
+             ChildStream(state, Context(CATALOG), "list_memberships", "membershipTimestamp") as memberships, \
+             WorkerPool(3) as pool:
+            pool.map(write_parent, ["1", "2", "3"])
+            self.assertEqual(memberships.counter.value, 3)
+
+        self.assertEqual(len({id(transformer) for transformer in transformers}), 3)
+        self.assertEqual(sorted(map(id, memberships.transformers)), sorted(map(id, transformers)))
@@ -0,0 +1,473 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import singer
+import tap_hubspot
+from tap_hubspot import sync_companies
+
+
+class MockResponse:
+    def __init__(self, json_data):
+        self.json_data = json_data
+        self.content = b''
+
+    def json(self):
+        return self.json_data
+
+
+class MockContext:
+    selected_stream_ids = ["companies"]
+
+    def get_catalog_from_id(self, stream_name):
+        return {
+            "stream": "companies",
+            "tap_stream_id": "companies",
+            "metadata": [
+                {"breadcrumb": [], "metadata": {"selected": True}},
+                {"breadcrumb": ["properties", "companyId"], "metadata": {"inclusion": "automatic"}},
+            ]
+        }
+
+
+COMPANIES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "companyId": {"type": ["integer"]},
+        "property_name": {"type": ["null", "object"],
+                          "properties": {"value": {"type": ["null", "string"]}}},
+    }
+}
+
+
+def make_company(company_id, modified_millis):
+    return {"companyId": company_id,
+            "properties": {"hs_lastmodifieddate": {"value": str(modified_millis),
+                                                   "timestamp": modified_millis}}}
+
+
+PAGES = {
+    None: {"companies": [make_company(1, 1700000000000), make_company(2, 1500000000000),
+                         make_company(3, 1700000000000)],
+           "has-more": True, "offset": 3},
+    3: {"companies": [make_company(4, 1700000000000), make_company(5, 1700000000000)],
+        "has-more": False, "offset": 5},
+}
+
+
+def mock_request(url, params=None):
+    if url == tap_hubspot.get_url("companies_all"):
+        return MockResponse(PAGES[params.get("offset")])
+    if url == tap_hubspot.get_url("account_details"):
+        return MockResponse({"portalId": 62515, "timeZone": "US/Eastern"})
+    company_id = int(url.rsplit("/", 1)[1])
+    # Let the earlier companies of a page finish last
+    time.sleep((10 - company_id) / 1000.0)
+    return MockResponse({"companyId": company_id, "properties": {"name": {"value": "company {}".format(company_id)}}})
+
+
+class TestSyncCompanies(unittest.TestCase):
+
+    def setUp(self):
+        self.written_records = []
+        self.written_states = []
+        self.original_write_record = singer.write_record
+        self.original_write_state = singer.write_state
+        singer.write_record = lambda stream, record, *args, **kwargs: self.written_records.append(record)
+        singer.write_state = lambda state: self.written_states.append(singer.get_offset(state, "companies"))
+
+    def tearDown(self):
+        singer.write_record = self.original_write_record
+        singer.write_state = self.original_write_state
+
+    @patch.dict('tap_hubspot.default_company_params')
+    @patch('tap_hubspot.request', side_effect=mock_request)
+    @patch('tap_hubspot.load_schema', return_value=COMPANIES_SCHEMA)
+    @patch('tap_hubspot.write_current_sync_start', side_effect=lambda state, *args: state)
+    @patch('tap_hubspot.CONFIG', {'start_date': '2020-01-01T00:00:00Z', 'companies_detail_workers': 4})
+    def test_details_are_written_in_page_order(self, mocked_sync_start, mocked_load_schema, mocked_request):
+        """
+            Verify that concurrently fetched company details are written in the order of the page
+            and that companies modified before the bookmark are not fetched
+        """
+        sync_companies({"currently_syncing": "companies"}, MockContext())
+
+        self.assertEqual([record["companyId"] for record in self.written_records], [1, 3, 4, 5])
+        self.assertEqual(self.written_records[0]["property_name"], {"value": "company 1"})
+        detail_urls = [call[0][0] for call in mocked_request.call_args_list
+                       if call[0][0] != tap_hubspot.get_url("companies_all")]
+        self.assertNotIn(tap_hubspot.get_url("companies_detail", company_id=2), detail_urls)
+
+    @patch.dict('tap_hubspot.default_company_params')
+    @patch('tap_hubspot.request', side_effect=mock_request)
+    @patch('tap_hubspot.load_schema', return_value=COMPANIES_SCHEMA)
+    @patch('tap_hubspot.CONFIG', {'start_date': '2020-01-01T00:00:00Z', 'companies_detail_workers': 4})
+    def test_offset_is_written_after_page(self, mocked_load_schema, mocked_request):
+        """
+            Verify that the offset of the next page is checkpointed only after the page is written
+        """
+        original_write_state = singer.write_state
+        singer.write_state = lambda state: self.written_states.append(
+            (len(self.written_records), dict(singer.get_offset(state, "companies") or {})))
+
+        sync_companies({"currently_syncing": "companies"}, MockContext())
+
+        self.assertIn((2, {"offset": 3}), self.written_states)
+        singer.write_state = original_write_state
+
+
+class TestCompaniesBatchRead(unittest.TestCase):
+
+    def test_v3_company_is_reshaped_to_detail_layout(self):
+        """
+            Verify that a v3 batch read company has the same layout as the companies_detail response
+        """
+        row = {"portalId": 62515, "companyId": 42, "isDeleted": False, "properties": {}}
+        v3_record = {
+            "id": "42",
+            "properties": {"name": "New name", "domain": None},
+            "propertiesWithHistory": {
+                "name": [{"value": "New name", "timestamp": "2023-05-01T12:00:00.123Z",
+                          "sourceType": "CRM_UI", "sourceId": "userId:1"},
+                         {"value": "Old name", "timestamp": "2023-01-01T00:00:00Z",
+                          "sourceType": "API", "sourceId": None}],
+                "domain": [],
+            },
+            "archived": False,
+        }
+
+        record = tap_hubspot.v3_company_to_v2(row, v3_record)
+
+        self.assertEqual(record, {
+            "portalId": 62515,
+            "companyId": 42,
+            "isDeleted": False,
+            "properties": {
+                "name": {
+                    "value": "New name", "timestamp": 1682942400123, "source": "CRM_UI", "sourceId": "userId:1",
+                    "versions": [
+                        {"name": "name", "value": "New name", "timestamp": 1682942400123,
+                         "source": "CRM_UI", "sourceId": "userId:1", "sourceVid": []},
+                        {"name": "name", "value": "Old name", "timestamp": 1672531200000,
+                         "source": "API", "sourceId": None, "sourceVid": []},
+                    ]
+                }
+            }
+        })
+
+    @patch('tap_hubspot.post_search_endpoint')
+    def test_details_are_read_in_batches_of_50(self, mocked_post):
+        """
+            Verify that company details are read 50 at a time and returned by company id
+        """
+        mocked_post.side_effect = lambda url, body: MockResponse(
+            {"results": [{"id": company["id"], "propertiesWithHistory": {}} for company in body["inputs"]]})
+        rows = [{"companyId": company_id, "properties": {}} for company_id in range(120)]
+
+        with tap_hubspot.WorkerPool(1) as pool:
+            details = tap_hubspot.get_company_details(pool, rows, ["name"])
+
+        self.assertEqual([len(call[0][1]["inputs"]) for call in mocked_post.call_args_list], [50, 50, 20])
+        self.assertEqual(sorted(details.keys()), list(range(120)))
+        self.assertEqual(mocked_post.call_args[0][1]["propertiesWithHistory"], ["name"])
+
+
+def company_property_schema(field_type):
+    return {"type": ["null", "object"], "properties": {
+        "value": tap_hubspot.get_field_type_schema(field_type),
+        "timestamp": {"type": ["null", "string"], "format": "date-time"},
+        "source": {"type": ["null", "string"]},
+        "sourceId": {"type": ["null", "string"]}}}
+
+
+FULL_COMPANIES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "portalId": {"type": ["null", "integer"]},
+        "companyId": {"type": ["null", "integer"]},
+        "isDeleted": {"type": ["null", "boolean"]},
+        "properties": {"type": ["null", "object"], "properties": {
+            "name": company_property_schema("string"), "createdate": company_property_schema("datetime"),
+            "hs_lastmodifieddate": company_property_schema("datetime")}},
+        "property_name": company_property_schema("string"),
+        "property_createdate": company_property_schema("datetime"),
+        "property_hs_lastmodifieddate": company_property_schema("datetime"),
+        "properties_versions": tap_hubspot.utils.load_json(tap_hubspot.get_abs_path("schemas/versions.json")),
+    }
+}
+
+
+class FullMockContext:
+    selected_stream_ids = ["companies"]
+
+    def get_catalog_from_id(self, stream_name):
+        return {"stream": "companies", "tap_stream_id": "companies", "schema": FULL_COMPANIES_SCHEMA,
+                "metadata": [{"breadcrumb": ["properties", field],
+                              "metadata": {"inclusion": "available", "selected": field != "properties"}}
+                             for field in FULL_COMPANIES_SCHEMA["properties"]]}
+
+
+def v2_property(name, value, timestamp, source, source_id):
+    version = {"name": name, "value": value, "timestamp": timestamp, "source": source,
+               "sourceId": source_id, "sourceVid": []}
+    return {"value": value, "timestamp": timestamp, "source": source, "sourceId": source_id, "versions": [version]}
+
+
+def v3_history(value, timestamp, source, source_id):
+    return [{"value": value, "timestamp": timestamp, "sourceType": source, "sourceId": source_id}]
+
+
+V2_COMPANY = {
+    "portalId": 62515, "companyId": 42, "isDeleted": False,
+    "properties": {
+        "name": v2_property("name", "Company", 1682942400123, "CRM_UI", "userId:1"),
+        "createdate": v2_property("createdate", "1682942400123", 1682942400123, "API", None),
+        "hs_lastmodifieddate": v2_property("hs_lastmodifieddate", "1700000000000", 1700000000000, "CALCULATED", None),
+    }
+}
+
+V3_COMPANY = {
+    "id": "42", "archived": False,
+    "propertiesWithHistory": {
+        "name": v3_history("Company", "2023-05-01T12:00:00.123Z", "CRM_UI", "userId:1"),
+        "createdate": v3_history("2023-05-01T12:00:00.123Z", "2023-05-01T12:00:00.123Z", "API", None),
+        "hs_lastmodifieddate": v3_history("2023-11-14T22:13:20Z", "2023-11-14T22:13:20Z", "CALCULATED", None),
+    }
+}
+
+
+def mock_full_company_request(url, params=None):
+    if url == tap_hubspot.get_url("companies_all"):
+        row = {key: V2_COMPANY[key] for key in ["portalId", "companyId", "isDeleted"]}
+        row["properties"] = {"hs_lastmodifieddate": V2_COMPANY["properties"]["hs_lastmodifieddate"]}
+        return MockResponse({"companies": [row], "has-more": False, "offset": 42})
+    if url == tap_hubspot.get_url("companies_detail", company_id=42):
+        return MockResponse(V2_COMPANY)
+    raise AssertionError(url)
+
+
+@patch('tap_hubspot.request', side_effect=mock_full_company_request)
+@patch('tap_hubspot.post_search_endpoint', return_value=MockResponse({"results": [V3_COMPANY]}))
+class TestCompaniesBatchReadRecords(unittest.TestCase):
+
+    def test_batch_read_writes_the_same_companies_as_detail(self, mocked_post, mocked_request):
+        """
+            Verify that a company read through the v3 batch read endpoint is written like the one
+            from the companies_detail endpoint, with the date-times in the same format
+        """
+        written_records = {}
+        for companies_batch_read in ["false", "true"]:
+            records = written_records[companies_batch_read] = []
+            with patch('singer.write_record', side_effect=lambda stream, record, *args, records=records, **kwargs:
+                       records.append(record)), \
+                 patch('singer.write_schema'), \
+                 patch('singer.write_state'), \
+                 patch('tap_hubspot.CONFIG', {'start_date': '2020-01-01T00:00:00Z',
+                                              'companies_batch_read': companies_batch_read}):
+                sync_companies({"currently_syncing": "companies"}, FullMockContext())
+
+        self.assertEqual(mocked_post.call_count, 1)
+        self.assertEqual(len(written_records["true"]), 1)
+        self.assertEqual(written_records["true"], written_records["false"])
+        self.assertEqual(written_records["true"][0]["property_createdate"]["value"], "2023-05-01T12:00:00.123000Z")
+
+
+SEARCH_RESULTS = [{"id": "1", "properties": {"hs_lastmodifieddate": "2023-11-14T22:13:20Z"}},
+                  {"id": "3", "properties": {"hs_lastmodifieddate": "2023-11-14T22:13:21Z"}},
+                  {"id": "5", "properties": {"hs_lastmodifieddate": "2023-11-14T22:13:22Z"}}]
+
+
+class MockSearch:
+    """
+    Answer company searches from `results` like the search endpoint does:
+    filtered by the modification time, oldest first, paged with `after`.
+    """
+    def __init__(self, results):
+        self.results = results
+
+    def __call__(self, url, body):
+        since = int(body["filterGroups"][0]["filters"][0]["value"])
+        matches = sorted((result for result in self.results
+                          if singer.utils.strptime_to_utc(result["properties"]["hs_lastmodifieddate"]).timestamp()
+                          * 1000 >= since),
+                         key=lambda result: result["properties"]["hs_lastmodifieddate"])
+        offset = int(body.get("after") or 0)
+        data = {"total": len(matches), "results": matches[offset:offset + body["limit"]]}
+        if offset + body["limit"] < len(matches):
+            data["paging"] = {"next": {"after": str(offset + body["limit"])}}
+        return MockResponse(data)
+
+
+@patch('tap_hubspot.PORTAL_ID', None)
+class TestIncrementalCompanies(unittest.TestCase):
+
+    def setUp(self):
+        self.written_records = []
+        self.state = {"currently_syncing": "companies",
+                      "bookmarks": {"companies": {"property_hs_lastmodifieddate": "2023-01-01T00:00:00Z"}}}
+
+    def sync(self, search):
+        with patch('tap_hubspot.post_search_endpoint', side_effect=search) as mocked_post, \
+             patch('singer.write_record',
+                   side_effect=lambda stream, record, *args, **kwargs: self.written_records.append(record)), \
+             patch('singer.write_state'):
+            state = sync_companies(self.state, MockContext())
+        return state, mocked_post
+
+    @patch.dict('tap_hubspot.default_company_params')
+    @patch('tap_hubspot.request', side_effect=mock_request)
+    @patch('tap_hubspot.load_schema', return_value=COMPANIES_SCHEMA)
+    @patch('tap_hubspot.CRM_SEARCH_LIMIT', 2)
+    @patch('tap_hubspot.CONFIG', {'start_date': '2020-01-01T00:00:00Z'})
+    def test_modified_companies_are_searched(self, mocked_load_schema, mocked_request):
+        """
+            Verify that with a bookmark only the companies modified since then are
+            searched for, from the last modification time seen, and the full scan is skipped
+        """
+        state, mocked_post = self.sync(MockSearch(SEARCH_RESULTS))
+
+        self.assertEqual([record["companyId"] for record in self.written_records], [1, 3, 5])
+        self.assertNotIn(tap_hubspot.get_url("companies_all"), [call[0][0] for call in mocked_request.call_args_list])
+        self.assertEqual([(call[0][1]["filterGroups"][0]["filters"][0]["value"], call[0][1].get("after"))
+                          for call in mocked_post.call_args_list],
+                         [("1672531200000", None), ("1700000001000", None)])
+        self.assertEqual(singer.get_bookmark(state, "companies", "property_hs_lastmodifieddate"),
+                         "2023-11-14T22:13:22.000000Z")
+
+    @patch.dict('tap_hubspot.default_company_params')
+    @patch('tap_hubspot.request', side_effect=mock_request)
+    @patch('tap_hubspot.load_schema', return_value=COMPANIES_SCHEMA)
+    @patch('tap_hubspot.CRM_SEARCH_LIMIT', 2)
+    @patch('tap_hubspot.CONFIG', {'start_date': '2020-01-01T00:00:00Z'})
+    def test_companies_modified_during_the_sync_are_not_skipped(self, mocked_load_schema, mocked_request):
+        """
+            Verify that a company modified while the search is paged doesn't
+            shift the companies after it out of the next page
+        """
+        results = list(SEARCH_RESULTS)
+        search = MockSearch(results)
+
+        def modify_first_company(url, body):
+            response = search(url, body)
+            if results[0]["id"] == "1":
+                results.append(dict(results.pop(0), properties={"hs_lastmodifieddate": "2023-11-14T22:13:23Z"}))
+            return response
+
+        self.sync(modify_first_company)
+
+        self.assertEqual([record["companyId"] for record in self.written_records], [1, 3, 5, 1])
+
+    @patch.dict('tap_hubspot.default_company_params')
+    @patch('tap_hubspot.request', side_effect=mock_request)
+    @patch('tap_hubspot.load_schema', return_value=COMPANIES_SCHEMA)
+    @patch('tap_hubspot.CRM_SEARCH_LIMIT', 2)
+    @patch('tap_hubspot.CONFIG', {'start_date': '2020-01-01T00:00:00Z'})
+    def test_companies_modified_in_the_same_millisecond_are_paged(self, mocked_load_schema, mocked_request):
+        """
+            Verify that `after` is followed when a whole page was modified at the
+            last modification time seen
+        """
+        results = [{"id": str(company_id), "properties": {"hs_lastmodifieddate": "2023-11-14T22:13:20Z"}}
+                   for company_id in [1, 3, 4]] + SEARCH_RESULTS[2:]
+
+        _, mocked_post = self.sync(MockSearch(results))
+
+        self.assertEqual([record["companyId"] for record in self.written_records], [1, 3, 4, 5])
+        self.assertEqual([call[0][1].get("after") for call in mocked_post.call_args_list], [None, None, "2"])
+
+    @patch.dict('tap_hubspot.default_company_params', {'limit': 2})
+    @patch('tap_hubspot.request', side_effect=mock_request)
+    @patch('tap_hubspot.load_schema', return_value=COMPANIES_SCHEMA)
+    @patch('tap_hubspot.CONFIG', {'start_date': '2020-01-01T00:00:00Z'})
+    def test_interrupted_search_is_resumed_by_searching(self, mocked_load_schema, mocked_request):
+        """
+            Verify that the contacts_by_company batches of a search don't leave a company id
+            offset behind, so that the resumed sync searches again instead of resuming the
+            full scan from an id out of the search order
+        """
+        results = [{"id": company_id, "properties": {"hs_lastmodifieddate": modified}}
+                   for company_id, modified in (("5", "2023-11-14T22:13:20Z"), ("1", "2023-11-14T22:13:21Z"),
+                                                ("3", "2023-11-14T22:13:22Z"))]
+        search = MockSearch(results)
+        batch_reads = []
+
+        def post(url, body, interrupt):
+            if url != tap_hubspot.get_url("contacts_by_company_v3"):
+                return search(url, body)
+            batch_reads.append([company["id"] for company in body["inputs"]])
+            if interrupt and len(batch_reads) > 1:
+                raise RuntimeError("interrupted")
+            return MockResponse({"results": []})
+
+        context = MockContext()
+        context.selected_stream_ids = ["companies", "contacts_by_company"]
+        with patch('tap_hubspot.post_search_endpoint', side_effect=lambda url, body: post(url, body, True)), \
+             patch('singer.write_record'), \
+             patch('singer.write_state'), \
+             self.assertRaises(RuntimeError):
+            sync_companies(self.state, context)
+
+        self.assertIsNone(singer.get_offset(self.state, "contacts_by_company"))
+
+        with patch('tap_hubspot.post_search_endpoint', side_effect=lambda url, body: post(url, body, False)), \
+             patch('singer.write_record',
+                   side_effect=lambda stream, record, *args, **kwargs: self.written_records.append(record)), \
+             patch('singer.write_state'):
+            state = sync_companies(self.state, context)
+
+        self.assertEqual([record["companyId"] for record in self.written_records
+                          if "companyId" in record], [5, 1, 3])
+        self.assertEqual(batch_reads[2:], [[5, 1], [3]])
+        self.assertNotIn(tap_hubspot.get_url("companies_all"), [call[0][0] for call in mocked_request.call_args_list])
+        self.assertEqual(singer.get_bookmark(state, "companies", "property_hs_lastmodifieddate"),
+                         "2023-11-14T22:13:22.000000Z")
+
+    @patch.dict('tap_hubspot.default_company_params')
+    @patch('tap_hubspot.request', side_effect=mock_request)
+    @patch('tap_hubspot.load_schema', return_value=COMPANIES_SCHEMA)
+    @patch('tap_hubspot.CONFIG', {'start_date': '2020-01-01T00:00:00Z'})
+    def test_too_many_modified_companies_fall_back_to_full_scan(self, mocked_load_schema, mocked_request):
+        """
+            Verify that all companies are scanned when more were modified than the search can return
+        """
+        self.sync(lambda url, body: MockResponse({"total": 10000, "results": []}))
+
+        self.assertEqual([record["companyId"] for record in self.written_records], [1, 3, 4, 5])
+        self.assertIn(tap_hubspot.get_url("companies_all"), [call[0][0] for call in mocked_request.call_args_list])
+
+    @patch('tap_hubspot.post_search_endpoint', return_value=MockResponse({"results": []}))
+    def test_search_body_stays_within_the_search_limits(self, mocked_post):
+        """
+            Verify that the search asks for at most 200 companies, oldest modified first
+        """
+        tap_hubspot.search_modified_companies(1672531200000, "200")
+
+        body = mocked_post.call_args[0][1]
+        self.assertEqual(body["limit"], 200)
+        self.assertEqual(body["after"], "200")
+        self.assertEqual(body["sorts"], [{"propertyName": "hs_lastmodifieddate", "direction": "ASCENDING"}])
+        self.assertEqual(body["filterGroups"][0]["filters"],
+                         [{"propertyName": "hs_lastmodifieddate", "operator": "GTE", "value": "1672531200000"}])
+
+    @patch('tap_hubspot.PORTAL_ID', None)
+    @patch('tap_hubspot.request', side_effect=mock_request)
+    def test_search_result_has_the_companies_all_layout(self, mocked_request):
+        """
+            Verify that a company found by the search is reshaped like a companies_all
+            row, with the portal id of the account
+        """
+        row = tap_hubspot.search_result_to_company_row(SEARCH_RESULTS[0])
+
+        self.assertEqual(row, {"portalId": 62515, "companyId": 1, "isDeleted": False,
+                               "properties": {"hs_lastmodifieddate": {"value": "1700000000000",
+                                                                      "timestamp": 1700000000000}}})
+
+    @patch('tap_hubspot.PORTAL_ID', None)
+    @patch('tap_hubspot.request', return_value=MockResponse({"message": "no portal"}))
+    def test_missing_portal_id_is_an_error(self, mocked_request):
+        """
+            Verify that the portal id isn't left empty when the account details don't have one
+        """
+        with self.assertRaises(RuntimeError):
+            tap_hubspot.get_portal_id()
+        mocked_request.assert_called_once_with(tap_hubspot.get_url("account_details"))
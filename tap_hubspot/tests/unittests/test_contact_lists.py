@@ -1,3 +1,4 @@
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timezone
@@ -1175,5 +1176,81 @@ class TestSyncContactListsStartUpdate(unittest.TestCase):
             singer.write_bookmark = original_write_bookmark
 
 
+class MembershipsContext(MockContext):
+    def get_catalog_from_id(self, stream_name):
+        if stream_name != "list_memberships":
+            return super().get_catalog_from_id(stream_name)
+        return {
+            "stream": "list_memberships",
+            "tap_stream_id": "list_memberships",
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "listId": {"type": ["null", "string"]},
+                    "recordId": {"type": ["null", "string"]},
+                    "membershipTimestamp": {"type": ["null", "string"], "format": "date-time"},
+                }
+            },
+            "metadata": []
+        }
+
+
+class TestSyncContactListsConcurrentMemberships(unittest.TestCase):
+    """
+    Tests for list_memberships extracted on the worker pool.
+    """
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config, start_date="2020-01-01T00:00:00Z",
+                                  list_memberships_workers=3)
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    @patch('tap_hubspot.get_v3_records')
+    @patch('tap_hubspot.post_search_endpoint')
+    @patch('tap_hubspot.load_schema')
+    @patch('tap_hubspot.utils.now')
+    def test_memberships_of_lists_are_written_concurrently(self, mock_now, mock_load_schema, mock_post, mock_get_v3_records):
+        """
+        The memberships of every list are written from the worker pool and the
+        list_memberships bookmark is the highest value over all lists.
+        """
+        mock_now.return_value = datetime(2024, 6, 1, 0, 0, 0, tzinfo=timezone.utc)
+        mock_post.return_value = MockResponse(make_api_response(
+            [make_list_record(list_id, "2024-05-01T00:00:00Z") for list_id in (1, 2, 3)], has_more=False))
+
+        all_lists_started = threading.Barrier(3, timeout=5)
+        membership_timestamps = {"/1/": "2024-02-01T00:00:00Z", "/2/": "2024-04-01T00:00:00Z",
+                                 "/3/": "2024-03-01T00:00:00Z"}
+
+        def get_memberships(url, params, path, more_key):
+            # Every list must be in progress at the same time
+            all_lists_started.wait()
+            timestamp = [value for key, value in membership_timestamps.items() if key in url][0]
+            return [{"recordId": url, "membershipTimestamp": timestamp}]
+
+        mock_get_v3_records.side_effect = get_memberships
+
+        STATE = {
+            "currently_syncing": "contact_lists",
+            "bookmarks": {"contact_lists": {"updatedAt": "2024-01-01T00:00:00.000000Z"},
+                          "list_memberships": {"membershipTimestamp": "2024-01-01T00:00:00.000000Z"}}
+        }
+        ctx = MembershipsContext(selected_stream_ids=["contact_lists", "list_memberships"])
+
+        written_records = []
+        with patch('singer.write_record', side_effect=lambda stream, record, *args, **kwargs: written_records.append((stream, record))), \
+             patch('singer.write_schema'), \
+             patch('singer.write_state'):
+            result_state = sync_contact_lists(STATE, ctx)
+
+        memberships = [record for stream, record in written_records if stream == "list_memberships"]
+        self.assertEqual(sorted(record["listId"] for record in memberships), ["1", "2", "3"])
+        self.assertEqual(singer.get_bookmark(result_state, 'list_memberships', 'membershipTimestamp'),
+                         "2024-04-01T00:00:00.000000Z")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,9 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
-from tap_hubspot import generate_custom_streams, Stream, sync_custom_object_records, Context
+from tap_hubspot import (generate_custom_streams, Stream, sync_custom_object_records, Context, DiscoveryCache,
+                         SourceUnavailableException)
 
 MOCK_CATALOG = {
     "streams": [
@@ -48,7 +51,7 @@ class TestGenerateCustomStreams(unittest.TestCase):
     @patch("tap_hubspot.sync_custom_object_records")
     @patch("tap_hubspot.get_url", return_value="fake_custom_objects_schema_url")
     @patch("tap_hubspot.load_shared_schema_refs", return_value="fake_refs")
-    @patch("tap_hubspot.gen_request_custom_objects")
+    @patch("tap_hubspot.gen_custom_objects")
     @patch("tap_hubspot.utils.load_json")
     @patch("tap_hubspot.parse_custom_schema")
     @patch("tap_hubspot.singer.resolve_schema_references")
@@ -128,7 +131,24 @@ class TestGenerateCustomStreams(unittest.TestCase):
         mock_warning.assert_not_called()  # No warning should be issued in this case
         self.assertEqual(actual_value, expected_value)
 
-    @patch("tap_hubspot.gen_request_custom_objects")
+    @patch("tap_hubspot.CONFIG", {"access_token": "token", "api_key": None})
+    @patch("tap_hubspot.load_shared_schema_refs", return_value={})
+    @patch("tap_hubspot.LOGGER.warning")
+    def test_unavailable_custom_objects_are_not_cached(self, mock_warning, mock_load_shared_schema_refs):
+        """
+        test that custom objects which can't be read are skipped without caching the empty result
+        """
+        with tempfile.TemporaryDirectory() as directory, \
+             patch("tap_hubspot.DISCOVERY_CACHE", DiscoveryCache()) as cache, \
+             patch("tap_hubspot.fetch_page", side_effect=SourceUnavailableException("403 for token")):
+            cache.configure(directory=directory, ttl=60)
+
+            self.assertEqual(generate_custom_streams("DISCOVER"), [])
+            self.assertFalse(os.path.exists(cache.get_path("custom_objects_schema")))
+
+        mock_warning.assert_called_once_with("403 for " + 10 * "*")
+
+    @patch("tap_hubspot.gen_request_custom_object_record_pages")
     @patch("tap_hubspot.get_start", return_value="2023-07-07T00:00:00Z")
     @patch("tap_hubspot.get_selected_property_fields", return_value="model")
     def test_sync_custom_objects(
@@ -142,13 +162,13 @@ class TestGenerateCustomStreams(unittest.TestCase):
         STATE = {"currently_syncing": "cars"}
         ctx = Context(MOCK_CATALOG)
         stream_id = "cars"
-        mock_custom_objects.return_value = [
+        mock_custom_objects.return_value = [[
             {
                 "id": "11111",
                 "properties": {"model": "Frontier"},
                 "updatedAt": "2023-11-09T13:14:22.956Z",
             }
-        ]
+        ]]
         expected_output = {
             "currently_syncing": "cars",
             "bookmarks": {"cars": {"updatedAt": "2023-11-09T13:14:22.956000Z"}},
@@ -0,0 +1,40 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import tap_hubspot
+from tap_hubspot import SourceUnavailableException, discover_schemas
+
+
+class TestParallelDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config, api_key='dummy_key', discovery_workers=4)
+        self.threads = set()
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def load_discovered_schema(self, stream):
+        self.threads.add(threading.current_thread().name)
+        if stream.tap_stream_id == 'owners':
+            raise SourceUnavailableException('missing scope for dummy_key')
+        # Finish the first streams last so that the order has to be restored
+        index = [s.tap_stream_id for s in tap_hubspot.STREAMS].index(stream.tap_stream_id)
+        time.sleep(0.002 * (len(tap_hubspot.STREAMS) - index))
+        return {'type': 'object'}, []
+
+    @mock.patch('tap_hubspot.generate_custom_streams', return_value=[])
+    def test_catalog_keeps_the_stream_order(self, mocked_custom_streams):
+        """
+            Verify that the schemas are loaded on several threads, the catalog follows
+            the order of STREAMS and streams with missing scopes are skipped
+        """
+        with mock.patch('tap_hubspot.load_discovered_schema', side_effect=self.load_discovered_schema):
+            catalog = discover_schemas()
+
+        expected = [stream.tap_stream_id for stream in tap_hubspot.STREAMS if stream.tap_stream_id != 'owners']
+        self.assertEqual([entry['tap_stream_id'] for entry in catalog['streams']], expected)
+        self.assertGreater(len(self.threads), 1)
@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import tap_hubspot
+from tap_hubspot import DiscoveryCache
+
+
+class TestDiscoveryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config, api_key='dummy_key', portal_id=None)
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = DiscoveryCache()
+        self.cache.configure(directory=self.directory.name, ttl=60)
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+        self.directory.cleanup()
+
+    def test_fresh_entries_are_reused(self):
+        """
+            Verify that a response is fetched once and then read from the cache
+        """
+        fetch = mock.Mock(return_value={'results': [{'name': 'prop'}]})
+
+        first = self.cache.get('deals_properties', fetch)
+        second = self.cache.get('deals_properties', fetch)
+
+        self.assertEqual(first, second)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_stale_entries_are_fetched_again(self):
+        """
+            Verify that an entry older than its TTL is fetched again
+        """
+        self.cache.get('deals_properties', lambda: {'results': []})
+        path = self.cache.get_path('deals_properties')
+        with open(path) as cache_file:
+            entry = json.load(cache_file)
+        entry['fetched_at'] = time.time() - 120
+        with open(path, 'w') as cache_file:
+            json.dump(entry, cache_file)
+
+        fetch = mock.Mock(return_value={'results': [{'name': 'new_prop'}]})
+        self.assertEqual(self.cache.get('deals_properties', fetch), {'results': [{'name': 'new_prop'}]})
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_entries_are_kept_per_portal(self):
+        """
+            Verify that portals are cached in separate directories and that credentials are not part of the path
+        """
+        self.cache.get('deals_properties', lambda: {'results': []})
+        tap_hubspot.CONFIG['portal_id'] = 12345
+        other_portal = DiscoveryCache()
+        other_portal.configure(directory=self.directory.name, ttl=60)
+        other_portal.get('deals_properties', lambda: {'results': []})
+
+        portals = sorted(os.listdir(self.directory.name))
+        self.assertEqual(len(portals), 2)
+        self.assertIn('12345', portals)
+        self.assertNotIn('dummy_key', portals)
+
+    def test_without_directory_nothing_is_cached(self):
+        """
+            Verify that every call is fetched when no cache directory is configured
+        """
+        cache = DiscoveryCache()
+        cache.configure(directory=None)
+        fetch = mock.Mock(return_value={'results': []})
+
+        cache.get('deals_properties', fetch)
+        cache.get('deals_properties', fetch)
+
+        self.assertEqual(fetch.call_count, 2)
@@ -0,0 +1,235 @@
+import datetime
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import singer
+import tap_hubspot
+from tap_hubspot import plan_chunk_windows, sync_entity_chunked
+
+DAY = tap_hubspot.DEFAULT_CHUNK_SIZE
+# A day and a half ago, so that the sync runs two windows of which the last ends now
+START_TS = (int(time.time()) - 36 * 60 * 60) * 1000
+START = singer.utils.strftime(datetime.datetime.fromtimestamp(START_TS / 1000, datetime.timezone.utc))
+
+EMAIL_EVENTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": ["null", "string"]},
+    }
+}
+
+CATALOG = {"stream_alias": None, "metadata": []}
+
+
+class MockResponse:
+    def __init__(self, json_data):
+        self.json_data = json_data
+
+    def json(self):
+        return self.json_data
+
+
+def to_timestamp(value):
+    return int(singer.utils.strptime_to_utc(value).timestamp() * 1000)
+
+
+class TestPlanChunkWindows(unittest.TestCase):
+
+    def test_windows_end_at_now(self):
+        """
+            Verify that the last window is cut off at the current time
+        """
+        windows = list(plan_chunk_windows({}, "email_events", START_TS, START_TS + 2 * DAY + 10, DAY))
+
+        self.assertEqual([(window["start"], window["end"]) for window in windows],
+                         [(START_TS, START_TS + DAY), (START_TS + DAY, START_TS + 2 * DAY),
+                          (START_TS + 2 * DAY, START_TS + 2 * DAY + 10)])
+
+    def test_saved_windows_are_reused(self):
+        """
+            Verify that windows recorded in the state keep their end, offset and completion
+        """
+        state = {"bookmarks": {"email_events": {"windows": {
+            str(START_TS): {"end": START_TS + DAY, "offset": "abc"},
+            str(START_TS + DAY): {"end": START_TS + 2 * DAY, "done": True}}}}}
+
+        windows = list(plan_chunk_windows(state, "email_events", START_TS, START_TS + 3 * DAY, DAY))
+
+        self.assertEqual(windows[0], {"start": START_TS, "end": START_TS + DAY, "offset": "abc"})
+        self.assertEqual(windows[1], {"start": START_TS + DAY, "end": START_TS + 2 * DAY, "done": True})
+        self.assertEqual(windows[2], {"start": START_TS + 2 * DAY, "end": START_TS + 3 * DAY})
+
+
+@patch("tap_hubspot.load_schema", return_value=EMAIL_EVENTS_SCHEMA)
+class TestConcurrentWindows(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config, start_date=START, window_workers=2,
+                                  email_chunk_size=DAY)
+        self.second_window_written = threading.Event()
+        self.written_records = []
+        self.written_states = []
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def mock_request(self, url, params=None):
+        window_start = params["startTimestamp"]
+        if window_start == START_TS:
+            if params.get("offset") is None:
+                return MockResponse({"events": [{"id": "1a"}], "hasMore": True, "offset": "next"})
+            # Let the second window finish before the first one does
+            self.second_window_written.wait(5)
+            return MockResponse({"events": [{"id": "1b"}], "hasMore": False})
+        return MockResponse({"events": [{"id": str(window_start)}], "hasMore": False})
+
+    def write_record(self, stream_name, record, *args, **kwargs):
+        self.written_records.append(record["id"])
+        if record["id"] == str(START_TS + DAY):
+            self.second_window_written.set()
+
+    def write_state(self, state):
+        windows = singer.get_bookmark(state, "email_events", "windows") or {}
+        self.written_states.append((singer.get_bookmark(state, "email_events", "startTimestamp"),
+                                    sorted(int(start) for start, window in windows.items() if window.get("done"))))
+
+    def sync(self, state):
+        with patch("tap_hubspot.request", side_effect=self.mock_request), \
+             patch("singer.write_record", side_effect=self.write_record), \
+             patch("singer.write_schema"), \
+             patch("singer.write_state", side_effect=self.write_state):
+            return sync_entity_chunked(state, CATALOG, "email_events", ["id"], "events")
+
+    def test_all_windows_are_synced(self, mocked_load_schema):
+        """
+            Verify that every page of every window is written and the bookmark ends at the last window
+        """
+        state = self.sync({})
+
+        self.assertEqual(sorted(self.written_records), sorted(["1a", "1b", str(START_TS + DAY)]))
+        self.assertGreaterEqual(to_timestamp(singer.get_bookmark(state, "email_events", "startTimestamp")),
+                                START_TS + DAY + DAY // 2)
+        self.assertNotIn("windows", state["bookmarks"]["email_events"])
+
+    def test_bookmark_waits_for_the_lowest_window(self, mocked_load_schema):
+        """
+            Verify that the bookmark does not move past an unfinished window even
+            when a later window has already completed
+        """
+        self.sync({})
+
+        # The second window completed first, which must not move the bookmark
+        second_window_done = self.written_states.index((None, [START_TS + DAY]))
+        self.assertTrue(all(bookmark is None for bookmark, _ in self.written_states[:second_window_done + 1]))
+        self.assertGreaterEqual(to_timestamp(self.written_states[-1][0]), START_TS + DAY + DAY // 2)
+
+    def test_only_windows_ahead_of_the_bookmark_are_saved(self, mocked_load_schema):
+        """
+            Verify that the windows are started a few at a time and the state only
+            records the ones after the bookmark
+        """
+        tap_hubspot.CONFIG["email_chunk_size"] = DAY // 8
+        saved_windows = []
+
+        def write_state(state):
+            saved_windows.append(len(singer.get_bookmark(state, "email_events", "windows") or {}))
+
+        with patch("tap_hubspot.request",
+                   side_effect=lambda url, params: MockResponse({"events": [{"id": str(params["startTimestamp"])}],
+                                                                 "hasMore": False})), \
+             patch("singer.write_record", side_effect=self.write_record), \
+             patch("singer.write_schema"), \
+             patch("singer.write_state", side_effect=write_state):
+            state = sync_entity_chunked({}, CATALOG, "email_events", ["id"], "events")
+
+        # A day and a half of three hour windows, plus the milliseconds since START_TS
+        self.assertGreaterEqual(len(self.written_records), 12)
+        self.assertLessEqual(max(saved_windows), 4)
+        self.assertNotIn("windows", state["bookmarks"]["email_events"])
+
+    def test_completed_windows_are_resumed(self, mocked_load_schema):
+        """
+            Verify that windows completed by an interrupted run are skipped and the
+            bookmark moves over them
+        """
+        state = {"bookmarks": {"email_events": {"startTimestamp": START, "windows": {
+            str(START_TS): {"end": START_TS + DAY, "done": True}}}}}
+
+        state = self.sync(state)
+
+        self.assertEqual(self.written_records, [str(START_TS + DAY)])
+        self.assertGreaterEqual(to_timestamp(singer.get_bookmark(state, "email_events", "startTimestamp")),
+                                START_TS + DAY + DAY // 2)
+
+
+class TestAdaptiveWindows(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config, start_date=START, email_chunk_size=DAY,
+                                  adaptive_chunk_size='true', chunk_target_records=10)
+        self.requested_windows = []
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def mock_request(self, url, params=None):
+        self.requested_windows.append((params["startTimestamp"], params["endTimestamp"], params.get("offset")))
+        return MockResponse({"events": [], "hasMore": False})
+
+    def sync(self, state):
+        with patch("tap_hubspot.load_schema", return_value=EMAIL_EVENTS_SCHEMA), \
+             patch("tap_hubspot.request", side_effect=self.mock_request), \
+             patch("singer.write_schema"), \
+             patch("singer.write_state"):
+            return sync_entity_chunked(state, CATALOG, "email_events", ["id"], "events")
+
+    def test_window_grows_while_sparse(self):
+        """
+            Verify that the window doubles after an empty window and the size is kept in the state
+        """
+        state = self.sync({})
+
+        self.assertEqual(self.requested_windows, [(START_TS, START_TS + DAY, None),
+                                                  (START_TS + DAY, START_TS + 3 * DAY, None)])
+        self.assertEqual(singer.get_bookmark(state, "email_events", "window_size"), 4 * DAY)
+        self.assertNotIn("window", state["bookmarks"]["email_events"])
+
+    def test_interrupted_window_is_resumed_exactly(self):
+        """
+            Verify that the window in progress is resumed with its recorded boundaries and offset
+        """
+        state = {"bookmarks": {"email_events": {
+            "startTimestamp": START,
+            "window": {"start": START_TS + 3600000, "end": START_TS + 7200000},
+            "offset": {"offset": "abc"}}}}
+
+        self.sync(state)
+
+        self.assertEqual(self.requested_windows[0], (START_TS + 3600000, START_TS + 7200000, "abc"))
+        self.assertEqual(self.requested_windows[1][0], START_TS + 7200000)
+
+    def test_concurrent_windows_are_rejected(self):
+        """
+            Verify that adaptive sizing with concurrent windows is an error rather than silently ignored
+        """
+        tap_hubspot.CONFIG.update({'window_workers': 2})
+
+        with self.assertRaisesRegex(ValueError, "adaptive_chunk_size"):
+            self.sync({})
+        self.assertEqual(self.requested_windows, [])
+
+    def test_next_window_size(self):
+        """
+            Verify that the window grows when sparse, shrinks when dense and stays within the bounds
+        """
+        tap_hubspot.CONFIG.update({'min_chunk_size': DAY // 4, 'max_chunk_size': 2 * DAY})
+
+        self.assertEqual(tap_hubspot.get_next_window_size(DAY, 0), 2 * DAY)
+        self.assertEqual(tap_hubspot.get_next_window_size(DAY, 10), DAY)
+        self.assertEqual(tap_hubspot.get_next_window_size(DAY, 100), DAY // 2)
+        self.assertEqual(tap_hubspot.get_next_window_size(2 * DAY, 0), 2 * DAY)
+        self.assertEqual(tap_hubspot.get_next_window_size(DAY // 4, 100), DAY // 4)
@@ -0,0 +1,92 @@
+import threading
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import singer
+import tap_hubspot
+from tap_hubspot import sync_forms
+
+
+class MockResponse:
+    def __init__(self, json_data):
+        self.json_data = json_data
+
+    def json(self):
+        return self.json_data
+
+
+class MockContext:
+    selected_stream_ids = ["forms", "form_submissions"]
+
+    def get_catalog_from_id(self, stream_name):
+        return {"stream": stream_name, "tap_stream_id": stream_name, "metadata": []}
+
+
+FORMS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "guid": {"type": ["null", "string"]},
+        "updatedAt": {"type": ["null", "string"], "format": "date-time"},
+        "conversionId": {"type": ["null", "string"]},
+        "submittedAt": {"type": ["null", "string"], "format": "date-time"},
+    }
+}
+
+SUBMITTED_AT = {"form-1": "2024-02-01T00:00:00Z", "form-2": "2024-04-01T00:00:00Z",
+                "form-3": "2024-03-01T00:00:00Z"}
+
+
+@patch("tap_hubspot.utils.now", return_value=datetime(2024, 6, 1, tzinfo=timezone.utc))
+@patch("tap_hubspot.load_schema", return_value=FORMS_SCHEMA)
+@patch("tap_hubspot.request", return_value=MockResponse(
+    [{"guid": form_id, "updatedAt": 1704067200000} for form_id in SUBMITTED_AT]))
+class TestConcurrentFormSubmissions(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config, start_date="2020-01-01T00:00:00Z",
+                                  form_submissions_workers=3)
+        self.written_records = []
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def sync(self, get_submissions):
+        state = {"currently_syncing": "forms", "bookmarks": {}}
+        with patch("tap_hubspot.get_v3_records", side_effect=get_submissions), \
+             patch("singer.write_record", side_effect=lambda stream, record, *args, **kwargs: self.written_records.append((stream, record))), \
+             patch("singer.write_schema"), \
+             patch("singer.write_state"):
+            return sync_forms(state, MockContext())
+
+    def test_submissions_of_forms_are_written_concurrently(self, mocked_request, mocked_load_schema, mocked_now):
+        """
+            Verify that the submissions of every form are paginated at the same
+            time and the form_submissions bookmark is the highest value over all forms
+        """
+        all_forms_started = threading.Barrier(3, timeout=5)
+
+        def get_submissions(url, params, path, more_key):
+            all_forms_started.wait()
+            form_id = [form_id for form_id in SUBMITTED_AT if form_id in url][0]
+            return [{"conversionId": form_id, "submittedAt": SUBMITTED_AT[form_id]}]
+
+        state = self.sync(get_submissions)
+
+        submissions = [record for stream, record in self.written_records if stream == "form_submissions"]
+        self.assertEqual(sorted(record["formId"] for record in submissions), ["form-1", "form-2", "form-3"])
+        self.assertEqual(singer.get_bookmark(state, "form_submissions", "submittedAt"),
+                         "2024-04-01T00:00:00.000000Z")
+
+    def test_worker_errors_fail_the_sync(self, mocked_request, mocked_load_schema, mocked_now):
+        """
+            Verify that an error while paginating the submissions of a form is raised
+        """
+        def get_submissions(url, params, path, more_key):
+            if "form-2" in url:
+                raise RuntimeError("form-2 failed")
+            return []
+
+        with self.assertRaises(RuntimeError):
+            self.sync(get_submissions)
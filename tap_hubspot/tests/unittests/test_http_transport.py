@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+
+import tap_hubspot
+
+
+class MockResponse:
+    def __init__(self, json_data, status_code=200):
+        self.json_data = json_data
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.json_data
+
+    def raise_for_status(self):
+        pass
+
+
+@mock.patch('requests.Session.send', return_value=MockResponse({'results': []}))
+class TestHttpTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = {'hapikey': None, 'api_key': 'dummy_key'}
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def test_get_and_post_share_the_session(self, mocked_send):
+        """
+            Verify that GET requests and POST search requests are sent through the shared session
+        """
+        tap_hubspot.request('https://api.hubapi.com/dummy')
+        tap_hubspot.post_search_endpoint('https://api.hubapi.com/dummy', {'inputs': []})
+
+        methods = [call[0][0].method for call in mocked_send.call_args_list]
+        self.assertEqual(methods, ['GET', 'POST'])
+
+    def test_token_refresh_uses_the_session(self, mocked_send):
+        """
+            Verify that the OAuth token refresh is sent through the shared session
+        """
+        mocked_send.return_value = MockResponse({'access_token': 'token',
+                                                 'refresh_token': 'refresh',
+                                                 'expires_in': 1800})
+        tap_hubspot.CONFIG.update({'api_key': None,
+                                   'redirect_uri': 'https://example.com',
+                                   'refresh_token': 'dummy_refresh',
+                                   'client_id': 'dummy_client',
+                                   'client_secret': 'dummy_secret'})
+
+        tap_hubspot.acquire_access_token_from_refresh_token()
+
+        self.assertEqual(mocked_send.call_count, 1)
+        self.assertEqual(mocked_send.call_args[0][0].method, 'POST')
+        self.assertEqual(tap_hubspot.CONFIG['access_token'], 'token')
+
+    def test_requests_are_counted(self, mocked_send):
+        """
+            Verify that the transport counts the requests it sends
+        """
+        transport = tap_hubspot.HttpTransport()
+        transport.send('GET', 'https://api.hubapi.com/dummy', timeout=10)
+        transport.send('GET', 'https://api.hubapi.com/dummy', timeout=10)
+
+        self.assertEqual(transport.get_stats()['requests'], 2)
+
+    def test_configure_sets_pool_size_and_keep_alive(self, mocked_send):
+        """
+            Verify that the pool size and keep-alive settings are taken from the config
+        """
+        tap_hubspot.CONFIG.update({'http_pool_size': '25', 'http_keep_alive': 'false'})
+        transport = tap_hubspot.HttpTransport()
+        with mock.patch('tap_hubspot.TRANSPORT', transport):
+            tap_hubspot.configure_transport()
+
+        transport.send('GET', 'https://api.hubapi.com/dummy', timeout=10)
+
+        adapter = transport.session.get_adapter('https://api.hubapi.com')
+        self.assertEqual(adapter._pool_maxsize, 25)
+        self.assertEqual(mocked_send.call_args[0][0].headers['Connection'], 'close')
+
+    @mock.patch.dict('os.environ', {'HTTPS_PROXY': 'http://proxy.example.com:3128'})
+    def test_environment_settings_are_applied(self, mocked_send):
+        """
+            Verify that the proxy settings of the environment apply to the requests sent
+        """
+        transport = tap_hubspot.HttpTransport()
+        transport.send('POST', 'https://api.hubapi.com/dummy', timeout=10, json={'inputs': []})
+
+        self.assertEqual(mocked_send.call_args[1]['proxies'].get('https'), 'http://proxy.example.com:3128')
+        self.assertEqual(mocked_send.call_args[1]['timeout'], 10)
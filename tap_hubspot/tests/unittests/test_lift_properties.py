@@ -0,0 +1,76 @@
+import copy
+import unittest
+
+from tap_hubspot import (CompiledTransformer, get_property_keys, get_selected_fields,
+                         lift_properties_and_versions)
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "dealId": {"type": ["null", "integer"]},
+        "properties": {"type": ["null", "object"], "properties": {}},
+        "property_dealname": {"type": ["null", "object"], "properties": {"value": {"type": ["null", "string"]}}},
+        "property_amount": {"type": ["null", "object"], "properties": {"value": {"type": ["null", "string"]}}},
+        "property_hs_lastmodifieddate": {"type": ["null", "object"],
+                                         "properties": {"value": {"type": ["null", "string"]}}},
+        "properties_versions": {"type": ["null", "array"],
+                                "items": {"type": "object", "properties": {"value": {"type": ["null", "string"]}}}},
+    },
+}
+
+RECORD = {
+    "dealId": 1,
+    "properties": {
+        "dealname": {"value": "Deal", "versions": [{"value": "Deal"}]},
+        "amount": {"value": "10", "versions": [{"value": "10"}, {"value": "5"}]},
+        "hs_lastmodifieddate": {"value": "1614556800000"},
+        "not_in_schema": {"value": "x", "versions": [{"value": "x"}]},
+    },
+}
+
+
+def get_mdata(*unselected):
+    mdata = {(): {"selected": True}}
+    for field in SCHEMA["properties"]:
+        mdata[("properties", field)] = {"inclusion": "available", "selected": field not in unselected}
+    mdata[("properties", "property_hs_lastmodifieddate")] = {"inclusion": "automatic"}
+    return mdata
+
+
+class TestLiftPropertiesAndVersions(unittest.TestCase):
+
+    def test_without_selection_every_property_is_lifted(self):
+        """
+            Verify that by default every property is lifted and every version collected
+        """
+        record = lift_properties_and_versions(copy.deepcopy(RECORD))
+
+        self.assertEqual(record["property_not_in_schema"], {"value": "x", "versions": [{"value": "x"}]})
+        self.assertEqual(len(record["properties_versions"]), 4)
+
+    def test_only_selected_properties_are_lifted(self):
+        """
+            Verify that unselected properties aren't lifted, automatic ones are,
+            and versions aren't collected when properties_versions isn't selected
+        """
+        selected_fields = get_selected_fields(SCHEMA, get_mdata("property_amount", "properties_versions"))
+
+        record = lift_properties_and_versions(copy.deepcopy(RECORD), selected_fields)
+
+        self.assertEqual(sorted(key for key in record if key.startswith("propert")),
+                         ["properties", "property_dealname", "property_hs_lastmodifieddate"])
+
+    def test_transformed_records_are_unchanged(self):
+        """
+            Verify that the transformed records are the same as with every property lifted
+        """
+        for mdata in [get_mdata(), get_mdata("property_amount"), get_mdata("properties_versions", "dealId"), {}]:
+            selected_fields = get_selected_fields(SCHEMA, mdata)
+            property_keys = get_property_keys(selected_fields)
+            transformer = CompiledTransformer()
+
+            expected = transformer.transform(lift_properties_and_versions(copy.deepcopy(RECORD)), SCHEMA, mdata)
+            actual = transformer.transform(lift_properties_and_versions(copy.deepcopy(RECORD), selected_fields,
+                                                                        property_keys), SCHEMA, mdata)
+
+            self.assertEqual(actual, expected)
@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+
+import tap_hubspot
+
+
+class MockResponse:
+    def __init__(self, headers, status_code=200):
+        self.headers = headers
+        self.status_code = status_code
+
+
+def rate_limit_headers(remaining, maximum=100, interval_millis=10000):
+    return {'X-HubSpot-RateLimit-Max': str(maximum),
+            'X-HubSpot-RateLimit-Remaining': str(remaining),
+            'X-HubSpot-RateLimit-Interval-Milliseconds': str(interval_millis),
+            'X-HubSpot-RateLimit-Daily': '500000',
+            'X-HubSpot-RateLimit-Daily-Remaining': '499000'}
+
+
+@mock.patch('time.monotonic', return_value=1000.0)
+@mock.patch('time.sleep')
+class TestRateLimitGovernor(unittest.TestCase):
+
+    def test_no_wait_without_rate_limit_headers(self, mocked_sleep, mocked_monotonic):
+        """
+            Verify that requests are not paced before any rate-limit headers are seen
+        """
+        governor = tap_hubspot.RateLimitGovernor()
+        governor.acquire()
+
+        mocked_sleep.assert_not_called()
+
+    def test_no_wait_while_tokens_remain(self, mocked_sleep, mocked_monotonic):
+        """
+            Verify that requests are not paced while the interval still has remaining requests
+        """
+        governor = tap_hubspot.RateLimitGovernor()
+        governor.observe(MockResponse(rate_limit_headers(remaining=50)))
+        governor.acquire()
+
+        mocked_sleep.assert_not_called()
+
+    def test_waits_for_refill_when_exhausted(self, mocked_sleep, mocked_monotonic):
+        """
+            Verify that a request waits for one token to refill once the interval is exhausted
+        """
+        governor = tap_hubspot.RateLimitGovernor()
+        governor.observe(MockResponse(rate_limit_headers(remaining=0)))
+        governor.acquire()
+
+        # 100 requests per 10 seconds refill one token every 0.1 seconds
+        mocked_sleep.assert_called_once()
+        self.assertAlmostEqual(mocked_sleep.call_args[0][0], 0.1)
+
+    def test_retry_after_is_honored(self, mocked_sleep, mocked_monotonic):
+        """
+            Verify that the next request waits for the `Retry-After` of a 429 response
+        """
+        governor = tap_hubspot.RateLimitGovernor()
+        governor.observe(MockResponse({'Retry-After': '7'}, status_code=429))
+        governor.acquire()
+
+        self.assertAlmostEqual(mocked_sleep.call_args[0][0], 7)
+
+    def test_disabled_governor_does_not_wait(self, mocked_sleep, mocked_monotonic):
+        """
+            Verify that a disabled governor never paces requests
+        """
+        governor = tap_hubspot.RateLimitGovernor()
+        governor.observe(MockResponse(rate_limit_headers(remaining=0)))
+        governor.configure(enabled=False)
+        governor.acquire()
+
+        mocked_sleep.assert_not_called()
+
+    def test_state_exposes_bucket(self, mocked_sleep, mocked_monotonic):
+        """
+            Verify that the token bucket state and daily limits are exposed
+        """
+        governor = tap_hubspot.RateLimitGovernor()
+        governor.observe(MockResponse(rate_limit_headers(remaining=40)))
+
+        state = governor.get_state()
+
+        self.assertEqual(state['buckets']['interval'],
+                         {'capacity': 100, 'tokens': 40.0, 'refill_per_second': 10.0})
+        self.assertEqual(state['daily_remaining'], 499000)
+        self.assertEqual(state['daily_limit'], 500000)
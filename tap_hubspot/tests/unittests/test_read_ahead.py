@@ -0,0 +1,119 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+import tap_hubspot
+from tap_hubspot import ReadAhead
+
+
+class TestReadAhead(unittest.TestCase):
+
+    def test_next_page_is_fetched_while_current_page_is_processed(self):
+        """
+            Verify that the next page is fetched before the consumer is done with the current page
+        """
+        second_page_fetched = threading.Event()
+
+        def pages():
+            yield 'page 1', 10
+            second_page_fetched.set()
+            yield 'page 2', 10
+
+        reader = iter(ReadAhead(pages(), depth=1, max_bytes=100))
+        self.assertEqual(next(reader), 'page 1')
+        self.assertTrue(second_page_fetched.wait(timeout=5))
+        self.assertEqual(list(reader), ['page 2'])
+
+    def test_depth_bounds_buffered_pages(self):
+        """
+            Verify that no more than `depth` pages are fetched ahead of the consumer
+        """
+        fetched = []
+
+        def pages():
+            for page in range(10):
+                fetched.append(page)
+                yield page, 1
+
+        reader = ReadAhead(pages(), depth=2, max_bytes=100)
+        consumed = []
+        for page in reader:
+            consumed.append(page)
+            # Only the page being processed and 2 pages ahead of it, buffered
+            # or being fetched, may be fetched
+            self.assertLessEqual(len(fetched), len(consumed) + 2)
+        self.assertEqual(consumed, list(range(10)))
+
+    def test_stopping_early_joins_the_producer(self):
+        """
+            Verify that closing the reader before the last page stops the producer
+            waiting for room and closes the page generator
+        """
+        closed = threading.Event()
+
+        def pages():
+            try:
+                for page in range(10):
+                    yield page, 1
+            finally:
+                closed.set()
+
+        with ReadAhead(pages(), depth=2, max_bytes=100) as reader:
+            for page in reader:
+                break
+
+        self.assertFalse(reader._producer.is_alive())
+        self.assertTrue(closed.is_set())
+
+    def test_closing_an_unread_reader_closes_the_pages(self):
+        """
+            Verify that a reader closed before it is read closes the page generator
+        """
+        def pages():
+            yield 'page 1', 10
+
+        page_generator = pages()
+        with ReadAhead(page_generator, depth=2, max_bytes=100):
+            pass
+
+        self.assertEqual(list(page_generator), [])
+
+    def test_max_bytes_bounds_buffered_pages(self):
+        """
+            Verify that pages are not buffered beyond `max_bytes`, except a single page
+        """
+        reader = ReadAhead(iter([]), depth=5, max_bytes=100)
+        self.assertTrue(reader._has_room(500))
+        reader._buffer.append(('page', 60))
+        reader._buffered_bytes = 60
+        self.assertTrue(reader._has_room(40))
+        self.assertFalse(reader._has_room(41))
+
+    def test_errors_are_raised_after_buffered_pages(self):
+        """
+            Verify that an error in the producer is raised to the consumer after the earlier pages
+        """
+        def pages():
+            yield 'page 1', 10
+            raise tap_hubspot.SourceUnavailableException('missing scope')
+
+        consumed = []
+        with self.assertRaises(tap_hubspot.SourceUnavailableException):
+            for page in ReadAhead(pages(), depth=1, max_bytes=100):
+                consumed.append(page)
+        self.assertEqual(consumed, ['page 1'])
+
+    def test_depth_zero_fetches_inline(self):
+        """
+            Verify that a depth of 0 does not start a background thread
+        """
+        with patch('threading.Thread') as mocked_thread:
+            pages = list(ReadAhead(iter([('page 1', 10), ('page 2', 10)]), depth=0))
+
+        self.assertEqual(pages, ['page 1', 'page 2'])
+        mocked_thread.assert_not_called()
+
+    @patch('tap_hubspot.CONFIG', {'read_ahead_depth': '3', 'read_ahead_max_bytes': '2048'})
+    def test_depth_and_max_bytes_from_config(self):
+        reader = ReadAhead(iter([]))
+        self.assertEqual((reader.depth, reader.max_bytes), (3, 2048))
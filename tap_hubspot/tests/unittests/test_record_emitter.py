@@ -0,0 +1,95 @@
+import contextlib
+import datetime
+import decimal
+import io
+import json
+import unittest
+
+import singer
+import tap_hubspot
+from tap_hubspot import RecordEmitter
+
+RECORD = {"id": 1, "property_name": {"value": "Björk", "timestamp": 1.5},
+          "amount": decimal.Decimal("10.10"), "tags": ["a", None, True]}
+TIME_EXTRACTED = datetime.datetime(2024, 1, 2, 3, 4, 5, 678, tzinfo=datetime.timezone.utc)
+
+
+def singer_output(*args, **kwargs):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        singer.write_record(*args, **kwargs)
+    return output.getvalue()
+
+
+class TestRecordEmitter(unittest.TestCase):
+
+    def test_output_matches_singer(self):
+        """
+            Verify that the emitter writes exactly what singer.write_record writes
+        """
+        emitter = RecordEmitter("contacts")
+
+        self.assertEqual(emitter.format_record(RECORD, TIME_EXTRACTED),
+                         singer_output("contacts", RECORD, time_extracted=TIME_EXTRACTED))
+        self.assertEqual(emitter.format_record(RECORD),
+                         singer_output("contacts", RECORD))
+
+    def test_time_extracted_is_formatted_when_it_changes(self):
+        """
+            Verify that a new time_extracted replaces the cached one
+        """
+        emitter = RecordEmitter("contacts")
+        later = TIME_EXTRACTED + datetime.timedelta(seconds=1)
+
+        emitter.format_record(RECORD, TIME_EXTRACTED)
+
+        self.assertEqual(emitter.format_record(RECORD, later),
+                         singer_output("contacts", RECORD, time_extracted=later))
+
+    def test_orjson_output_is_a_valid_record_message(self):
+        """
+            Verify that records encoded with orjson, or with the fallback for
+            values orjson can't encode, are valid RECORD messages
+        """
+        emitter = RecordEmitter("contacts", use_orjson=True)
+        record = {key: value for key, value in RECORD.items() if key != "amount"}
+
+        for message in (emitter.format_record(record, TIME_EXTRACTED),
+                        emitter.format_record(RECORD, TIME_EXTRACTED)):
+            parsed = json.loads(message)
+            self.assertEqual(parsed["type"], "RECORD")
+            self.assertEqual(parsed["stream"], "contacts")
+            self.assertEqual(parsed["record"]["property_name"]["value"], "Björk")
+            self.assertEqual(parsed["time_extracted"], "2024-01-02T03:04:05.000678Z")
+
+
+class TestMessageWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config)
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def test_fast_encoder_writes_stream_alias(self):
+        """
+            Verify that the writer emits through the emitter of the stream alias
+        """
+        tap_hubspot.CONFIG["record_encoder"] = "fast"
+        writer = tap_hubspot.MessageWriter()
+        output = io.StringIO()
+
+        with contextlib.redirect_stdout(output):
+            writer.write_record("contacts", RECORD, "hubspot_contacts", time_extracted=TIME_EXTRACTED)
+
+        self.assertEqual(output.getvalue(), singer_output("contacts", RECORD, "hubspot_contacts",
+                                                          time_extracted=TIME_EXTRACTED))
+
+    def test_default_writes_through_singer(self):
+        """
+            Verify that without record_encoder, records are written by singer.write_record
+        """
+        writer = tap_hubspot.MessageWriter()
+
+        self.assertIsNone(writer.get_emitter("contacts"))
@@ -78,14 +78,13 @@ class TestRequestTimeoutValue(unittest.TestCase):
 class TestRequestTimeoutBackoff(unittest.TestCase):
 
     @mock.patch('requests.Session.send', side_effect = requests.exceptions.Timeout)
-    @mock.patch("requests.Request.prepare")
     @mock.patch('tap_hubspot.get_params_and_headers', return_value = ({}, {}))
-    def test_request_timeout_backoff(self, mocked_get, mocked_prepare, mocked_send, mocked_sleep):
+    def test_request_timeout_backoff(self, mocked_get, mocked_send, mocked_sleep):
         """
             Verify request function is backoff for only 5 times on Timeout exception.
         """
         try:
-            tap_hubspot.request('dummy_url', {})
+            tap_hubspot.request('https://api.hubapi.com/dummy', {})
         except Exception:
             pass
 
@@ -93,20 +92,20 @@ class TestRequestTimeoutBackoff(unittest.TestCase):
         self.assertEqual(mocked_send.call_count, 5)
 
     @mock.patch('tap_hubspot.get_params_and_headers', return_value = ({}, {}))
-    @mock.patch('requests.post', side_effect = requests.exceptions.Timeout)
+    @mock.patch('requests.Session.send', side_effect = requests.exceptions.Timeout)
     def test_request_timeout_backoff_for_post_search_endpoint(self, mocked_post, mocked_get, mocked_sleep):
         """
             Verify post_search_endpoint function is backoff for only 5 times on Timeout exception.
         """
         try:
-            tap_hubspot.post_search_endpoint('dummy_url', {})
+            tap_hubspot.post_search_endpoint('https://api.hubapi.com/dummy', {})
         except Exception:
             pass
 
-        # Verify that requests.post is called 5 times
+        # Verify that Session.send is called 5 times
         self.assertEqual(mocked_post.call_count, 5)
 
-    @mock.patch('requests.post', side_effect = requests.exceptions.Timeout)
+    @mock.patch('requests.Session.send', side_effect = requests.exceptions.Timeout)
     def test_request_timeout_backoff_for_acquire_access_token_from_refresh_token(self, mocked_post, mocked_sleep):
         """
             Verify request function is backoff for only 5 times instead of 25 times on Timeout exception that thrown from `acquire_access_token_from_refresh_token` method.
@@ -131,5 +130,5 @@ class TestRequestTimeoutBackoff(unittest.TestCase):
             # Restore the original CONFIG after the test
             tap_hubspot.CONFIG = pre_config
 
-        # Verify that requests.post is called 5 times
+        # Verify that Session.send is called 5 times
         self.assertEqual(mocked_post.call_count, 5)
@@ -0,0 +1,86 @@
+import unittest
+from unittest import mock
+
+import requests
+
+import tap_hubspot
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(response=response)
+
+
+@mock.patch("time.sleep")
+@mock.patch("requests.Request.prepare")
+@mock.patch('tap_hubspot.get_params_and_headers', return_value=({}, {}))
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_policy = tap_hubspot.RETRY_POLICY
+        tap_hubspot.RETRY_POLICY = tap_hubspot.RetryPolicy()
+
+    def tearDown(self):
+        tap_hubspot.RETRY_POLICY = self.pre_policy
+
+    def test_bad_request_is_not_retried(self, mocked_get, mocked_prepare, mocked_sleep):
+        """
+            Verify that a deterministic 400 error gives up on the first try without sleeping
+        """
+        with mock.patch('requests.Session.send', side_effect=http_error(400)) as mocked_send:
+            with self.assertRaises(Exception):
+                tap_hubspot.request('https://api.hubapi.com/deals/v1/deal/paged', {})
+
+        self.assertEqual(mocked_send.call_count, 1)
+        mocked_sleep.assert_not_called()
+
+    def test_server_error_is_retried(self, mocked_get, mocked_prepare, mocked_sleep):
+        """
+            Verify that 5xx errors are retried up to max_tries and counted per endpoint
+        """
+        with mock.patch('requests.Session.send', side_effect=http_error(503)) as mocked_send:
+            with self.assertRaises(Exception):
+                tap_hubspot.post_search_endpoint('https://api.hubapi.com/crm/v3/lists/search', {})
+
+        self.assertEqual(mocked_send.call_count, 5)
+        self.assertEqual(tap_hubspot.RETRY_POLICY.retries_by_endpoint, {'contact_lists': 4})
+
+    def test_backoff_is_exponential_and_capped(self, mocked_get, mocked_prepare, mocked_sleep):
+        """
+            Verify that the wait between tries grows exponentially up to max_delay
+        """
+        tap_hubspot.RETRY_POLICY.configure(max_tries=6, base_delay=2, max_delay=10)
+        tap_hubspot.RETRY_POLICY.jitter = lambda value: value
+        with mock.patch('requests.Session.send', side_effect=requests.exceptions.ConnectionError):
+            with self.assertRaises(Exception):
+                tap_hubspot.request('https://api.hubapi.com/deals/v1/deal/paged', {})
+
+        waits = [call[0][0] for call in mocked_sleep.call_args_list]
+        self.assertEqual(waits, [2, 4, 8, 10, 10])
+
+    def test_retry_budget_is_honored(self, mocked_get, mocked_prepare, mocked_sleep):
+        """
+            Verify that no more retries are made once the per-run retry budget is used up
+        """
+        tap_hubspot.RETRY_POLICY.configure(budget=3)
+        with mock.patch('requests.Session.send', side_effect=requests.exceptions.Timeout) as mocked_send:
+            with self.assertRaises(Exception):
+                tap_hubspot.request('https://api.hubapi.com/deals/v1/deal/paged', {})
+            with self.assertRaises(Exception):
+                tap_hubspot.request('https://api.hubapi.com/deals/v1/deal/paged', {})
+
+        # 3 retries on the first call exhaust the budget, the second call is tried once
+        self.assertEqual(mocked_send.call_count, 5)
+        self.assertEqual(tap_hubspot.RETRY_POLICY.retries_by_endpoint, {'deals_all': 3})
+
+
+class TestGetEndpointName(unittest.TestCase):
+
+    def test_endpoint_with_path_parameter(self):
+        url = tap_hubspot.get_url("list_memberships", list_id=123)
+        self.assertEqual(tap_hubspot.get_endpoint_name(url), "list_memberships")
+
+    def test_unknown_url_returns_path(self):
+        url = tap_hubspot.BASE_URL + "/oauth/2026-03/token"
+        self.assertEqual(tap_hubspot.get_endpoint_name(url), "/oauth/2026-03/token")
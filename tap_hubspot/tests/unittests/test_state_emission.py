@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+import tap_hubspot
+from tap_hubspot import MessageWriter
+
+
+@mock.patch('singer.write_record')
+class TestStateEmission(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config)
+        self.writer = MessageWriter()
+        self.written_states = []
+        patcher = mock.patch('singer.write_state', side_effect=self.written_states.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def test_unchanged_state_is_not_written(self, mocked_write_record):
+        """
+            Verify that writing the same state twice only emits it once
+        """
+        state = {'bookmarks': {'deals': {'offset': {'offset': 1}}}}
+
+        self.writer.write_state(state)
+        self.writer.write_state(state)
+
+        self.assertEqual(self.written_states, [state])
+
+    def test_states_are_coalesced_by_record_count(self, mocked_write_record):
+        """
+            Verify that a state is held back until enough records were written,
+            and that the state written is the one at the time it was written
+        """
+        tap_hubspot.CONFIG['state_interval_records'] = 2
+        state = {'bookmarks': {'deals': {'offset': {'offset': 1}}}}
+
+        self.writer.write_record('deals', {'id': 1})
+        self.writer.write_state(state)
+        self.assertEqual(self.written_states, [])
+
+        state['bookmarks']['deals']['offset']['offset'] = 2
+        self.writer.write_record('deals', {'id': 2})
+        self.writer.write_state(state)
+        self.assertEqual(self.written_states, [{'bookmarks': {'deals': {'offset': {'offset': 2}}}}])
+
+        state['bookmarks']['deals']['offset']['offset'] = 3
+        self.writer.write_state(state)
+        state['bookmarks']['deals']['offset']['offset'] = 4
+        self.writer.flush_state()
+        self.assertEqual(self.written_states[-1], {'bookmarks': {'deals': {'offset': {'offset': 3}}}})
+
+    def test_forced_state_is_written(self, mocked_write_record):
+        """
+            Verify that a forced state is written even if it is not due yet
+        """
+        tap_hubspot.CONFIG['state_interval_seconds'] = 3600
+
+        self.writer.write_state({'currently_syncing': None}, force=True)
+
+        self.assertEqual(self.written_states, [{'currently_syncing': None}])
@@ -0,0 +1,70 @@
+import threading
+import unittest
+from unittest import mock
+
+import singer
+
+import tap_hubspot
+from tap_hubspot import Stream, StreamScheduler
+
+
+class TestStreamScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.both_running = threading.Barrier(2, timeout=5)
+        self.threads = {}
+        self.written_states = []
+
+    def make_sync(self, stream_ids, bookmark_value):
+        def sync(state, ctx):
+            self.threads[stream_ids[0]] = threading.current_thread()
+            self.both_running.wait()
+            for stream_id in stream_ids:
+                state = singer.write_bookmark(state, stream_id, 'updatedAt', bookmark_value)
+            tap_hubspot.WRITER.write_state(state)
+            return state
+        return sync
+
+    def run_scheduler(self, state):
+        streams = [
+            Stream('forms', self.make_sync(['forms', 'form_submissions'], '2024-01-01'), ['guid'], 'updatedAt', 'INCREMENTAL'),
+            Stream('form_submissions', None, ['conversionId'], 'submittedAt', 'INCREMENTAL', 'forms'),
+            Stream('owners', self.make_sync(['owners'], '2024-02-01'), ['id'], 'updatedAt', 'INCREMENTAL'),
+        ]
+        with mock.patch('tap_hubspot.STREAMS', streams), \
+             mock.patch('singer.write_state', side_effect=lambda s: self.written_states.append(singer.get_bookmark(s, 'owners', 'updatedAt'))):
+            return StreamScheduler(state, None, [], 2).run(streams)
+
+    def test_streams_run_concurrently_and_bookmarks_are_merged(self):
+        """
+            Verify that independent streams sync on separate threads and that the
+            bookmarks of both, including the child stream, end up in one state
+        """
+        state = self.run_scheduler({'bookmarks': {'engagements': {'lastUpdated': '2023-01-01'}}})
+
+        self.assertIsNot(self.threads['forms'], self.threads['owners'])
+        self.assertEqual(state['bookmarks'], {
+            'engagements': {'lastUpdated': '2023-01-01'},
+            'forms': {'updatedAt': '2024-01-01'},
+            'form_submissions': {'updatedAt': '2024-01-01'},
+            'owners': {'updatedAt': '2024-02-01'},
+        })
+        self.assertIsNone(singer.get_currently_syncing(state))
+
+    def test_written_states_keep_bookmarks_of_other_streams(self):
+        """
+            Verify that once a stream has written its bookmark, states written
+            for other streams still contain it
+        """
+        self.run_scheduler({'bookmarks': {}})
+
+        first_owners_state = self.written_states.index('2024-02-01')
+        self.assertTrue(all(value == '2024-02-01' for value in self.written_states[first_owners_state:]))
+
+    def test_unit_contains_child_streams(self):
+        """
+            Verify that a parent stream is scheduled together with its child streams
+        """
+        parent = tap_hubspot.Stream('contact_lists', None, ['listId'], 'updatedAt', 'INCREMENTAL')
+
+        self.assertEqual(StreamScheduler.get_unit_stream_ids(parent), ['contact_lists', 'list_memberships'])
@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import patch
+
+import tap_hubspot
+from tap_hubspot import load_sync_schema
+
+CATALOG_SCHEMA = {"type": "object", "properties": {"dealId": {"type": ["null", "integer"]}}}
+LOADED_SCHEMA = {"type": "object", "properties": {"dealId": {"type": ["null", "integer"]},
+                                                  "property_new": {"type": ["null", "string"]}}}
+
+
+@patch("tap_hubspot.load_schema", return_value=LOADED_SCHEMA)
+class TestLoadSyncSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.pre_config = tap_hubspot.CONFIG
+        tap_hubspot.CONFIG = dict(self.pre_config)
+
+    def tearDown(self):
+        tap_hubspot.CONFIG = self.pre_config
+
+    def test_catalog_schema_is_used(self, mocked_load_schema):
+        """
+            Verify that the schema in the catalog is used without fetching the properties again
+        """
+        schema = load_sync_schema({"schema": CATALOG_SCHEMA}, "deals")
+
+        self.assertEqual(schema, CATALOG_SCHEMA)
+        mocked_load_schema.assert_not_called()
+
+    def test_refresh_schema_loads_the_schema(self, mocked_load_schema):
+        """
+            Verify that the schema is loaded again when `refresh_schema` is enabled
+        """
+        tap_hubspot.CONFIG["refresh_schema"] = "true"
+
+        schema = load_sync_schema({"schema": CATALOG_SCHEMA}, "deals")
+
+        self.assertEqual(schema, LOADED_SCHEMA)
+        mocked_load_schema.assert_called_once_with("deals")
+
+    def test_catalog_without_schema_loads_the_schema(self, mocked_load_schema):
+        """
+            Verify that the schema is loaded when the catalog has none
+        """
+        schema = load_sync_schema({}, "deals")
+
+        self.assertEqual(schema, LOADED_SCHEMA)
@@ -1,3 +1,5 @@
+import datetime
+import itertools
 import unittest
 from unittest.mock import patch
 
@@ -122,7 +124,7 @@ class TestTickets(unittest.TestCase):
 
     @patch('tap_hubspot.request', return_value=MockResponse(mock_response_data))
     @patch('tap_hubspot.get_start', return_value='2023-01-01T00:00:00Z')
-    @patch('tap_hubspot.get_v3_records')
+    @patch('tap_hubspot.get_v3_record_pages')
     def test_ticket_params_are_validated(self, mocked_gen_request, mocked_get_start,
                                          mock_request_response):
         """
@@ -144,3 +146,28 @@ class TestTickets(unittest.TestCase):
         )
         mocked_gen_request.assert_called_once_with('https://api.hubapi.com/crm/v4/objects/tickets',
                                                    expected_param, 'results', 'paging')
+
+    @patch('tap_hubspot.request', return_value=MockResponse(mock_response_data))
+    @patch('tap_hubspot.get_start', return_value='2023-01-01T00:00:00Z')
+    @patch('tap_hubspot.get_v3_record_pages')
+    def test_time_extracted_is_taken_once_per_page(self, mocked_get_v3_record_pages, mocked_get_start,
+                                                   mock_request_response):
+        """
+        # Validating that the tickets of a page share the time they were extracted at
+        """
+        mocked_get_v3_record_pages.return_value = [
+            [{'id': '1', 'updatedAt': '2023-02-01T00:00:00Z'}, {'id': '2', 'updatedAt': '2023-02-01T00:00:00Z'}],
+            [{'id': '3', 'updatedAt': '2023-02-01T00:00:00Z'}],
+        ]
+        start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        times = (start + datetime.timedelta(seconds=second) for second in itertools.count())
+        written_times = []
+
+        with patch('tap_hubspot.utils.now', side_effect=lambda: next(times)), \
+             patch('singer.write_record', side_effect=lambda stream, record, *args, time_extracted=None, **kwargs:
+                   written_times.append(time_extracted)):
+            sync_tickets({'currently_syncing': 'tickets'}, MockContext())
+
+        self.assertEqual(len(written_times), 3)
+        self.assertEqual(written_times[0], written_times[1])
+        self.assertNotEqual(written_times[1], written_times[2])
@@ -0,0 +1,150 @@
+import copy
+import decimal
+import unittest
+
+from singer import metadata
+from singer.transform import SchemaMismatch
+
+import tap_hubspot
+from tap_hubspot import CompiledTransformer, Transformer, UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "dealId": {"type": ["null", "integer"]},
+        "isDeleted": {"type": ["null", "boolean"]},
+        "amount": {"type": ["null", "number"]},
+        "price": {"type": ["null", "string"], "format": "singer.decimal"},
+        "createdAt": {"type": ["null", "string"], "format": "date-time"},
+        "notes": {"anyOf": [{"type": "integer"}, {"type": ["null", "string"]}]},
+        "raw": {},
+        "associations": {"type": ["null", "object"], "properties": {}},
+        "property_dealname": {
+            "type": ["null", "object"],
+            "properties": {
+                "value": {"type": ["null", "string"]},
+                "timestamp": {"type": ["null", "string"], "format": "date-time"},
+            },
+        },
+        "properties_versions": {
+            "type": ["null", "array"],
+            "items": {"type": ["null", "object"],
+                      "properties": {"name": {"type": ["null", "string"]},
+                                     "value": {"type": ["null", "string"]}}},
+        },
+        "property_hidden": {"type": ["null", "string"]},
+        "property_key": {"type": ["null", "string"]},
+    },
+}
+
+RECORD = {
+    "dealId": "1,234",
+    "isDeleted": "false",
+    "amount": 10,
+    "price": 10.1,
+    "createdAt": 1614556800000,
+    "notes": "",
+    "raw": {"anything": [1, 2]},
+    "associations": {"associatedVids": [1]},
+    "property_dealname": {"value": "Deal", "timestamp": "2021-03-01T00:00:00Z", "source": "API"},
+    "properties_versions": [{"name": "dealname", "value": 12, "sourceVid": []}, None],
+    "property_hidden": "secret",
+    "property_key": None,
+    "portalId": 62515,
+}
+
+
+def get_mdata(selected=True, unselected=(), automatic=()):
+    mdata = {(): {"selected": selected}}
+    for field in SCHEMA["properties"]:
+        mdata[("properties", field)] = {"inclusion": "available", "selected": field not in unselected}
+    for field in automatic:
+        mdata[("properties", field)] = {"inclusion": "automatic", "selected": False}
+    return mdata
+
+
+class TestCompiledTransformer(unittest.TestCase):
+
+    def assert_transforms_like_transformer(self, record, schema=SCHEMA, mdata=None):
+        with Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING) as transformer:
+            expected = transformer.transform(copy.deepcopy(record), schema, mdata)
+        with CompiledTransformer() as transformer:
+            actual = transformer.transform(copy.deepcopy(record), schema, mdata)
+            self.assertEqual(actual, transformer.transform(copy.deepcopy(record), schema, mdata))
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(list(actual), list(expected))
+        return transformer
+
+    def test_output_matches_transformer(self):
+        """
+            Verify that records are coerced and ordered exactly like the Transformer does
+        """
+        self.assert_transforms_like_transformer(RECORD)
+        self.assert_transforms_like_transformer(RECORD, mdata=get_mdata())
+        self.assert_transforms_like_transformer({"dealId": None, "createdAt": "2021-03-01", "notes": 7,
+                                                 "price": decimal.Decimal("1.10"), "amount": "1,5"})
+
+    def test_unselected_fields_are_filtered(self):
+        """
+            Verify that unselected fields are dropped, automatic fields are kept
+            and the paths are tracked for the Transformer's log
+        """
+        mdata = get_mdata(unselected=("property_hidden", "dealId"), automatic=("property_key",))
+
+        transformer = self.assert_transforms_like_transformer(RECORD, mdata=mdata)
+
+        self.assertEqual(transformer.filtered, {"property_hidden", "dealId"})
+        self.assertEqual(transformer.removed, {"portalId", "property_dealname.source",
+                                               "properties_versions.0.sourceVid"})
+
+    def test_mismatch_raises_like_transformer(self):
+        """
+            Verify that a record that doesn't match the schema raises the Transformer's error
+        """
+        record = dict(RECORD, dealId="not a number")
+
+        with self.assertRaises(SchemaMismatch) as expected:
+            Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING).transform(copy.deepcopy(record), SCHEMA)
+        with self.assertRaises(SchemaMismatch) as actual:
+            CompiledTransformer().transform(copy.deepcopy(record), SCHEMA)
+
+        self.assertEqual(str(actual.exception), str(expected.exception))
+
+    def test_overflowing_values_fail_like_transformer(self):
+        """
+            Verify that numbers too large for their type fail to coerce instead of raising
+        """
+        self.assert_transforms_like_transformer({"notes": float("inf")})
+
+        record = dict(RECORD, amount=10 ** 400)
+        with self.assertRaises(SchemaMismatch) as expected:
+            Transformer(UNIX_MILLISECONDS_INTEGER_DATETIME_PARSING).transform(copy.deepcopy(record), SCHEMA)
+        with self.assertRaises(SchemaMismatch) as actual:
+            CompiledTransformer().transform(copy.deepcopy(record), SCHEMA)
+
+        self.assertEqual(str(actual.exception), str(expected.exception))
+
+    def test_unsupported_schema_uses_transformer(self):
+        """
+            Verify that schemas the plan doesn't support are transformed by the Transformer
+        """
+        schema = {"type": "object", "patternProperties": {"^property_": {"type": "string"}},
+                  "properties": {"id": {"type": "integer"}}}
+        transformer = CompiledTransformer()
+
+        record = transformer.transform({"id": "1", "property_a": 1}, schema)
+
+        self.assertEqual(record, {"id": 1, "property_a": "1"})
+        self.assertIsNone(transformer.get_plan(schema, None))
+
+    def test_stream_schemas_are_compiled(self):
+        """
+            Verify that the schemas shipped with the tap can all be compiled
+        """
+        for entity_name in ["campaigns", "contact_lists", "deal_pipelines", "email_events", "engagements",
+                            "forms", "form_submissions", "list_memberships", "owners", "workflows"]:
+            schema = tap_hubspot.utils.load_json(tap_hubspot.get_abs_path('schemas/{}.json'.format(entity_name)))
+            schema = tap_hubspot.singer.resolve_schema_references(schema, tap_hubspot.load_shared_schema_refs())
+            mdata = metadata.to_map(metadata.get_standard_metadata(schema=schema))
+            self.assertIsNotNone(CompiledTransformer().get_plan(schema, mdata), entity_name)